@@ -1,12 +1,22 @@
 /* vim:fileencoding=utf-8:noet
  */
 
+/* clock_gettime() */
+#ifndef _POSIX_C_SOURCE
+# define _POSIX_C_SOURCE 200809L
+#endif
+
 #include <stdio.h>
 #include <stdlib.h>
 #include <stddef.h>
+#include <stdint.h>
 #include <sys/un.h>
 #include <sys/types.h>
 #include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/mman.h>
+#include <fcntl.h>
+#include <time.h>
 #include <unistd.h>
 #include <errno.h>
 #include <string.h>
@@ -74,6 +84,97 @@ static inline size_t true_sun_len(const struct sockaddr_un *ptr) {
 #define NUM_ARGS_SIZE (sizeof(int) * 2 + 1)
 #define BUF_SIZE 4096
 #define NEW_ARGV_SIZE 200
+#define PATH_SIZE 4096
+#define HEADER_SIZE 64
+
+struct request {
+	char *data;
+	size_t len;
+	size_t size;
+};
+
+void request_append(struct request *req, const char *raw, size_t len) {
+	if (req->len + len > req->size) {
+		while (req->len + len > req->size)
+			req->size = req->size ? req->size * 2 : BUF_SIZE;
+		req->data = realloc(req->data, req->size);
+		if (req->data == NULL)
+			HANDLE_ERROR("realloc() failed");
+	}
+	memcpy(req->data + req->len, raw, len);
+	req->len += len;
+}
+
+/* Must be kept in sync with powerline/lib/publish.py */
+static uint64_t fnv1a_64(const char *raw, size_t len) {
+	uint64_t h = 0xcbf29ce484222325ULL;
+	size_t i;
+
+	for (i = 0; i < len; i++) {
+		h ^= (unsigned char) raw[i];
+		h *= 0x100000001b3ULL;
+	}
+	return h;
+}
+
+/* Write the answer published by the daemon (see powerline/lib/publish.py) if 
+ * it is present and is not stale. Returns 1 if the answer was written. */
+int write_published(const char *dir, const struct request *req) {
+	char path[PATH_SIZE];
+	char header[HEADER_SIZE];
+	struct stat st;
+	struct timespec now;
+	long long expires;
+	unsigned long long req_len;
+	const char *data;
+	const char *header_end;
+	size_t size;
+	size_t offset;
+	size_t len = req->len;
+	int fd;
+	int ret = 0;
+
+	/* Published requests are stripped of trailing NULs, see strip_request() in 
+	 * powerline/lib/publish.py */
+	while (len > 0 && req->data[len - 1] == '\0')
+		len--;
+	if (snprintf(path, PATH_SIZE, "%s/%016llx", dir,
+	             (unsigned long long) fnv1a_64(req->data, len)) >= PATH_SIZE)
+		return 0;
+	TEMP_FAILURE_RETRY(fd, open(path, O_RDONLY));
+	if (fd == -1)
+		return 0;
+	if (fstat(fd, &st) == -1 || st.st_size <= 0) {
+		close(fd);
+		return 0;
+	}
+	size = (size_t) st.st_size;
+	data = mmap(NULL, size, PROT_READ, MAP_PRIVATE, fd, 0);
+	close(fd);
+	if (data == MAP_FAILED)
+		return 0;
+
+	header_end = memchr(data, '\n', size < HEADER_SIZE ? size : HEADER_SIZE);
+	if (header_end == NULL)
+		goto unmap;
+	memcpy(header, data, (size_t) (header_end - data));
+	header[header_end - data] = '\0';
+	if (sscanf(header, "PL1 %lld %llu", &expires, &req_len) != 2)
+		goto unmap;
+	offset = (size_t) (header_end - data) + 1;
+	if (req_len != len || offset + len > size
+	    || memcmp(data + offset, req->data, len) != 0)
+		goto unmap;
+	if (clock_gettime(CLOCK_REALTIME, &now) == -1
+	    || (long long) now.tv_sec * 1000 + now.tv_nsec / 1000000 >= expires)
+		goto unmap;
+	offset += len;
+	do_write(STDOUT_FILENO, data + offset, size - offset);
+	ret = 1;
+unmap:
+	munmap((void *) data, size);
+	return ret;
+}
 
 int main(int argc, char *argv[]) {
 	int sd = -1;
@@ -88,6 +189,8 @@ int main(int argc, char *argv[]) {
 	char *wd = NULL;
 	char **envp;
 	const char *address;
+	const char *publish_dir;
+	struct request req = {NULL, 0, 0};
 	int len;
 
 	if (argc < 2) {
@@ -104,6 +207,34 @@ int main(int argc, char *argv[]) {
 		address = &(address_buf[0]);
 	}
 
+	len = snprintf(num_args, NUM_ARGS_SIZE, "%x", argc - 1);
+	request_append(&req, num_args, len);
+	request_append(&req, eof, 1);
+
+	for (i = 1; i < argc; i++) {
+		request_append(&req, argv[i], strlen(argv[i]));
+		request_append(&req, eof, 1);
+	}
+
+	wd = getcwd(NULL, 0);
+	if (wd != NULL) {
+		request_append(&req, wd, strlen(wd));
+		free(wd);
+		wd = NULL;
+	}
+	request_append(&req, eof, 1);
+
+	for(envp=environ; *envp; envp++) {
+		request_append(&req, *envp, strlen(*envp));
+		request_append(&req, eof, 1);
+	}
+
+	request_append(&req, eof, 2);
+
+	publish_dir = getenv("POWERLINE_PUBLISH_DIR");
+	if (publish_dir != NULL && *publish_dir && write_published(publish_dir, &req))
+		return 0;
+
 	sd = socket(AF_UNIX, SOCK_STREAM, 0);
 	if (sd == -1)
 		HANDLE_ERROR("socket() failed");
@@ -123,29 +254,8 @@ int main(int argc, char *argv[]) {
 		execvp("powerline-render", newargv);
 	}
 
-	len = snprintf(num_args, NUM_ARGS_SIZE, "%x", argc - 1);
-	do_write(sd, num_args, len);
-	do_write(sd, eof, 1);
-
-	for (i = 1; i < argc; i++) {
-		do_write(sd, argv[i], strlen(argv[i]));
-		do_write(sd, eof, 1);
-	}
-
-	wd = getcwd(NULL, 0);
-	if (wd != NULL) {
-		do_write(sd, wd, strlen(wd));
-		free(wd);
-		wd = NULL;
-	}
-	do_write(sd, eof, 1);
-
-	for(envp=environ; *envp; envp++) {
-		do_write(sd, *envp, strlen(*envp));
-		do_write(sd, eof, 1);
-	}
-
-	do_write(sd, eof, 2);
+	do_write(sd, req.data, req.len);
+	free(req.data);
 
 	read_size = -1;
 	while (read_size != 0) {
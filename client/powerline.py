@@ -6,6 +6,7 @@ import sys
 import socket
 import errno
 import os
+import binascii
 
 try:
 	from posix import environ
@@ -80,25 +81,90 @@ else:
 	args.append(cwd)
 
 
-args.extend((tobytes(k) + b'=' + tobytes(v) for k, v in environ.items()))
+# Environment delta encoding: when POWERLINE_ENV_SESSION is set full 
+# environment is sent only once and saved as a baseline (both by the daemon and 
+# in a file in $XDG_RUNTIME_DIR), later requests contain only changes relative 
+# to the baseline. See parse_environ() in powerline-daemon. Baseline file is 
+# removed by the shell exit trap set by user, if any, or together with 
+# $XDG_RUNTIME_DIR.
+if environ.get(b'POWERLINE_ENV_SESSION') and environ.get(b'XDG_RUNTIME_DIR'):
+	baseline_path = os.path.join(
+		environ[b'XDG_RUNTIME_DIR'], b'powerline-env-' + environ[b'POWERLINE_ENV_SESSION'])
+else:
+	baseline_path = None
+
+UNKNOWN_BASELINE = b'\0unknown-baseline\0'
+
+
+def save_baseline(entries):
+	baseline_id = binascii.hexlify(os.urandom(8))
+	tmp_path = baseline_path + ('.%d' % os.getpid()).encode('ascii')
+	fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	try:
+		os.write(fd, b'\0'.join([baseline_id] + entries))
+	finally:
+		os.close(fd)
+	os.rename(tmp_path, baseline_path)
+	return baseline_id
+
+
+def get_environ_entries(force_baseline=False):
+	entries = [tobytes(k) + b'=' + tobytes(v) for k, v in environ.items()]
+	if not baseline_path:
+		return entries
+	if not force_baseline:
+		try:
+			with open(baseline_path, 'rb') as f:
+				baseline = f.read().split(b'\0')
+		except EnvironmentError:
+			pass
+		else:
+			baseline_id = baseline.pop(0)
+			baseline_set = set(baseline)
+			changed = [entry for entry in entries if entry not in baseline_set]
+			# Register a new baseline when environment has changed too much 
+			# since the old one.
+			if len(changed) * 2 < len(entries):
+				keys = set((entry.partition(b'=')[0] for entry in entries))
+				return [b'=delta=' + baseline_id] + changed + [
+					b'=unset=' + key
+					for key in (entry.partition(b'=')[0] for entry in baseline)
+					if key not in keys
+				]
+	try:
+		return [b'=baseline=' + save_baseline(entries)] + entries
+	except EnvironmentError:
+		return entries
+
 
 EOF = b'\0\0'
 
-for a in args:
-	eintr_retry_call(sock.sendall, a + b'\0')
 
-eintr_retry_call(sock.sendall, EOF)
+def communicate(sock, request):
+	for a in request:
+		eintr_retry_call(sock.sendall, a + b'\0')
+
+	eintr_retry_call(sock.sendall, EOF)
+
+	received = []
+	while True:
+		r = sock.recv(4096)
+		if not r:
+			break
+		received.append(r)
+
+	sock.close()
+	return b''.join(received)
 
-received = []
-while True:
-	r = sock.recv(4096)
-	if not r:
-		break
-	received.append(r)
 
-sock.close()
+received = communicate(sock, args + get_environ_entries())
+if received == UNKNOWN_BASELINE:
+	# Daemon was restarted since baseline was registered
+	sock = socket.socket(family=socket.AF_UNIX)
+	eintr_retry_call(sock.connect, address)
+	received = communicate(sock, args + get_environ_entries(force_baseline=True))
 
 if sys.version_info < (3,):
-	sys.stdout.write(b''.join(received))
+	sys.stdout.write(received)
 else:
-	sys.stdout.buffer.write(b''.join(received))
+	sys.stdout.buffer.write(received)
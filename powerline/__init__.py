@@ -886,6 +886,28 @@ class Powerline(object):
 				ret = ret, len(ret)
 			return ret
 
+	def render_iter(self, *args, **kwargs):
+		'''Like .render(), but for ``self.renderer.render_iter()``
+
+		Errors are reported by yielding :py:class:`FailedUnicode` with the 
+		error message. Nothing is yielded until the first chunk is rendered, 
+		so if rendering fails before that error message is the only chunk. 
+		Chunks which were already yielded cannot be taken back though: if 
+		rendering fails later error message is yielded after them. Use 
+		.render() if output must be either the whole line or an error.
+		'''
+		try:
+			self.update_renderer()
+			for chunk in self.renderer.render_iter(*args, **kwargs):
+				yield chunk
+		except Exception as e:
+			exc = e
+			try:
+				self.exception('Failed to render: {0}', str(e))
+			except Exception as e:
+				exc = e
+			yield FailedUnicode(safe_unicode(exc))
+
 	def render_above_lines(self, *args, **kwargs):
 		'''Like .render(), but for ``self.renderer.render_above_lines()``
 		'''
@@ -34,7 +34,8 @@ if __name__ == '__main__':
 
 		global lock
 		with lock:
-			write(powerline.render(mode=modes[0]))
+			for chunk in powerline.render_iter(mode=modes[0]):
+				write(chunk)
 			write('\n')
 			sys.stdout.flush()
 
@@ -35,8 +35,10 @@ if __name__ == '__main__':
 
 		global lock
 		with lock:
-			for output, process, width in bars:
-				process.stdin.write(powerline.render(mode=modes[0], width=width, matcher_info=output).encode('utf-8') + b'\n')
+			rendered = powerline.render_outputs(
+				[(output, width) for output, process, width in bars], mode=modes[0])
+			for (output, process, width), line in zip(bars, rendered):
+				process.stdin.write(line.encode('utf-8') + b'\n')
 				process.stdin.flush()
 
 	def update(evt):
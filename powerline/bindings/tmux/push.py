@@ -0,0 +1,232 @@
+# vim:fileencoding=utf-8:noet
+'''Pushing tmux status line from powerline-daemon
+
+Instead of tmux running ``powerline`` client for each status side each
+``status-interval`` seconds daemon renders tmux theme itself and sets
+``status-left`` and ``status-right`` options through the control mode (``tmux
+-C``) connection, only when rendered status line changed.
+'''
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import re
+
+from threading import Thread, Event, Lock
+from subprocess import Popen, PIPE
+
+try:
+	from queue import Queue, Empty
+except ImportError:
+	from Queue import Queue, Empty
+
+from powerline import Powerline
+from powerline.lib.monotonic import monotonic
+from powerline.bindings.tmux import get_tmux_executable_name, get_tmux_version
+
+
+POWERLINE_COMMAND_RE = re.compile(r'#\([^()]*\btmux\s+(left|right)\b[^()]*\)')
+'''Regular expression matching ``#()`` which runs powerline client'''
+
+PLACEHOLDER = '\0'
+
+WAKEUP_NOTIFICATIONS = set((
+	'%session-changed',
+	'%client-session-changed',
+	'%session-window-changed',
+	'%window-pane-changed',
+	'%sessions-changed',
+))
+'''Control mode notifications after which status line is rendered immediately
+'''
+
+RETRY_INTERVAL = 5
+'''Number of seconds to wait before reconnecting to tmux'''
+
+
+def quote_tmux_argument(arg):
+	'''Quote argument for tmux command parser
+	'''
+	return '"' + arg.replace('\\', '\\\\').replace('"', '\\"').replace('$', '\\$') + '"'
+
+
+class TmuxControlError(Exception):
+	pass
+
+
+class TmuxControlClient(object):
+	'''Connection to tmux server in control mode
+
+	:param function on_notification:
+		Function called from the reader thread with each received notification
+		line.
+	'''
+
+	def __init__(self, pl, on_notification=None):
+		self.pl = pl
+		self.on_notification = on_notification
+		self.responses = Queue()
+		self.write_lock = Lock()
+		args = [get_tmux_executable_name(), '-C', 'attach-session']
+		if get_tmux_version(pl) >= (3, 2):
+			# Control client must not resize windows and does not need pane
+			# output.
+			args += ['-f', 'no-output,ignore-size']
+		self.process = Popen(args, stdin=PIPE, stdout=PIPE)
+		self.reader = Thread(target=self.read)
+		self.reader.daemon = True
+		self.reader.start()
+
+	def read(self):
+		block = None
+		for line in iter(self.process.stdout.readline, b''):
+			line = line.rstrip(b'\n').decode('utf-8', 'replace')
+			if block is not None:
+				if line.startswith(('%end ', '%error ')):
+					if block[0]:
+						self.responses.put((line.startswith('%end '), block[1]))
+					block = None
+				else:
+					block[1].append(line)
+			elif line.startswith('%begin '):
+				# The last field is 1 for commands sent by this client,
+				# commands run by tmux itself (e.g. attach-session) have 0.
+				block = (line.endswith(' 1'), [])
+			elif line.startswith('%exit'):
+				break
+			elif self.on_notification:
+				self.on_notification(line)
+		self.responses.put(None)
+
+	def command(self, *args, **kwargs):
+		'''Run tmux command and return its output
+
+		:param float timeout:
+			Maximum number of seconds to wait for the answer.
+
+		:return: list of output lines.
+		'''
+		timeout = kwargs.get('timeout', 2)
+		with self.write_lock:
+			try:
+				self.process.stdin.write(
+					(' '.join((quote_tmux_argument(arg) for arg in args)) + '\n').encode('utf-8'))
+				self.process.stdin.flush()
+			except EnvironmentError as e:
+				raise TmuxControlError(str(e))
+			try:
+				response = self.responses.get(timeout=timeout)
+			except Empty:
+				raise TmuxControlError('tmux did not answer in time')
+		if response is None:
+			self.responses.put(None)
+			raise TmuxControlError('tmux closed connection')
+		success, lines = response
+		if not success:
+			raise TmuxControlError('\n'.join(lines))
+		return lines
+
+	def close(self):
+		try:
+			self.process.stdin.close()
+		except EnvironmentError:
+			pass
+		self.process.wait()
+
+
+def get_templates(client):
+	'''Get templates of status line options
+
+	:return:
+		Dictionary mapping option names to ``(side, template, value)`` tuples:
+		template is the option value with powerline command replaced with
+		:py:data:`PLACEHOLDER`, value is the original value of the option.
+		Options which do not run powerline command are not included.
+	'''
+	ret = {}
+	for option in ('status-left', 'status-right'):
+		value = '\n'.join(client.command('show-options', '-gv', option))
+		match = POWERLINE_COMMAND_RE.search(value)
+		if match:
+			template = value[:match.start()] + PLACEHOLDER + value[match.end():]
+			ret[option] = (match.group(1), template, value)
+	return ret
+
+
+def push(powerline, client, templates, last_values):
+	'''Render status line and set options which values changed
+	'''
+	for option, (side, template, value) in templates.items():
+		new_value = template.replace(PLACEHOLDER, powerline.render(side=side))
+		if new_value != last_values.get(option):
+			client.command('set-option', '-g', option, new_value)
+			last_values[option] = new_value
+
+
+def run(thread_shutdown_event=None, pl_shutdown_event=None, pl_config_loader=None,
+        interval=None):
+	powerline = Powerline(
+		'tmux',
+		shutdown_event=pl_shutdown_event,
+		config_loader=pl_config_loader,
+	)
+	powerline.update_renderer()
+
+	if not thread_shutdown_event:
+		thread_shutdown_event = powerline.shutdown_event
+
+	wakeup_event = Event()
+	templates = {}
+
+	def on_notification(line):
+		if line.partition(' ')[0] in WAKEUP_NOTIFICATIONS:
+			wakeup_event.set()
+
+	while not thread_shutdown_event.is_set():
+		try:
+			client = TmuxControlClient(powerline.pl, on_notification)
+		except Exception as e:
+			powerline.pl.error('Failed to connect to tmux: {0}', str(e), prefix='tmux')
+			thread_shutdown_event.wait(RETRY_INTERVAL)
+			continue
+		try:
+			# After reconnecting options may already contain pushed values: 
+			# templates found earlier are kept for them.
+			templates.update(get_templates(client))
+			if not templates:
+				powerline.pl.warn('Status line does not run powerline', prefix='tmux')
+			last_values = {}
+			while not thread_shutdown_event.is_set():
+				# powerline.update_interval may change over time
+				used_interval = interval or powerline.update_interval
+				start_time = monotonic()
+				wakeup_event.clear()
+				push(powerline, client, templates, last_values)
+				wait_time = max(used_interval - (monotonic() - start_time), 0.1)
+				while wait_time > 0 and not thread_shutdown_event.is_set():
+					# Wake up earlier when session, window or pane changed or
+					# shutdown was requested.
+					if wakeup_event.wait(min(wait_time, 0.5)):
+						break
+					wait_time -= 0.5
+		except TmuxControlError as e:
+			powerline.pl.info('Lost connection to tmux: {0}', str(e), prefix='tmux')
+		finally:
+			if thread_shutdown_event.is_set():
+				# Give status line back to powerline clients.
+				for option, (side, template, value) in templates.items():
+					try:
+						client.command('set-option', '-g', option, value)
+					except TmuxControlError:
+						break
+			client.close()
+		thread_shutdown_event.wait(RETRY_INTERVAL)
+
+
+class TmuxPushThread(Thread):
+	__slots__ = ('powerline_shutdown_event',)
+
+	def __init__(self, **kwargs):
+		super(TmuxPushThread, self).__init__()
+		self.powerline_run_kwargs = kwargs
+
+	def run(self):
+		run(**self.powerline_run_kwargs)
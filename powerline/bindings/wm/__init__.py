@@ -6,6 +6,7 @@ import re
 from powerline.theme import requires_segment_info
 from powerline.lib.shell import run_cmd
 from powerline.bindings.wm.awesome import AwesomeThread
+from powerline.bindings.tmux.push import TmuxPushThread
 
 
 DEFAULT_UPDATE_INTERVAL = 0.5
@@ -69,4 +70,5 @@ def get_connected_xrandr_outputs(pl):
 
 wm_threads = {
 	'awesome': AwesomeThread,
+	'tmux': TmuxPushThread,
 }
@@ -29,7 +29,15 @@ def pick_gradient_value(grad_list, gradient_level):
 
 	Note: gradient level is not checked for being inside [0, 100] interval.
 	'''
-	return grad_list[int(round(gradient_level * (len(grad_list) - 1) / 100))]
+	return grad_list[get_gradient_index(grad_list, gradient_level)]
+
+
+def get_gradient_index(grad_list, gradient_level):
+	'''Given a list of colors and gradient percent, return index of the color
+
+	Note: gradient level is not checked for being inside [0, 100] interval.
+	'''
+	return int(round(gradient_level * (len(grad_list) - 1) / 100))
 
 
 class Colorscheme(object):
@@ -37,6 +45,8 @@ class Colorscheme(object):
 		'''Initialize a colorscheme.'''
 		self.colors = {}
 		self.gradients = {}
+		self.highlighting_cache = {}
+		self.gradient_cache = {}
 
 		self.groups = colorscheme_config['groups']
 		self.translations = colorscheme_config.get('mode_translations', {})
@@ -95,7 +105,25 @@ class Colorscheme(object):
 			else:
 				return group
 
-	def get_highlighting(self, groups, mode, gradient_level=None):
+	def get_gradient_indexes(self, gradient, gradient_level):
+		'''Get indexes of colors :py:meth:`get_gradient` would pick
+
+		:return:
+			Tuple with indexes in cterm and hex lists or ``None`` if 
+			``gradient`` is a color name.
+		'''
+		if gradient in self.gradients:
+			return tuple((get_gradient_index(grad_list, gradient_level) for grad_list in self.gradients[gradient]))
+		else:
+			return None
+
+	def resolve_groups(self, groups, mode):
+		'''Get properties of the first highlight group found in colorscheme
+
+		:return:
+			Triple ``(fg, bg, attrs)`` where ``fg`` and ``bg`` are color or 
+			gradient names and ``attrs`` is the renderer flag.
+		'''
 		trans = self.translations.get(mode, {})
 		for group in groups:
 			group_props = self.get_group_props(mode, trans, group)
@@ -103,17 +131,59 @@ class Colorscheme(object):
 				break
 		else:
 			raise KeyError('Highlighting groups not found in colorscheme: ' + ', '.join(groups))
+		return group_props['fg'], group_props['bg'], get_attrs_flag(group_props.get('attrs', []))
 
-		if gradient_level is None:
-			pick_color = self.colors.__getitem__
-		else:
-			pick_color = lambda gradient: self.get_gradient(gradient, gradient_level)
+	def get_highlighting(self, groups, mode, gradient_level=None):
+		'''Get highlighting for the first highlight group found in colorscheme
+
+		Results are cached: groups are resolved once for each mode and 
+		highlighting for gradients is computed once for each combination of 
+		picked colors. Colorscheme object is recreated when either colorscheme 
+		or colors configuration is reloaded, so are the caches.
+
+		:return:
+			Dictionary with ``fg``, ``bg`` and ``attrs`` keys. It is shared 
+			between callers and must not be modified.
+		'''
+		key = (tuple(groups), mode)
+		try:
+			fg, bg, attrs, highlighting = self.highlighting_cache[key]
+		except KeyError:
+			fg, bg, attrs = self.resolve_groups(groups, mode)
+			if fg in self.colors and bg in self.colors:
+				highlighting = {
+					'fg': self.colors[fg],
+					'bg': self.colors[bg],
+					'attrs': attrs,
+				}
+			else:
+				# Gradient used without gradient level or unknown color
+				highlighting = None
+			self.highlighting_cache[key] = (fg, bg, attrs, highlighting)
 
-		return {
-			'fg': pick_color(group_props['fg']),
-			'bg': pick_color(group_props['bg']),
-			'attrs': get_attrs_flag(group_props.get('attrs', [])),
-		}
+		if gradient_level is None:
+			if highlighting is None:
+				# Raises KeyError
+				highlighting = {
+					'fg': self.colors[fg],
+					'bg': self.colors[bg],
+				}
+			return highlighting
+
+		gradient_key = (
+			fg, bg, attrs,
+			self.get_gradient_indexes(fg, gradient_level),
+			self.get_gradient_indexes(bg, gradient_level),
+		)
+		try:
+			return self.gradient_cache[gradient_key]
+		except KeyError:
+			highlighting = self.gradient_cache[gradient_key] = {
+				'fg': self.get_gradient(fg, gradient_level),
+				'bg': self.get_gradient(bg, gradient_level),
+				'attrs': attrs,
+			}
+			return highlighting
 
 
 #       0         1         2         3         4         5         6         7         8         9
@@ -16,8 +16,128 @@ def get_argparser(ArgumentParser=argparse.ArgumentParser):
 		     'Does not silence exceptions in any case.'
 	)
 	parser.add_argument('--socket', '-s', help='Specify socket which will be used for connecting to daemon.')
+	parser.add_argument(
+		'--workers', '-w', metavar='NUM', type=int, default=0,
+		help='Number of workers used to process requests in parallel. '
+		     'Requests which use different configuration are processed '
+		     'by different workers, requests which use the same one are '
+		     'still processed one by one. '
+		     'Zero (default) means processing requests one by one: in the '
+		     'main thread with `select\' event loop and in a single worker '
+		     'thread with `asyncio\' event loop.'
+	)
+	parser.add_argument(
+		'--worker-type', choices=('thread', 'process'), default='thread',
+		help='Type of the workers: `thread\' (default) or `process\'. '
+		     'Process workers are not limited by the global interpreter '
+		     'lock, but each of them keeps its own copy of the loaded '
+		     'configuration.'
+	)
+	parser.add_argument(
+		'--event-loop', choices=('auto', 'select', 'asyncio'), default='auto',
+		help='Event loop used to accept connections and exchange data with '
+		     'clients. `asyncio\' serves each client independently, so slow '
+		     'clients do not delay others, and always renders in workers '
+		     '(one if --workers is zero). It requires Python-3.7 or later. '
+		     '`select\' is the older loop which serves clients one by one. '
+		     '`auto\' (default) selects `asyncio\' if it is available.'
+	)
+	parser.add_argument(
+		'--render-cache', metavar='SIZE', type=int, default=0,
+		help='Number of rendered prompt lines kept in the cache of each '
+		     'renderer. Lines are taken from the cache if they consist only '
+		     'of segments which declared all their inputs and these inputs '
+		     'did not change. Zero (default) disables the cache.'
+	)
+	parser.add_argument(
+		'--max-instances', metavar='NUM', type=int, default=64,
+		help='Maximum number of cached powerline instances. Separate instance '
+		     'is created for each combination of extension, renderer module, '
+		     'configuration overrides and paths. When there are more least '
+		     'recently used instances are shut down. Zero means no limit. '
+		     'Default is 64.'
+	)
+	parser.add_argument(
+		'--instance-ttl', metavar='SECONDS', type=float, default=0,
+		help='Number of seconds after which unused powerline instance is shut '
+		     'down. Zero (default) means that instances are shut down only '
+		     'when --max-instances limit is exceeded.'
+	)
+	parser.add_argument(
+		'--preload', metavar='SPEC', nargs='*',
+		help='Create powerline instances and render one prompt with each of '
+		     'them at startup, so that first requests do not wait for loading '
+		     'configuration. Each SPEC is EXT[:RENDERER_MODULE], e.g. '
+		     '`shell:.bash\'. Without arguments preloads instances used by '
+		     'bash, zsh and tmux bindings. Instances are created using daemon '
+		     'environment: requests from shells with different POWERLINE_* '
+		     'variables will not use them.'
+	)
+	parser.add_argument(
+		'--publish-dir', metavar='DIR',
+		help='Publish answers to repeated requests in files in the given '
+		     'directory and keep them up to date while clients keep reading '
+		     'them. C client reads answers from there when '
+		     'POWERLINE_PUBLISH_DIR environment variable is set to the same '
+		     'directory, without connecting to the daemon. Answers are '
+		     'published only for requests which contain exactly the same '
+		     'arguments, current directory and environment, e.g. tmux status '
+		     'line requests. Cannot be used with process workers.'
+	)
+	parser.add_argument(
+		'--publish-ext', metavar='EXT', action='append',
+		help='Extension which answers are published. May be given several '
+		     'times. Default is `tmux\'.'
+	)
+	parser.add_argument(
+		'--publish-max-age', metavar='SECONDS', type=float, default=2.0,
+		help='Number of seconds after which published answer is stale and '
+		     'client asks the daemon instead. Published answers are checked '
+		     'twice as often and rendered again if they were read. Default '
+		     'is 2.'
+	)
+	parser.add_argument(
+		'--publish-keep', metavar='SECONDS', type=float, default=60.0,
+		help='Number of seconds after the last request to the daemon or the '
+		     'last read of the published answer after which request is '
+		     'forgotten. Default is 60.'
+	)
+	parser.add_argument(
+		'--tree-watcher', choices=('auto', 'inotify', 'uv', 'stat'), default='auto',
+		help='Watcher used to invalidate cached repository status. `stat\' '
+		     'polls directories spending at most a few milliseconds on each '
+		     'request, use it if inotify does not notice changes (e.g. on NFS). '
+		     '`auto\' (default) selects inotify if it is available, falling '
+		     'back to uv and then to stat.'
+	)
+	parser.add_argument(
+		'--watched-tree-ttl', metavar='SECONDS', type=float, default=600.0,
+		help='Number of seconds after which directory tree which repository '
+		     'status was not requested is no longer watched for changes, '
+		     'releasing inotify watches. Default is 600.'
+	)
+	parser.add_argument(
+		'--max-watched-trees', metavar='NUM', type=int, default=0,
+		help='Maximum number of directory trees watched to invalidate cached '
+		     'repository status. When there are more least recently used '
+		     'trees are no longer watched. Zero (default) means no limit.'
+	)
+	parser.add_argument(
+		'--max-watched-directories', metavar='NUM', type=int, default=0,
+		help='Maximum number of directories watched by inotify in all watched '
+		     'trees. When there are more least recently used trees are no '
+		     'longer watched, tree which alone has more directories is '
+		     'polled instead. Zero (default) means no limit.'
+	)
 	exclusive_group = parser.add_mutually_exclusive_group()
 	exclusive_group.add_argument('--kill', '-k', action='store_true', help='Kill an already running instance.')
+	exclusive_group.add_argument(
+		'--stats', action='store_true',
+		help='Print statistics of an already running instance in JSON format: '
+		     'requests rate, render latency percentiles for each powerline '
+		     'instance and each segment, number of queued requests, cached '
+		     'powerline instances, running threads and watched paths.'
+	)
 	replace_group = exclusive_group.add_argument_group()
 	replace_group.add_argument('--foreground', '-f', action='store_true', help='Run in the foreground (don’t daemonize).')
 	replace_group.add_argument('--replace', '-r', action='store_true', help='Replace an already running instance.')
@@ -24,6 +24,34 @@ else:
 		return s
 
 
+NEXT_REQUEST_ARGUMENT = '--next'
+'''Argument which separates argument lists of several render requests
+
+Requests separated this way are processed by one powerline invocation (one 
+daemon connection) and their results are written one after another, each 
+terminated by a NUL byte.
+'''
+
+
+def split_requests(argv):
+	'''Split command-line arguments into argument lists of separate requests
+
+	:param list argv:
+		Arguments, without program name.
+
+	:return:
+		List of argument lists. Contains one list if there is no 
+		:py:data:`NEXT_REQUEST_ARGUMENT` in ``argv``.
+	'''
+	requests = [[]]
+	for arg in argv:
+		if arg == NEXT_REQUEST_ARGUMENT:
+			requests.append([])
+		else:
+			requests[-1].append(arg)
+	return requests
+
+
 def finish_args(parser, environ, args, is_daemon=False):
 	'''Do some final transformations
 
@@ -181,10 +209,10 @@ def write_output(args, powerline, segment_info, write):
 		args.side = args.side[len('above'):]
 
 	if args.side:
-		rendered = powerline.render(
+		for chunk in powerline.render_iter(
 			width=args.width,
 			side=args.side,
 			segment_info=segment_info,
 			mode=segment_info.get('mode', None),
-		)
-		write(rendered)
+		):
+			write(chunk)
@@ -3,6 +3,7 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 from powerline import Powerline
 from powerline.lib.dict import mergedicts
+from powerline.lib.unicode import FailedUnicode, safe_unicode
 
 
 class LemonbarPowerline(Powerline):
@@ -11,6 +12,20 @@ class LemonbarPowerline(Powerline):
 
 	get_encoding = staticmethod(lambda: 'utf-8')
 
+	def render_outputs(self, outputs, *args, **kwargs):
+		'''Like .render(), but for ``self.renderer.render_outputs()``
+		'''
+		try:
+			self.update_renderer()
+			return self.renderer.render_outputs(outputs, *args, **kwargs)
+		except Exception as e:
+			exc = e
+			try:
+				self.exception('Failed to render: {0}', str(e))
+			except Exception as e:
+				exc = e
+			return [FailedUnicode(safe_unicode(exc))] * len(outputs)
+
 	def get_local_themes(self, local_themes):
 		if not local_themes:
 			return {}
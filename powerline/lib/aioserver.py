@@ -0,0 +1,188 @@
+# vim:fileencoding=utf-8:noet
+'''asyncio-based server core for powerline-daemon
+
+Requires Python-3.7 or later. Older Pythons use the ``select()``-based main loop
+defined in the daemon script itself.
+'''
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import asyncio
+
+
+REQUEST_END = b'\0\0'
+'''Bytes which terminate each request sent by powerline clients'''
+
+
+async def read_field(reader):
+	'''Read one NUL-terminated field
+
+	:return:
+		Field contents without the terminating NUL or ``None`` if client closed
+		its side of the connection before sending anything.
+	'''
+	try:
+		return (await reader.readuntil(b'\0'))[:-1]
+	except asyncio.IncompleteReadError as e:
+		return e.partial or None
+
+
+async def read_request(reader):
+	'''Read one request
+
+	Request consists of NUL-terminated fields: number of arguments
+	(hexadecimal), arguments themselves, current directory and environment
+	variables. Request ends either with an empty field or when client closes
+	its side of the connection. Request is read field by field: arguments and
+	current directory may be empty and thus may contain request end marker,
+	while with empty environment only one NUL follows current directory.
+
+	:return: request bytes in the format accepted by ``parse_args``.
+	'''
+	fields = []
+	field = await read_field(reader)
+	if field is None:
+		return b''
+	fields.append(field)
+	try:
+		numargs = int(field, 16)
+	except ValueError:
+		# Either stop request or invalid request: in the latter case let the 
+		# parser report an error.
+		return field + REQUEST_END
+	for i in range(numargs + 1):
+		field = await read_field(reader)
+		if field is None:
+			return b'\0'.join(fields) + REQUEST_END
+		fields.append(field)
+	while True:
+		field = await read_field(reader)
+		if not field:
+			return b'\0'.join(fields) + REQUEST_END
+		fields.append(field)
+
+
+class AsyncServer(object):
+	'''Serve powerline-daemon requests using asyncio UNIX socket server
+
+	Reading requests and writing answers never blocks: each connection is
+	served by its own task with its own deadlines, so a slow or stuck client
+	only delays itself. Answers are computed by the worker pool, main loop is
+	notified about finished answers through pool readers.
+
+	:param socket.socket sock:
+		Bound and listening UNIX socket.
+	:param pool:
+		Worker pool: object with ``.submit(token, key, args_list, environ, cwd)``
+		and ``.collect(reader)`` methods and ``.readers`` attribute (see
+		``ThreadWorkerPool`` in the daemon script). Answers to requests 
+		submitted with ``None`` token are ignored.
+	:param function prepare_request:
+		Function which receives request bytes and returns either bytes (the
+		answer, usually an error message) or a ``(key, args_list, environ, cwd)``
+		tuple which is to be submitted to the pool.
+	:param bytes stop_request:
+		Request which makes server stop.
+	:param float read_timeout:
+		Maximum time, in seconds, the client may spend sending one request.
+	:param float write_timeout:
+		Maximum time, in seconds, the client may spend receiving the answer.
+	:param int max_request_size:
+		Maximum size of one request in bytes. Larger requests are discarded.
+	:param int max_pending:
+		Maximum number of requests processed at once. Connections are always
+		accepted, but when this many requests are processed requests from new
+		connections are not read until some of the pending requests are
+		answered: new clients wait with their connections open and their
+		requests left in the socket buffers. Read timeout starts only when
+		request is being read.
+	'''
+
+	def __init__(self, sock, pool, prepare_request, stop_request,
+	             read_timeout=2.0, write_timeout=2.0,
+	             max_request_size=1024 * 1024, max_pending=256):
+		self.sock = sock
+		self.pool = pool
+		self.prepare_request = prepare_request
+		self.stop_request = stop_request
+		self.read_timeout = read_timeout
+		self.write_timeout = write_timeout
+		self.max_request_size = max_request_size
+		self.max_pending = max_pending
+		self.watched_readers = {}
+		self.loop = None
+		self.stopped = None
+		self.pending = None
+
+	def run(self):
+		'''Serve requests until stop request is received
+		'''
+		asyncio.run(self.serve())
+
+	def stop(self):
+		if not self.stopped.done():
+			self.stopped.set_result(None)
+
+	async def serve(self):
+		self.loop = asyncio.get_running_loop()
+		self.stopped = self.loop.create_future()
+		self.pending = asyncio.Semaphore(self.max_pending)
+		self.watch_pool()
+		server = await asyncio.start_unix_server(
+			self.handle, sock=self.sock, limit=self.max_request_size)
+		try:
+			await self.stopped
+		finally:
+			server.close()
+			for fd in self.watched_readers.values():
+				self.loop.remove_reader(fd)
+			self.watched_readers.clear()
+
+	def watch_pool(self):
+		'''Make event loop watch all current pool readers
+
+		Readers set may change when pool restarts a dead worker.
+		'''
+		readers = set(self.pool.readers)
+		for reader in set(self.watched_readers) - readers:
+			self.loop.remove_reader(self.watched_readers.pop(reader))
+		for reader in readers - set(self.watched_readers):
+			fd = reader if isinstance(reader, int) else reader.fileno()
+			self.watched_readers[reader] = fd
+			self.loop.add_reader(fd, self.on_pool_ready, reader)
+
+	def on_pool_ready(self, reader):
+		for future, ans in self.pool.collect(reader):
+			if future is not None and not future.done():
+				future.set_result(ans)
+		self.watch_pool()
+
+	async def get_answer(self, req):
+		job = self.prepare_request(req)
+		if isinstance(job, bytes):
+			return job
+		future = self.loop.create_future()
+		self.pool.submit(future, *job)
+		return await future
+
+	async def handle(self, reader, writer):
+		try:
+			async with self.pending:
+				try:
+					req = await asyncio.wait_for(
+						read_request(reader), self.read_timeout)
+				except (asyncio.TimeoutError, asyncio.LimitOverrunError,
+				        ValueError, EnvironmentError):
+					return
+				if not req:
+					return
+				if req == self.stop_request:
+					self.stop()
+					return
+				ans = await self.get_answer(req)
+			writer.write(ans)
+			try:
+				await asyncio.wait_for(writer.drain(), self.write_timeout)
+			except (asyncio.TimeoutError, EnvironmentError):
+				pass
+		finally:
+			writer.close()
@@ -0,0 +1,247 @@
+# vim:fileencoding=utf-8:noet
+'''Publishing answers to repeated requests in files
+
+Clients which repeat the very same request over and over again (e.g. tmux
+status line, computed each ``status-interval`` seconds for each status side)
+may read the answer from a file instead of asking the daemon. Daemon keeps
+these files up to date while the requests keep arriving.
+
+Each published answer is stored in a separate file in the publishing
+directory. File name is the FNV-1a 64-bit hash of the request bytes without
+trailing NULs (see :py:func:`strip_request`) written as sixteen lowercase
+hexadecimal digits. File contents is
+
+	``PL1 {expires} {request_length}\\n{request}{answer}``
+
+where ``{expires}`` is the time after which answer is stale (in milliseconds
+since the epoch) and ``{request}`` are the request bytes without trailing NULs,
+used to rule out hash collisions. Files are replaced atomically, so
+readers never see partially written answers.
+
+Answers are rendered again only when they are in demand: when the published 
+file was read since it was written (its access time is newer than its 
+modification time) or when the request was sent to the daemon.
+'''
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+
+from threading import Event, Lock, Thread
+from time import time
+
+from powerline.lib.monotonic import monotonic
+
+
+ENTRY_MAGIC = b'PL1'
+
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+FNV_MASK = 0xffffffffffffffff
+
+
+def fnv1a_64(data):
+	'''Compute 64-bit FNV-1a hash of the given bytes
+	'''
+	h = FNV_OFFSET
+	for byte in bytearray(data):
+		h = ((h ^ byte) * FNV_PRIME) & FNV_MASK
+	return h
+
+
+def strip_request(request):
+	'''Strip NULs which terminate the request
+
+	Clients end requests with different number of NULs and the daemon does not 
+	necessarily receive all of them (e.g. asyncio server stops reading at the 
+	first empty field). Empty fields are ignored when parsing requests, so 
+	requests which differ only in trailing NULs are the same request. C client 
+	strips requests the same way before looking for published answers.
+	'''
+	return request.rstrip(b'\0')
+
+
+def get_entry_name(request):
+	'''Get name of the file with the answer to the given request
+	'''
+	return '{0:016x}'.format(fnv1a_64(request))
+
+
+def format_entry(request, answer, expires):
+	'''Get contents of the file with published answer
+
+	:param bytes request:
+		Request bytes.
+	:param bytes answer:
+		Answer to the request.
+	:param float expires:
+		Time after which answer is stale, in seconds since the epoch.
+	'''
+	header = '{0} {1} {2}\n'.format(
+		ENTRY_MAGIC.decode('ascii'), int(expires * 1000), len(request))
+	return header.encode('ascii') + request + answer
+
+
+def parse_entry(data):
+	'''Parse contents of the file with published answer
+
+	:return:
+		Triple ``(expires, request, answer)`` (see :py:func:`format_entry`) or
+		``None`` if data is not a valid entry.
+	'''
+	header, sep, rest = data.partition(b'\n')
+	fields = header.split(b' ')
+	if not sep or len(fields) != 3 or fields[0] != ENTRY_MAGIC:
+		return None
+	try:
+		expires = int(fields[1]) / 1000
+		request_length = int(fields[2])
+	except ValueError:
+		return None
+	if request_length > len(rest):
+		return None
+	return expires, rest[:request_length], rest[request_length:]
+
+
+class Publisher(object):
+	'''Keep answers to repeated requests published in files
+
+	Requests are registered with :py:meth:`add_request`. Publisher thread 
+	checks registered requests each ``max_age / 2`` seconds and renders again 
+	those which answers were read since they were written, so published 
+	answers are not stale while clients keep reading them, but nothing is 
+	rendered for clients which are gone. Requests which answers are not read 
+	and which are not repeated for ``keep`` seconds are forgotten. When client 
+	finds stale answer (or no answer at all) it is expected to send the 
+	request to the daemon which will register it again.
+
+	Reads are detected using file access times: if they are not updated (e.g. 
+	file system is mounted with ``noatime``) answers are published only once 
+	after each request to the daemon.
+
+	:param str directory:
+		Directory where answers are published. Created if it does not exist.
+	:param function render:
+		Function which receives ``(args, environ, cwd)`` and returns bytes
+		with the answer.
+	:param float max_age:
+		Number of seconds after which published answer is stale.
+	:param float keep:
+		Number of seconds after the answer was last requested or read during 
+		which request is remembered.
+	:param tuple exts:
+		Extensions which answers are published. Answers for other extensions
+		and for requests containing several renders are never published.
+	'''
+
+	def __init__(self, directory, render, max_age=2.0, keep=60.0, exts=('tmux',)):
+		self.directory = directory
+		self.render = render
+		self.max_age = max_age
+		self.keep = keep
+		self.exts = tuple(exts)
+		self.entries = {}
+		self.lock = Lock()
+		self.shutdown_event = Event()
+		self.thread = None
+
+	def add_request(self, request, args_list, environ, cwd):
+		'''Register request received by the daemon
+
+		:param bytes request:
+			Request bytes as they were received from client.
+		:param list args_list:
+			List of parsed arguments, as returned by ``parse_args``.
+		'''
+		if len(args_list) != 1 or args_list[0].ext[0] not in self.exts:
+			return
+		request = strip_request(request)
+		name = get_entry_name(request)
+		now = monotonic()
+		with self.lock:
+			entry = self.entries.get(name)
+			if entry is not None and entry[0] == request:
+				entry[4] = now
+				entry[5] = True
+			else:
+				# Entry: request, arguments, environment, current directory, 
+				# time of the last demand, whether answer is to be rendered.
+				self.entries[name] = [request, args_list[0], environ, cwd, now, True]
+
+	def start(self):
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory, 0o700)
+		self.thread = Thread(target=self.run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def run(self):
+		while not self.shutdown_event.is_set():
+			self.refresh()
+			self.shutdown_event.wait(self.max_age / 2)
+
+	def refresh(self):
+		'''Publish answers which are in demand, forget old requests
+		'''
+		now = monotonic()
+		with self.lock:
+			entries = list(self.entries.items())
+		for name, entry in entries:
+			if self.was_read(name):
+				with self.lock:
+					entry[4] = now
+					entry[5] = True
+			request, args, environ, cwd, last_demand, pending = entry
+			if now - last_demand > self.keep:
+				with self.lock:
+					if self.entries.get(name) is entry:
+						del self.entries[name]
+				self.remove(name)
+				continue
+			if not pending:
+				continue
+			entry[5] = False
+			try:
+				answer = self.render(args, environ, cwd)
+			except Exception:
+				continue
+			self.write(name, format_entry(request, answer, time() + self.max_age))
+
+	def was_read(self, name):
+		'''Check whether published answer was read since it was written
+		'''
+		try:
+			st = os.stat(os.path.join(self.directory, name))
+		except EnvironmentError:
+			return False
+		return st.st_atime > st.st_mtime
+
+	def write(self, name, data):
+		path = os.path.join(self.directory, name)
+		tmp_path = path + '.tmp'
+		try:
+			fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+			try:
+				os.write(fd, data)
+			finally:
+				os.close(fd)
+			os.rename(tmp_path, path)
+		except EnvironmentError:
+			pass
+
+	def remove(self, name):
+		try:
+			os.unlink(os.path.join(self.directory, name))
+		except EnvironmentError:
+			pass
+
+	def shutdown(self):
+		'''Stop publisher thread and remove all published answers
+		'''
+		self.shutdown_event.set()
+		if self.thread is not None:
+			self.thread.join(self.max_age)
+		with self.lock:
+			names = list(self.entries)
+			self.entries.clear()
+		for name in names:
+			self.remove(name)
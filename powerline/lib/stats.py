@@ -0,0 +1,165 @@
+# vim:fileencoding=utf-8:noet
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+from collections import deque
+from threading import Lock
+
+from powerline.lib.monotonic import monotonic
+
+
+def percentile(sorted_samples, p):
+	'''Compute percentile using nearest-rank method
+
+	:param list sorted_samples:
+		Samples, sorted in ascending order.
+	:param float p:
+		Percentile, number between 0 and 100.
+
+	:return: one of the samples or ``None`` if there are no samples.
+	'''
+	if not sorted_samples:
+		return None
+	rank = -(-p * len(sorted_samples) // 100)
+	return sorted_samples[max(int(rank), 1) - 1]
+
+
+class LatencySamples(object):
+	'''Collection of the last durations of some operation
+
+	:param int max_samples:
+		Number of last samples used to compute percentiles.
+	'''
+
+	percentiles = (50, 95, 99)
+
+	def __init__(self, max_samples=1024):
+		self.samples = deque(maxlen=max_samples)
+		self.count = 0
+		self.total = 0.0
+
+	def add(self, duration):
+		self.samples.append(duration)
+		self.count += 1
+		self.total += duration
+
+	def dump(self):
+		'''Return dictionary with number of samples and percentiles
+
+		All durations are in milliseconds.
+		'''
+		samples = sorted(self.samples)
+		ret = {
+			'count': self.count,
+			'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else None,
+		}
+		for p in self.percentiles:
+			value = percentile(samples, p)
+			ret['p{0}_ms'.format(p)] = round(value * 1000, 3) if value is not None else None
+		return ret
+
+
+class RequestStats(object):
+	'''Statistics collected by powerline-daemon
+
+	All methods are thread-safe.
+
+	:param float window:
+		Number of seconds used to compute requests rate.
+	:param int max_samples:
+		Number of last samples used to compute percentiles for each key or
+		segment.
+	:param bool keep_records:
+		If true, do not aggregate data, but keep records for
+		:py:meth:`pop_records`: used in worker processes, which send records to
+		the main process.
+	'''
+
+	def __init__(self, window=60, max_samples=1024, keep_records=False):
+		self.lock = Lock()
+		self.window = window
+		self.max_samples = max_samples
+		self.start_time = monotonic()
+		self.requests = 0
+		self.recent_requests = deque()
+		self.renders = {}
+		self.segments = {}
+		self.records = [] if keep_records else None
+
+	def add_request(self):
+		'''Record that one request was answered
+		'''
+		self.add('request', None, None)
+
+	def add_render(self, key, duration):
+		'''Record time spent on rendering using powerline instance with given key
+		'''
+		self.add('render', key, duration)
+
+	def add_segment(self, name, duration):
+		'''Record time spent on computing segment with given name
+		'''
+		self.add('segment', name, duration)
+
+	def add(self, kind, name, duration):
+		with self.lock:
+			if self.records is not None:
+				self.records.append((kind, name, duration))
+			else:
+				self._add(kind, name, duration, monotonic())
+
+	def _add(self, kind, name, duration, now):
+		if kind == 'request':
+			self.requests += 1
+			self.recent_requests.append(now)
+			self._expire(now)
+		else:
+			samples_dict = self.renders if kind == 'render' else self.segments
+			try:
+				samples = samples_dict[name]
+			except KeyError:
+				samples = samples_dict[name] = LatencySamples(self.max_samples)
+			samples.add(duration)
+
+	def _expire(self, now):
+		while self.recent_requests and now - self.recent_requests[0] > self.window:
+			self.recent_requests.popleft()
+
+	def pop_records(self):
+		'''Return and forget records kept since the last call
+		'''
+		with self.lock:
+			ret = self.records
+			self.records = []
+		return ret
+
+	def add_records(self, records):
+		'''Add records obtained from :py:meth:`pop_records` of other object
+		'''
+		with self.lock:
+			now = monotonic()
+			for kind, name, duration in records:
+				self._add(kind, name, duration, now)
+
+	def dump(self):
+		'''Return dictionary with collected statistics
+
+		Dictionary is suitable for serializing to JSON.
+		'''
+		with self.lock:
+			now = monotonic()
+			self._expire(now)
+			uptime = now - self.start_time
+			return {
+				'uptime': round(uptime, 3),
+				'requests': self.requests,
+				'requests_per_second': round(
+					len(self.recent_requests) / max(min(uptime, self.window), 1e-3), 3),
+				'renders': [
+					dict(key=list(key), **samples.dump())
+					for key, samples in self.renders.items()
+				],
+				'segments': dict((
+					(name, samples.dump())
+					for name, samples in self.segments.items()
+				)),
+			}
@@ -3,6 +3,7 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 from threading import Thread, Lock, Event
 from types import MethodType
+from weakref import WeakSet
 
 from powerline.lib.monotonic import monotonic
 from powerline.segments import Segment
@@ -29,6 +30,16 @@ class MultiRunnedThread(object):
 		return None
 
 
+started_segments = WeakSet()
+'''Threaded segments which have started their threads at least once'''
+
+
+def count_running_segments():
+	'''Count threaded segments which threads are currently running
+	'''
+	return sum((1 for segment in tuple(started_segments) if segment.is_alive()))
+
+
 class ThreadedSegment(Segment, MultiRunnedThread):
 	min_sleep_time = 0.1
 	update_first = True
@@ -79,6 +90,10 @@ class ThreadedSegment(Segment, MultiRunnedThread):
 			self.crashed = False
 			self.updated = True
 
+	def start(self):
+		started_segments.add(self)
+		super(ThreadedSegment, self).start()
+
 	def get_update_value(self, update=False):
 		if update:
 			self.set_update_value()
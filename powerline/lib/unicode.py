@@ -2,9 +2,11 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 import sys
+import re
 import codecs
 
 from unicodedata import east_asian_width, combining
+from collections import OrderedDict
 
 from powerline.lib.encoding import get_preferred_output_encoding
 
@@ -244,14 +246,130 @@ _strwidth_documentation = (
 	:return: unsigned integer.''')
 
 
+EAST_ASIAN_WIDTHS = ('N', 'Na', 'A', 'H', 'W', 'F')
+'''All possible east_asian_width property values
+
+Index of the value in this tuple is used as a width code in width table.
+'''
+
+WIDTH_CODE_COMBINING = 8
+'''Flag added to width code of combining characters'''
+
+WIDTH_PAGE_BITS = 8
+WIDTH_PAGE_MASK = (1 << WIDTH_PAGE_BITS) - 1
+
+STRWIDTH_CACHE_SIZE = 1024
+'''Maximum number of non-ASCII strings which widths are remembered'''
+
+_width_pages = {}
+_width_tables = {}
+_strwidth_cache = OrderedDict()
+
+
+try:
+	_isascii = unicode.isascii
+except AttributeError:
+	_non_ascii_re = re.compile('[^\x00-\x7F]')
+
+	def _isascii(string):
+		return not _non_ascii_re.search(string)
+
+
+def _get_width_page(page):
+	'''Compute width codes for the given page of codepoints
+
+	Width table is filled lazily, one page (256 codepoints) at a time, using 
+	:py:mod:`unicodedata`: this way widths are exactly the same as computed by 
+	the unicodedata module of the running Python and only a tiny part of the 
+	table is ever computed.
+
+	:return: bytearray with width codes for all codepoints in the page.
+	'''
+	codes = bytearray()
+	for codepoint in range(page << WIDTH_PAGE_BITS, (page + 1) << WIDTH_PAGE_BITS):
+		symbol = unichr(codepoint)
+		code = EAST_ASIAN_WIDTHS.index(east_asian_width(symbol))
+		try:
+			if combining(symbol):
+				code |= WIDTH_CODE_COMBINING
+		except TypeError:
+			# Surrogate pair in UCS-2 Python builds: only east asian width is 
+			# used for them.
+			pass
+		codes.append(code)
+	_width_pages[page] = codes
+	return codes
+
+
+def _get_width_table(width_data):
+	'''Get tuple which maps width codes to widths
+
+	:return: pair ``(key, table)`` where key is the hashable representation of 
+		``width_data``.
+	'''
+	key = (
+		width_data['N'], width_data['Na'], width_data['A'],
+		width_data['H'], width_data['W'], width_data['F'],
+	)
+	try:
+		return key, _width_tables[key]
+	except KeyError:
+		# Codes with combining flag set (and unused codes) map to zero: 
+		# combining characters occupy no space.
+		table = _width_tables[key] = key + (0,) * (2 * WIDTH_CODE_COMBINING - len(key))
+		return key, table
+
+
+def _get_width_code(codepoint):
+	try:
+		page = _width_pages[codepoint >> WIDTH_PAGE_BITS]
+	except KeyError:
+		page = _get_width_page(codepoint >> WIDTH_PAGE_BITS)
+	return page[codepoint & WIDTH_PAGE_MASK]
+
+
+def _cached_strwidth(compute, width_data, string):
+	'''Compute width of the non-ASCII string using LRU cache
+
+	:param function compute:
+		Function which receives width table (see :py:func:`_get_width_table`), 
+		``width_data`` and ``string`` and computes string width.
+	'''
+	key, table = _get_width_table(width_data)
+	cache_key = (compute, key, string)
+	try:
+		ret = _strwidth_cache.pop(cache_key)
+	except KeyError:
+		ret = compute(table, width_data, string)
+		while len(_strwidth_cache) >= STRWIDTH_CACHE_SIZE:
+			try:
+				_strwidth_cache.popitem(last=False)
+			except KeyError:
+				# Emptied by another thread
+				break
+	_strwidth_cache[cache_key] = ret
+	return ret
+
+
+def _strwidth_ucs_4(table, width_data, string):
+	pages = _width_pages
+	ret = 0
+	for symbol in string:
+		codepoint = ord(symbol)
+		try:
+			page = pages[codepoint >> WIDTH_PAGE_BITS]
+		except KeyError:
+			page = _get_width_page(codepoint >> WIDTH_PAGE_BITS)
+		ret += table[page[codepoint & WIDTH_PAGE_MASK]]
+	return ret
+
+
 def strwidth_ucs_4(width_data, string):
-	return sum(((
-		(
-			0
-		) if combining(symbol) else (
-			width_data[east_asian_width(symbol)]
-		)
-	) for symbol in string))
+	if _isascii(string) and width_data['N'] == width_data['Na']:
+		# ASCII characters are either neutral (control characters) or narrow, 
+		# none is combining.
+		return len(string) * width_data['Na']
+	return _cached_strwidth(_strwidth_ucs_4, width_data, string)
 
 
 strwidth_ucs_4.__doc__ = _strwidth_documentation.format(
@@ -264,16 +382,29 @@ strwidth_ucs_4.__doc__ = _strwidth_documentation.format(
 		supported.''')
 
 
+def _strwidth_ucs_2(table, width_data, string):
+	ret = 0
+	for i, symbol in enumerate(string):
+		codepoint = ord(symbol)
+		if 0xDC00 <= codepoint <= 0xDFFF:
+			high = ord(string[i - 1])
+			if 0xD800 <= high <= 0xDBFF:
+				# Only east asian width is used for surrogate pairs.
+				ret += table[
+					_get_width_code(surrogate_pair_to_character(high, codepoint))
+					& ~WIDTH_CODE_COMBINING
+				]
+			else:
+				ret += width_data[east_asian_width(string[i - 1] + symbol)]
+		elif not 0xD800 <= codepoint <= 0xDBFF:
+			ret += table[_get_width_code(codepoint)]
+	return ret
+
+
 def strwidth_ucs_2(width_data, string):
-	return sum(((
-		(
-			width_data[east_asian_width(string[i - 1] + symbol)]
-		) if 0xDC00 <= ord(symbol) <= 0xDFFF else (
-			0
-		) if combining(symbol) or 0xD800 <= ord(symbol) <= 0xDBFF else (
-			width_data[east_asian_width(symbol)]
-		)
-	) for i, symbol in enumerate(string)))
+	if _isascii(string) and width_data['N'] == width_data['Na']:
+		return len(string) * width_data['Na']
+	return _cached_strwidth(_strwidth_ucs_2, width_data, string)
 
 
 strwidth_ucs_2.__doc__ = _strwidth_documentation.format(
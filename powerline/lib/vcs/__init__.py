@@ -9,7 +9,7 @@ from collections import defaultdict
 
 from powerline.lib.watcher import create_tree_watcher
 from powerline.lib.unicode import out_u
-from powerline.lib.path import join
+from powerline.lib.path import join, realpath
 
 
 def generate_directories(path):
@@ -184,8 +184,17 @@ def get_file_status(directory, dirstate_file, file_path, ignore_file_name, get_f
 
 class TreeStatusCache(dict):
 	def __init__(self, pl):
-		self.tw = create_tree_watcher(pl)
+		self.tw = create_tree_watcher(pl, **tree_watcher_options)
 		self.pl = pl
+		self.states = {}
+
+	def forget_unwatched(self):
+		'''Remove cached status of trees which are no longer watched
+		'''
+		for key in tuple(self):
+			if realpath(key) not in self.tw.watches:
+				self.pop(key)
+				self.states.pop(key, None)
 
 	def cache_and_get(self, key, status):
 		ans = self.get(key, self)
@@ -196,21 +205,77 @@ class TreeStatusCache(dict):
 	def __call__(self, repo):
 		key = repo.directory
 		try:
-			if self.tw(key, ignore_event=getattr(repo, 'ignore_event', None)):
-				self.pop(key, None)
+			changed_paths = self.tw.get_changed_paths(key, ignore_event=getattr(repo, 'ignore_event', None))
 		except OSError as e:
 			self.pl.warn('Failed to check {0} for changes, with error: {1}', key, str(e))
-		return self.cache_and_get(key, repo.status)
+			changed_paths = set()
+		if len(self) > len(self.tw.watches):
+			self.forget_unwatched()
+		incremental_status = getattr(repo, 'incremental_status', None)
+		if incremental_status is None:
+			if changed_paths is None or changed_paths:
+				self.pop(key, None)
+			return self.cache_and_get(key, repo.status)
+		if changed_paths is None or changed_paths or key not in self:
+			# Repositories which support it only check paths which changed.
+			state = self.states.get(key) if changed_paths is not None else None
+			self[key], self.states[key] = incremental_status(state, changed_paths)
+		return self[key]
 
 
 _tree_status_cache = None
+tree_status_lock = Lock()
+'''Lock which protects tree watcher and cached repository status
+
+Status may be requested from several threads at once (e.g. by daemon thread 
+workers): two first queries of the same tree must not create two watchers and 
+changed paths reported to one query must not be lost for the other one.
+'''
+
+tree_watcher_options = {}
+'''Keyword arguments for :py:func:`powerline.lib.watcher.create_tree_watcher`'''
+
+
+def configure_tree_watcher(**options):
+	'''Set options of the tree watcher used to invalidate cached repository status
+
+	Accepts the same keyword arguments as 
+	:py:func:`powerline.lib.watcher.create_tree_watcher`, except for ``pl``. 
+	Trees which are currently watched are released.
+	'''
+	global _tree_status_cache
+	with tree_status_lock:
+		tree_watcher_options.clear()
+		tree_watcher_options.update(options)
+		if _tree_status_cache is not None:
+			_tree_status_cache.tw.close()
+			_tree_status_cache = None
 
 
 def tree_status(repo, pl):
 	global _tree_status_cache
-	if _tree_status_cache is None:
-		_tree_status_cache = TreeStatusCache(pl)
-	return _tree_status_cache(repo)
+	with tree_status_lock:
+		if _tree_status_cache is None:
+			_tree_status_cache = TreeStatusCache(pl)
+		return _tree_status_cache(repo)
+
+
+def count_tree_watches():
+	'''Count watched directory trees
+	'''
+	with tree_status_lock:
+		if _tree_status_cache is None:
+			return 0
+		return len(_tree_status_cache.tw.watches)
+
+
+def count_watched_directories():
+	'''Count directories watched by the shared inotify instance
+	'''
+	with tree_status_lock:
+		if _tree_status_cache is None:
+			return 0
+		return _tree_status_cache.tw.count_watched_directories()
 
 
 vcs_props = (
@@ -3,6 +3,8 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 import os
 import re
+import zlib
+import struct
 
 from powerline.lib.vcs import get_branch_name, get_file_status
 from powerline.lib.shell import readlines
@@ -10,11 +12,16 @@ from powerline.lib.path import join
 from powerline.lib.encoding import (get_preferred_file_name_encoding,
                                     get_preferred_file_contents_encoding)
 from powerline.lib.shell import which
+from powerline.lib.vcs.git_status import get_status, get_incremental_status, UnsupportedRepository
 
 
 _ref_pat = re.compile(br'ref:\s*refs/heads/(.+)')
 
 
+reader_errors = (UnsupportedRepository, EnvironmentError, ValueError, KeyError, zlib.error, struct.error)
+'''Errors which make status be requested from git executable'''
+
+
 def branch_name_from_config_file(directory, config_file):
 	try:
 		with open(config_file, 'rb') as f:
@@ -181,7 +188,26 @@ except ImportError:
 		def stash(self):
 			return sum(1 for _ in self._gitcmd(self.directory, '--no-optional-locks', 'stash', 'list'))
 
+		def incremental_status(self, state, changed_paths):
+			'''Get repository status updating the result of the previous call
+
+			:return:
+				Pair ``(status, state)``, see 
+				:py:func:`powerline.lib.vcs.git_status.get_incremental_status`.
+			'''
+			try:
+				return get_incremental_status(self.directory, git_directory(self.directory), state, changed_paths)
+			except reader_errors:
+				return self.git_status(self.directory, None), None
+
 		def do_status(self, directory, path):
+			try:
+				return get_status(directory, git_directory(directory), path)
+			except reader_errors:
+				# Let git handle anything reader does not support.
+				return self.git_status(directory, path)
+
+		def git_status(self, directory, path):
 			if path:
 				try:
 					return next(self._gitcmd(directory, '--no-optional-locks', 'status', '--porcelain', '--ignored', '--', path))[:2]
@@ -0,0 +1,1245 @@
+# vim:fileencoding=utf-8:noet
+'''Pure-Python git status reader
+
+Computes status of the repository or of a single file from the index, objects
+and refs without running git: files are compared with the index using
+``stat()`` data (and contents hashes for racily clean and modified files),
+index is compared with the ``HEAD`` tree using cache tree extension when
+possible.
+
+Repositories which cannot be handled (split or sparse index, submodules,
+unmerged entries, content filters, SHA-256 object format, etc) make functions
+raise :py:exc:`UnsupportedRepository`: caller is expected to run git then.
+'''
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import re
+import stat
+import zlib
+import struct
+
+from hashlib import sha1
+from bisect import bisect_left
+from binascii import hexlify, unhexlify
+from threading import Lock
+
+from powerline.lib.encoding import get_preferred_file_name_encoding
+
+
+class UnsupportedRepository(Exception):
+	pass
+
+
+MODE_GITLINK = 0o160000
+MODE_SYMLINK = 0o120000
+
+INDEX_ENTRY = struct.Struct(str('>10I20sH'))
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE_MASK = 0x3000
+FLAG_ASSUME_VALID = 0x8000
+EXT_FLAG_SKIP_WORKTREE = 0x4000
+EXT_FLAG_INTENT_TO_ADD = 0x2000
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+object_types = {
+	b'commit': OBJ_COMMIT,
+	b'tree': OBJ_TREE,
+	b'blob': OBJ_BLOB,
+	b'tag': OBJ_TAG,
+}
+
+# Attributes which make git convert line endings before hashing file contents
+CRLF_ATTRIBUTES = set((b'text', b'eol', b'crlf'))
+
+# Attributes which make git convert file contents arbitrarily
+FILTER_ATTRIBUTES = set((b'filter', b'ident', b'working-tree-encoding'))
+
+OBJECTS_CACHE_SIZE = 1024
+
+EMPTY_INDEX = b'DIRC\0\0\0\2\0\0\0\0'
+
+
+def fsencode(path):
+	if isinstance(path, bytes):
+		return path
+	return path.encode(get_preferred_file_name_encoding())
+
+
+def read_file(path):
+	'''Read file contents, return ``None`` if file does not exist
+	'''
+	try:
+		with open(path, 'rb') as f:
+			return f.read()
+	except EnvironmentError:
+		return None
+
+
+def read_offset(data, pos):
+	'''Read variable-length integer used for offsets in packs and index v4
+
+	:param bytearray data:
+		Data to read integer from.
+
+	:return: pair ``(value, new_pos)``.
+	'''
+	c = data[pos]
+	pos += 1
+	value = c & 0x7f
+	while c & 0x80:
+		c = data[pos]
+		pos += 1
+		value = ((value + 1) << 7) | (c & 0x7f)
+	return value, pos
+
+
+def read_delta_size(data, pos):
+	'''Read little-endian variable-length integer used in delta header
+	'''
+	value = 0
+	shift = 0
+	while True:
+		c = data[pos]
+		pos += 1
+		value |= (c & 0x7f) << shift
+		shift += 7
+		if not c & 0x80:
+			return value, pos
+
+
+def apply_delta(base, delta):
+	'''Reconstruct object from its base and packed delta
+	'''
+	delta = bytearray(delta)
+	src_size, pos = read_delta_size(delta, 0)
+	dst_size, pos = read_delta_size(delta, pos)
+	if src_size != len(base):
+		raise ValueError('Delta base size mismatch')
+	ret = []
+	delta_len = len(delta)
+	while pos < delta_len:
+		c = delta[pos]
+		pos += 1
+		if c & 0x80:
+			offset = 0
+			size = 0
+			for i in range(4):
+				if c & (1 << i):
+					offset |= delta[pos] << (8 * i)
+					pos += 1
+			for i in range(3):
+				if c & (0x10 << i):
+					size |= delta[pos] << (8 * i)
+					pos += 1
+			ret.append(base[offset:offset + (size or 0x10000)])
+		elif c:
+			ret.append(bytes(delta[pos:pos + c]))
+			pos += c
+		else:
+			raise ValueError('Invalid delta instruction')
+	ret = b''.join(ret)
+	if len(ret) != dst_size:
+		raise ValueError('Delta result size mismatch')
+	return ret
+
+
+def parse_tree(data):
+	'''Parse tree object
+
+	:return: dictionary mapping names to ``(mode, object_id)`` pairs.
+	'''
+	ret = {}
+	pos = 0
+	data_len = len(data)
+	while pos < data_len:
+		space = data.index(b' ', pos)
+		nul = data.index(b'\0', space)
+		ret[data[space + 1:nul]] = (int(data[pos:space], 8), data[nul + 1:nul + 21])
+		pos = nul + 21
+	return ret
+
+
+def parse_cache_tree(data):
+	'''Parse cache tree index extension
+
+	:return:
+		Dictionary mapping directory paths (``b''`` for the top directory) to
+		tree object identifiers. Only valid entries are included.
+	'''
+	ret = {}
+	stack = []
+	pos = 0
+	data_len = len(data)
+	while pos < data_len:
+		nul = data.index(b'\0', pos)
+		newline = data.index(b'\n', nul)
+		entry_count, subtree_count = data[nul + 1:newline].split(b' ')
+		if stack:
+			parent = stack[-1]
+			parent[1] -= 1
+			path = (parent[0] + b'/' if parent[0] else b'') + data[pos:nul]
+		else:
+			path = b''
+		pos = newline + 1
+		if int(entry_count) >= 0:
+			ret[path] = data[pos:pos + 20]
+			pos += 20
+		stack.append([path, int(subtree_count)])
+		while stack and stack[-1][1] <= 0:
+			stack.pop()
+	return ret
+
+
+class GitIndex(object):
+	'''Parsed git index file (versions 2, 3 and 4)
+
+	:param bytes data:
+		Index file contents.
+	:param float mtime:
+		Index file modification time, used to detect racily clean entries.
+
+	Entries are ``(ctime, mtime, ino, mode, size, object_id, flags,
+	ext_flags)`` tuples, stored in :py:attr:`entries` dictionary with paths as
+	keys. Unmerged entries are not stored, only their paths are.
+	'''
+
+	def __init__(self, data, mtime):
+		self.mtime = int(mtime)
+		self.entries = {}
+		self.unmerged = set()
+		self.has_gitlinks = False
+		self.cache_tree = {}
+		self.directories = None
+		self.sorted_paths = None
+		if data[:4] != b'DIRC':
+			raise ValueError('Not an index file')
+		version, count = struct.unpack_from(str('>II'), data, 4)
+		if version not in (2, 3, 4):
+			raise UnsupportedRepository('Unsupported index version {0}'.format(version))
+		view = bytearray(data) if version == 4 else None
+		pos = 12
+		path = b''
+		for i in range(count):
+			(
+				ctime, ctime_ns, mtime, mtime_ns, dev, ino, mode, uid, gid, size,
+				object_id, flags
+			) = INDEX_ENTRY.unpack_from(data, pos)
+			entry_start = pos
+			pos += INDEX_ENTRY.size
+			ext_flags = 0
+			if flags & FLAG_EXTENDED:
+				ext_flags, = struct.unpack_from(str('>H'), data, pos)
+				pos += 2
+			if view is not None:
+				strip, pos = read_offset(view, pos)
+				nul = data.index(b'\0', pos)
+				path = path[:len(path) - strip] + data[pos:nul]
+				pos = nul + 1
+			else:
+				nul = data.index(b'\0', pos)
+				path = data[pos:nul]
+				pos = entry_start + ((nul - entry_start + 8) & ~7)
+			if flags & FLAG_STAGE_MASK:
+				self.unmerged.add(path)
+				continue
+			if stat.S_ISDIR(mode):
+				raise UnsupportedRepository('Sparse index')
+			if mode == MODE_GITLINK:
+				self.has_gitlinks = True
+			self.entries[path] = (ctime, mtime, ino, mode, size, object_id, flags, ext_flags)
+		end = len(data) - 20
+		while pos < end:
+			signature = data[pos:pos + 4]
+			size, = struct.unpack_from(str('>I'), data, pos + 4)
+			pos += 8
+			if signature == b'TREE':
+				self.cache_tree = parse_cache_tree(data[pos:pos + size])
+			elif signature in (b'link', b'sdir'):
+				raise UnsupportedRepository('Split or sparse index')
+			elif not (b'A' <= signature[:1] <= b'Z'):
+				raise UnsupportedRepository('Unknown mandatory index extension')
+			pos += size
+
+	def get_directories(self):
+		'''Return set of directories which contain tracked files
+		'''
+		if self.directories is None:
+			ret = set()
+			for path in self.entries:
+				while b'/' in path:
+					path = path.rpartition(b'/')[0]
+					if path in ret:
+						break
+					ret.add(path)
+			self.directories = ret
+		return self.directories
+
+	def iter_paths(self, path):
+		'''Iterate over tracked paths equal to the given one or inside it
+		'''
+		if self.sorted_paths is None:
+			self.sorted_paths = sorted(self.entries)
+		paths = self.sorted_paths
+		i = bisect_left(paths, path)
+		if i < len(paths) and paths[i] == path:
+			yield path
+		prefix = path + b'/'
+		i = bisect_left(paths, prefix, i)
+		while i < len(paths) and paths[i].startswith(prefix):
+			yield paths[i]
+			i += 1
+
+
+class PackIndex(object):
+	'''Pack index file (version 2)
+	'''
+
+	def __init__(self, path):
+		with open(path, 'rb') as f:
+			self.data = f.read()
+		if self.data[:8] != b'\377tOc\0\0\0\2':
+			raise UnsupportedRepository('Unsupported pack index version')
+		self.fanout = struct.unpack_from(str('>256I'), self.data, 8)
+		self.count = self.fanout[255]
+		self.ids_start = 8 + 256 * 4
+		self.offsets_start = self.ids_start + self.count * (20 + 4)
+		self.large_offsets_start = self.offsets_start + self.count * 4
+
+	def find(self, object_id):
+		'''Return offset of the object in pack or ``None`` if it is not there
+		'''
+		first = bytearray(object_id[:1])[0]
+		lo = self.fanout[first - 1] if first else 0
+		hi = self.fanout[first]
+		data = self.data
+		start = self.ids_start
+		while lo < hi:
+			mid = (lo + hi) // 2
+			mid_id = data[start + mid * 20:start + mid * 20 + 20]
+			if mid_id < object_id:
+				lo = mid + 1
+			elif mid_id > object_id:
+				hi = mid
+			else:
+				offset, = struct.unpack_from(str('>I'), data, self.offsets_start + mid * 4)
+				if offset & 0x80000000:
+					offset, = struct.unpack_from(
+						str('>Q'), data, self.large_offsets_start + (offset & 0x7fffffff) * 8)
+				return offset
+		return None
+
+
+class GitObjects(object):
+	'''Reader of loose and packed git objects
+
+	:param bytes objects_directory:
+		Path to the ``objects`` directory.
+	'''
+
+	def __init__(self, objects_directory):
+		self.directories = [objects_directory]
+		alternates = read_file(os.path.join(objects_directory, b'info', b'alternates'))
+		if alternates:
+			for line in alternates.splitlines():
+				if line and not line.startswith(b'#'):
+					self.directories.append(os.path.join(objects_directory, line))
+		self.packs = None
+		self.packs_mtimes = None
+		self.cache = {}
+
+	def load_packs(self):
+		mtimes = []
+		for directory in self.directories:
+			try:
+				mtimes.append(os.stat(os.path.join(directory, b'pack')).st_mtime)
+			except OSError:
+				mtimes.append(None)
+		if mtimes == self.packs_mtimes:
+			return False
+		packs = []
+		for directory in self.directories:
+			pack_directory = os.path.join(directory, b'pack')
+			try:
+				names = os.listdir(pack_directory)
+			except OSError:
+				continue
+			for name in names:
+				if name.endswith(b'.idx'):
+					packs.append((
+						PackIndex(os.path.join(pack_directory, name)),
+						os.path.join(pack_directory, name[:-4] + b'.pack'),
+					))
+		self.packs = packs
+		self.packs_mtimes = mtimes
+		return True
+
+	def read(self, object_id):
+		'''Read object
+
+		:param bytes object_id:
+			Binary (20 bytes) object identifier.
+
+		:return: pair ``(type, data)``.
+		'''
+		try:
+			return self.cache[object_id]
+		except KeyError:
+			pass
+		ret = self._read(object_id)
+		if len(self.cache) >= OBJECTS_CACHE_SIZE:
+			self.cache.clear()
+		self.cache[object_id] = ret
+		return ret
+
+	def _read(self, object_id):
+		hexsha = hexlify(object_id)
+		for directory in self.directories:
+			data = read_file(os.path.join(directory, hexsha[:2], hexsha[2:]))
+			if data is not None:
+				data = zlib.decompress(data)
+				header, sep, data = data.partition(b'\0')
+				return object_types[header.partition(b' ')[0]], data
+		for reload in (False, True):
+			if (self.packs is None or reload) and not self.load_packs() and reload:
+				break
+			for pack_index, pack_path in self.packs:
+				offset = pack_index.find(object_id)
+				if offset is not None:
+					with open(pack_path, 'rb') as f:
+						return self.read_packed(f, offset)
+		raise KeyError('Object not found')
+
+	def read_packed(self, f, offset):
+		f.seek(offset)
+		header = bytearray(f.read(32))
+		c = header[0]
+		object_type = (c >> 4) & 7
+		size = c & 0x0f
+		shift = 4
+		pos = 1
+		while c & 0x80:
+			c = header[pos]
+			pos += 1
+			size |= (c & 0x7f) << shift
+			shift += 7
+		base = None
+		if object_type == OBJ_OFS_DELTA:
+			base_offset, pos = read_offset(header, pos)
+			data_offset = offset + pos
+			base = self.read_packed(f, offset - base_offset)
+		elif object_type == OBJ_REF_DELTA:
+			data_offset = offset + pos + 20
+			base = self.read(bytes(header[pos:pos + 20]))
+		else:
+			data_offset = offset + pos
+		f.seek(data_offset)
+		decompressor = zlib.decompressobj()
+		chunks = []
+		length = 0
+		while length < size or not chunks:
+			chunk = f.read(8192)
+			if not chunk:
+				break
+			chunk = decompressor.decompress(chunk)
+			chunks.append(chunk)
+			length += len(chunk)
+		data = b''.join(chunks)
+		if base is not None:
+			return base[0], apply_delta(base[1], data)
+		return object_type, data
+
+	def read_tree(self, object_id):
+		'''Read tree, commit or tag object as a tree
+
+		:return: same as :py:func:`parse_tree`.
+		'''
+		for i in range(16):
+			object_type, data = self.read(object_id)
+			if object_type == OBJ_TREE:
+				return parse_tree(data)
+			elif object_type in (OBJ_COMMIT, OBJ_TAG):
+				header = data.partition(b'\n\n')[0]
+				for line in header.split(b'\n'):
+					if line.startswith(b'tree ' if object_type == OBJ_COMMIT else b'object '):
+						object_id = unhexlify(line.partition(b' ')[2])
+						break
+				else:
+					raise ValueError('Invalid object')
+			else:
+				raise ValueError('Object is not a tree')
+		raise ValueError('Too many nested tags')
+
+	def get_tree_id(self, object_id):
+		'''Get identifier of the tree of the given commit
+		'''
+		object_type, data = self.read(object_id)
+		if object_type != OBJ_COMMIT:
+			raise ValueError('Object is not a commit')
+		return unhexlify(data[5:45])
+
+
+def read_config(paths):
+	'''Read git configuration files
+
+	Only simple ``key = value`` lines are supported, includes are ignored.
+
+	:return:
+		Dictionary mapping lowercase ``section.key`` (``section.subsection.key``
+		for sections with subsections) to the last value.
+	'''
+	ret = {}
+	for path in paths:
+		data = read_file(path)
+		if not data:
+			continue
+		section = b''
+		for line in data.splitlines():
+			line = line.strip()
+			if not line or line[:1] in b'#;':
+				continue
+			if line.startswith(b'['):
+				header = line[1:line.index(b']')]
+				name, sep, subsection = header.partition(b' ')
+				section = name.lower()
+				if subsection:
+					section += b'.' + subsection.strip().strip(b'"')
+				continue
+			key, sep, value = line.partition(b'=')
+			value = value.strip()
+			if value.startswith(b'"'):
+				value = value[1:value.rindex(b'"')] if value.count(b'"') > 1 else value[1:]
+			else:
+				value = re.split(br'\s[#;]', value)[0].strip()
+			ret[section + b'.' + key.strip().lower()] = value if sep else b'true'
+	return ret
+
+
+def get_attribute_names(data):
+	'''Get names of all attributes used in gitattributes file
+	'''
+	ret = set()
+	for line in data.splitlines():
+		line = line.strip()
+		if not line or line.startswith(b'#'):
+			continue
+		for attribute in line.split()[1:]:
+			ret.add(attribute.lstrip(b'-!').partition(b'=')[0])
+	return ret
+
+
+def config_bool(value, default):
+	if value is None:
+		return default
+	return value.lower() in (b'true', b'yes', b'on', b'1')
+
+
+def glob_to_regex(pattern):
+	'''Translate gitignore glob pattern (without leading slash) to regex
+	'''
+	ret = []
+	i = 0
+	n = len(pattern)
+	while i < n:
+		c = pattern[i]
+		i += 1
+		if c == '*':
+			if pattern[i:i + 1] == '*' and (i == 1 or pattern[i - 2] == '/'):
+				if i + 1 == n:
+					ret.append('.*')
+					i += 1
+					continue
+				elif pattern[i + 1] == '/':
+					ret.append('(?:.*/)?')
+					i += 2
+					continue
+			while pattern[i:i + 1] == '*':
+				i += 1
+			ret.append('[^/]*')
+		elif c == '?':
+			ret.append('[^/]')
+		elif c == '[':
+			j = i
+			if pattern[j:j + 1] in ('!', '^'):
+				j += 1
+			if pattern[j:j + 1] == ']':
+				j += 1
+			j = pattern.find(']', j)
+			if j == -1:
+				ret.append('\\[')
+			else:
+				chars = pattern[i:j]
+				i = j + 1
+				if chars[:1] in ('!', '^'):
+					chars = '^' + chars[1:]
+				ret.append('[' + chars.replace('\\', '\\\\') + ']')
+		elif c == '\\' and i < n:
+			ret.append(re.escape(pattern[i]))
+			i += 1
+		else:
+			ret.append(re.escape(c))
+	return ''.join(ret)
+
+
+def parse_ignore_file(data, base):
+	'''Parse gitignore file
+
+	:param bytes base:
+		Directory containing ignore file, relative to the work tree. Empty for
+		global and repository-wide ignore files.
+
+	:return:
+		List of ``(regex, negate, directory_only, basename_only)`` tuples.
+		Patterns must be matched against paths decoded from latin1.
+	'''
+	ret = []
+	if not data:
+		return ret
+	base = base.decode('latin1')
+	for line in data.decode('latin1').splitlines():
+		if not line or line.startswith('#'):
+			continue
+		while line.endswith(' ') and not line.endswith('\\ '):
+			line = line[:-1]
+		negate = line.startswith('!')
+		if negate:
+			line = line[1:]
+		elif line.startswith('\\!') or line.startswith('\\#'):
+			line = line[1:]
+		directory_only = line.endswith('/')
+		line = line.rstrip('/')
+		if not line:
+			continue
+		basename_only = '/' not in line
+		line = line.lstrip('/')
+		regex = glob_to_regex(line)
+		if not basename_only and base:
+			regex = re.escape(base + '/') + regex
+		ret.append((re.compile('^' + regex + '$', re.DOTALL), negate, directory_only, basename_only))
+	return ret
+
+
+class IgnoreRules(object):
+	'''Matcher of paths against gitignore(5) patterns
+
+	:param bytes work_tree:
+		Work tree directory.
+	:param list base_patterns:
+		Patterns from the global excludes file and ``info/exclude``, in the
+		order of increasing precedence.
+	'''
+
+	def __init__(self, work_tree, base_patterns):
+		self.work_tree = work_tree
+		self.base_patterns = base_patterns
+		self.directory_patterns = {}
+
+	def get_directory_patterns(self, directory):
+		try:
+			return self.directory_patterns[directory]
+		except KeyError:
+			patterns = self.directory_patterns[directory] = parse_ignore_file(
+				read_file(os.path.join(self.work_tree, directory, b'.gitignore')), directory)
+			return patterns
+
+	def match(self, path, is_directory):
+		'''Check whether path itself is ignored, ignoring its parents
+		'''
+		directory = path.rpartition(b'/')[0]
+		lists = [self.base_patterns, self.get_directory_patterns(b'')]
+		if directory:
+			parts = directory.split(b'/')
+			for i in range(1, len(parts) + 1):
+				lists.append(self.get_directory_patterns(b'/'.join(parts[:i])))
+		decoded_path = path.decode('latin1')
+		basename = decoded_path.rpartition('/')[2]
+		for patterns in reversed(lists):
+			for regex, negate, directory_only, basename_only in reversed(patterns):
+				if directory_only and not is_directory:
+					continue
+				if regex.match(basename if basename_only else decoded_path):
+					return not negate
+		return False
+
+	def is_ignored(self, path, is_directory):
+		'''Check whether path or any of its parent directories is ignored
+		'''
+		parts = path.split(b'/')
+		for i in range(1, len(parts)):
+			if self.match(b'/'.join(parts[:i]), True):
+				return True
+		return self.match(path, is_directory)
+
+
+def lexists(path):
+	try:
+		return os.lstat(path)
+	except OSError:
+		return None
+
+
+class GitStatusReader(object):
+	'''Status reader of one repository
+
+	:param bytes work_tree:
+		Work tree (top-level directory of the repository).
+	:param bytes git_directory:
+		Repository (``.git``) directory.
+	'''
+
+	def __init__(self, work_tree, git_directory):
+		self.work_tree = work_tree
+		self.git_directory = git_directory
+		common_directory = read_file(os.path.join(git_directory, b'commondir'))
+		if common_directory:
+			common_directory = os.path.join(git_directory, common_directory.strip())
+		else:
+			common_directory = git_directory
+		self.common_directory = common_directory
+		home = os.path.expanduser(b'~')
+		xdg_config_home = fsencode(os.environ.get('XDG_CONFIG_HOME', '')) or os.path.join(home, b'.config')
+		config = read_config((
+			os.path.join(xdg_config_home, b'git', b'config'),
+			os.path.join(home, b'.gitconfig'),
+			os.path.join(common_directory, b'config'),
+		))
+		if (
+			config.get(b'extensions.objectformat', b'sha1').lower() != b'sha1'
+			or config.get(b'extensions.refstorage', b'files').lower() != b'files'
+			or config_bool(config.get(b'extensions.worktreeconfig'), False)
+		):
+			raise UnsupportedRepository('Unsupported repository extension')
+		self.check_filemode = config_bool(config.get(b'core.filemode'), True)
+		show_untracked = config.get(b'status.showuntrackedfiles', b'normal')
+		if show_untracked not in (b'no', b'normal', b'all'):
+			raise UnsupportedRepository('Unsupported status.showUntrackedFiles value')
+		self.show_untracked = show_untracked != b'no'
+		attributes = (
+			(read_file(os.path.join(work_tree, b'.gitattributes')) or b'')
+			+ (read_file(os.path.join(common_directory, b'info', b'attributes')) or b'')
+		)
+		attribute_names = get_attribute_names(attributes)
+		self.filters = bool(attribute_names & FILTER_ATTRIBUTES)
+		self.crlf = bool(
+			attribute_names & CRLF_ATTRIBUTES
+			or config.get(b'core.autocrlf', b'false').lower() not in (b'false', b'no', b'off', b'0')
+		)
+		excludes_file = config.get(b'core.excludesfile')
+		if excludes_file:
+			if excludes_file.startswith(b'~/'):
+				excludes_file = os.path.join(home, excludes_file[2:])
+		else:
+			excludes_file = os.path.join(xdg_config_home, b'git', b'ignore')
+		self.base_ignore_patterns = (
+			parse_ignore_file(read_file(excludes_file), b'')
+			+ parse_ignore_file(read_file(os.path.join(common_directory, b'info', b'exclude')), b'')
+		)
+		self.objects = get_objects(os.path.join(common_directory, b'objects'))
+
+	def resolve_ref(self, ref):
+		'''Resolve reference to the binary object identifier
+
+		:return: object identifier or ``None`` if reference does not exist.
+		'''
+		for i in range(8):
+			for directory in (self.git_directory, self.common_directory):
+				data = read_file(os.path.join(directory, *ref.split(b'/')))
+				if data is not None:
+					break
+			else:
+				data = None
+				packed_refs = read_file(os.path.join(self.common_directory, b'packed-refs')) or b''
+				for line in packed_refs.splitlines():
+					if line.endswith(b' ' + ref) and line[:1] not in b'#^':
+						data = line.partition(b' ')[0]
+						break
+				if data is None:
+					return None
+			data = data.strip()
+			if data.startswith(b'ref:'):
+				ref = data[4:].strip()
+			else:
+				return unhexlify(data[:40])
+		raise ValueError('Too deeply nested symbolic references')
+
+	def get_head_tree_id(self):
+		'''Get identifier of the ``HEAD`` tree, ``None`` for unborn branch
+		'''
+		head = self.resolve_ref(b'HEAD')
+		if head is None:
+			return None
+		return self.objects.get_tree_id(head)
+
+	def get_head_entry(self, path):
+		'''Get ``(mode, object_id)`` pair of the path in ``HEAD`` tree
+
+		:return: pair or ``None`` if there is no such path.
+		'''
+		tree_id = self.get_head_tree_id()
+		if tree_id is None:
+			return None
+		parts = path.split(b'/')
+		for part in parts[:-1]:
+			entry = self.objects.read_tree(tree_id).get(part)
+			if entry is None or not stat.S_ISDIR(entry[0]):
+				return None
+			tree_id = entry[1]
+		entry = self.objects.read_tree(tree_id).get(parts[-1])
+		if entry is not None and stat.S_ISDIR(entry[0]):
+			return None
+		return entry
+
+	def hash_file(self, full_path, st):
+		'''Compute blob object identifier of the work tree file
+
+		:return:
+			Pair ``(object_id, has_cr)``, second item is true if file contains
+			carriage return characters.
+		'''
+		if stat.S_ISLNK(st.st_mode):
+			data = os.readlink(full_path)
+			return sha1(b'blob ' + str(len(data)).encode('ascii') + b'\0' + data).digest(), False
+		h = sha1(b'blob ' + str(st.st_size).encode('ascii') + b'\0')
+		has_cr = False
+		with open(full_path, 'rb') as f:
+			while True:
+				chunk = f.read(65536)
+				if not chunk:
+					break
+				h.update(chunk)
+				has_cr = has_cr or b'\r' in chunk
+		return h.digest(), has_cr
+
+	def get_worktree_status(self, index, path, entry):
+		'''Compare work tree file with index entry
+
+		:return: ``None`` if file is not changed, one of ``M``, ``D``, ``T``.
+		'''
+		ctime, mtime, ino, mode, size, object_id, flags, ext_flags = entry
+		if flags & FLAG_ASSUME_VALID or ext_flags & EXT_FLAG_SKIP_WORKTREE:
+			return None
+		if mode == MODE_GITLINK:
+			raise UnsupportedRepository('Submodules')
+		full_path = os.path.join(self.work_tree, path)
+		st = lexists(full_path)
+		if st is None or stat.S_ISDIR(st.st_mode):
+			return 'D'
+		if stat.S_ISLNK(st.st_mode) != (mode == MODE_SYMLINK):
+			return 'T'
+		if (
+			self.check_filemode
+			and mode != MODE_SYMLINK
+			and (st.st_mode & 0o100) != (mode & 0o100)
+		):
+			return 'M'
+		if (
+			int(st.st_mtime) == mtime
+			and int(st.st_ctime) == ctime
+			and st.st_size & 0xffffffff == size
+			and st.st_ino & 0xffffffff == ino
+			and mtime < index.mtime
+		):
+			return None
+		if self.filters:
+			# Contents are converted before hashing.
+			raise UnsupportedRepository('Content filters')
+		if not self.crlf and st.st_size & 0xffffffff != size:
+			return 'M'
+		object_id_found, has_cr = self.hash_file(full_path, st)
+		if object_id_found == object_id:
+			return None
+		if self.crlf and has_cr:
+			# Line endings may be converted before hashing.
+			raise UnsupportedRepository('Line endings conversion')
+		return 'M'
+
+	def get_index_head_differs(self, index):
+		'''Check whether index differs from ``HEAD``
+		'''
+		tree_id = self.get_head_tree_id()
+		if tree_id is None:
+			# Files added with ``git add -N`` are not yet staged.
+			return any((
+				not entry[7] & EXT_FLAG_INTENT_TO_ADD
+				for entry in index.entries.values()
+			))
+		cache_tree = index.cache_tree
+		if cache_tree.get(b'') == tree_id:
+			return False
+		head_entries = {}
+		verified = set()
+		trees = [(b'', tree_id)]
+		while trees:
+			directory, tree_id = trees.pop()
+			for name, (mode, object_id) in self.objects.read_tree(tree_id).items():
+				path = directory + b'/' + name if directory else name
+				if stat.S_ISDIR(mode):
+					if cache_tree.get(path) == object_id:
+						verified.add(path)
+					else:
+						trees.append((path, object_id))
+				else:
+					head_entries[path] = (mode, object_id)
+		for path, entry in index.entries.items():
+			if entry[7] & EXT_FLAG_INTENT_TO_ADD:
+				continue
+			if verified:
+				directory = path.rpartition(b'/')[0]
+				while directory and directory not in verified:
+					directory = directory.rpartition(b'/')[0]
+				if directory:
+					continue
+			if head_entries.pop(path, None) != (entry[3], entry[5]):
+				return True
+		return bool(head_entries)
+
+	def is_dirty(self, index, path, entry):
+		'''Check whether work tree file differs from index entry
+		'''
+		return bool(entry[7] & EXT_FLAG_INTENT_TO_ADD or self.get_worktree_status(index, path, entry))
+
+	def iter_untracked(self, index, paths=(b'',)):
+		'''Iterate over untracked files which are not ignored
+
+		:param paths:
+			Paths relative to the work tree to search in, directories are 
+			searched recursively. Empty path means the whole work tree. Paths 
+			must not be inside untracked directories.
+
+		Nested repositories are yielded as a whole, like untracked files. 
+		Nothing is yielded if untracked files are not shown 
+		(``status.showUntrackedFiles`` is ``no``).
+		'''
+		if not self.show_untracked:
+			return
+		ignore_rules = IgnoreRules(self.work_tree, self.base_ignore_patterns)
+		tracked_directories = index.get_directories()
+		entries = index.entries
+		# Candidates are ``(path, parent_ignored)`` pairs: untracked files in 
+		# ignored tracked directories are ignored as well.
+		candidates = []
+		for path in paths:
+			parent = path.rpartition(b'/')[0]
+			candidates.append((path, bool(parent) and ignore_rules.is_ignored(parent, True)))
+		directories = []
+		while candidates or directories:
+			if not candidates:
+				directory, tracked, ignored = directories.pop()
+				try:
+					names = os.listdir(os.path.join(self.work_tree, directory))
+				except OSError:
+					continue
+				if not tracked and b'.git' in names:
+					# Nested repository
+					yield directory
+					continue
+				candidates = [
+					(directory + b'/' + name if directory else name, ignored)
+					for name in names
+					if directory or name != b'.git'
+				]
+				continue
+			path, parent_ignored = candidates.pop()
+			if not path:
+				directories.append((path, True, False))
+				continue
+			if path in entries or path in index.unmerged:
+				continue
+			st = lexists(os.path.join(self.work_tree, path))
+			if st is None:
+				continue
+			is_directory = stat.S_ISDIR(st.st_mode)
+			if is_directory and path in tracked_directories:
+				directories.append((
+					path, True, parent_ignored or ignore_rules.match(path, True)))
+			elif not parent_ignored and not ignore_rules.match(path, is_directory):
+				if is_directory:
+					directories.append((path, False, False))
+				else:
+					yield path
+
+	def get_untracked_root(self, index, path):
+		'''Get the topmost directory containing path which has no tracked files
+
+		:return: path itself if all its parent directories have tracked files.
+		'''
+		tracked_directories = index.get_directories()
+		directory = b''
+		for part in path.split(b'/')[:-1]:
+			directory = directory + b'/' + part if directory else part
+			if directory not in tracked_directories:
+				return directory
+		return path
+
+	def get_tree_status(self):
+		'''Get repository status
+
+		:return: same as ``Repository.status()`` without arguments.
+		'''
+		index = get_index(self.git_directory)
+		if index.has_gitlinks:
+			raise UnsupportedRepository('Submodules')
+		index_column = 'I' if index.unmerged or self.get_index_head_differs(index) else ' '
+		wt_column = ' '
+		if index.unmerged:
+			wt_column = 'D'
+		else:
+			for path, entry in index.entries.items():
+				if self.is_dirty(index, path, entry):
+					wt_column = 'D'
+					break
+		untracked_column = 'U' if next(self.iter_untracked(index), None) is not None else ' '
+		r = wt_column + index_column + untracked_column
+		return r if r != '   ' else None
+
+	def get_tree_state(self, state=None, changed_paths=None):
+		'''Get data needed to compute repository status
+
+		:param TreeState state:
+			State returned by the previous call or ``None``.
+		:param changed_paths:
+			Set of paths (relative to the work tree, with ``/`` as a separator) 
+			changed since the previous call or ``None`` if unknown.
+
+		Only changed paths are checked again unless index changed or changed 
+		paths may affect status of other paths (e.g. ``.gitignore`` files).
+
+		:return: :py:class:`TreeState` instance.
+		'''
+		index = get_index(self.git_directory)
+		if index.has_gitlinks:
+			raise UnsupportedRepository('Submodules')
+		head = self.resolve_ref(b'HEAD')
+		if state is None or changed_paths is None or state.index is not index:
+			return self.get_full_tree_state(index, head)
+		for path in changed_paths:
+			if path in (b'.', b'.git', b'.git/config', b'.git/info') or path.startswith(b'.git/info/'):
+				return self.get_full_tree_state(index, head)
+			if path.rpartition(b'/')[2] in (b'.gitignore', b'.gitattributes'):
+				return self.get_full_tree_state(index, head)
+		state = state.copy()
+		if head != state.head:
+			state.head = head
+			state.index_differs = bool(index.unmerged) or self.get_index_head_differs(index)
+		for path in changed_paths:
+			if path.startswith(b'.git/'):
+				continue
+			if not index.unmerged:
+				for tracked_path in index.iter_paths(path):
+					if self.is_dirty(index, tracked_path, index.entries[tracked_path]):
+						state.modified.add(tracked_path)
+					else:
+						state.modified.discard(tracked_path)
+			root = self.get_untracked_root(index, path)
+			prefix = root + b'/'
+			state.untracked.difference_update([
+				untracked_path for untracked_path in state.untracked
+				if untracked_path == root or untracked_path.startswith(prefix)
+			])
+			state.untracked.update(self.iter_untracked(index, (root,)))
+		return state
+
+	def get_full_tree_state(self, index, head):
+		modified = set()
+		if not index.unmerged:
+			# With unmerged paths work tree is always reported as dirty.
+			for path, entry in index.entries.items():
+				if self.is_dirty(index, path, entry):
+					modified.add(path)
+		return TreeState(
+			index=index,
+			head=head,
+			index_differs=bool(index.unmerged) or self.get_index_head_differs(index),
+			modified=modified,
+			untracked=set(self.iter_untracked(index)),
+		)
+
+	def get_file_status(self, path):
+		'''Get status of the file
+
+		:param bytes path:
+			Path relative to the work tree, with ``/`` as a separator.
+
+		:return: same as ``Repository.status(path)``.
+		'''
+		index = get_index(self.git_directory)
+		if path in index.unmerged:
+			raise UnsupportedRepository('Unmerged file')
+		entry = index.entries.get(path)
+		head_entry = self.get_head_entry(path)
+		if entry is None:
+			if head_entry is not None:
+				return 'D '
+			st = lexists(os.path.join(self.work_tree, path))
+			if st is None:
+				return None
+			if not self.show_untracked:
+				return None
+			ignore_rules = IgnoreRules(self.work_tree, self.base_ignore_patterns)
+			if ignore_rules.is_ignored(path, stat.S_ISDIR(st.st_mode)):
+				return '!!'
+			return '??'
+		if entry[7] & EXT_FLAG_INTENT_TO_ADD:
+			return ' A'
+		if head_entry is None:
+			index_status = 'A'
+		elif head_entry == (entry[3], entry[5]):
+			index_status = ' '
+		elif stat.S_IFMT(head_entry[0]) != stat.S_IFMT(entry[3]):
+			index_status = 'T'
+		else:
+			index_status = 'M'
+		r = index_status + (self.get_worktree_status(index, path, entry) or ' ')
+		return r if r != '  ' else None
+
+
+class TreeState(object):
+	'''Data used to update repository status incrementally
+
+	:param GitIndex index:
+		Index the state was computed for.
+	:param bytes head:
+		Identifier of the ``HEAD`` commit.
+	:param bool index_differs:
+		True if index differs from ``HEAD``.
+	:param set modified:
+		Tracked paths which differ from the index.
+	:param set untracked:
+		Untracked files and nested repositories which are not ignored.
+	'''
+	__slots__ = ('index', 'head', 'index_differs', 'modified', 'untracked')
+
+	def __init__(self, index, head, index_differs, modified, untracked):
+		self.index = index
+		self.head = head
+		self.index_differs = index_differs
+		self.modified = modified
+		self.untracked = untracked
+
+	def copy(self):
+		return TreeState(
+			self.index, self.head, self.index_differs,
+			set(self.modified), set(self.untracked))
+
+	@property
+	def status(self):
+		r = (
+			('D' if self.index.unmerged or self.modified else ' ')
+			+ ('I' if self.index_differs else ' ')
+			+ ('U' if self.untracked else ' ')
+		)
+		return r if r != '   ' else None
+
+
+CACHE_SIZE = 16
+
+index_cache = {}
+objects_cache = {}
+cache_lock = Lock()
+
+
+def get_index(git_directory):
+	'''Get parsed index of the repository
+
+	Index is parsed again only when index file changes.
+	'''
+	index_path = os.path.join(git_directory, b'index')
+	try:
+		st = os.stat(index_path)
+	except OSError:
+		return GitIndex(EMPTY_INDEX, 0)
+	key = (st.st_mtime, st.st_size, st.st_ino)
+	cached = index_cache.get(index_path)
+	if cached is not None and cached[0] == key:
+		return cached[1]
+	with open(index_path, 'rb') as f:
+		index = GitIndex(f.read(), st.st_mtime)
+	with cache_lock:
+		if len(index_cache) >= CACHE_SIZE:
+			index_cache.clear()
+		index_cache[index_path] = (key, index)
+	return index
+
+
+def get_objects(objects_directory):
+	'''Get objects reader for the given objects directory
+
+	Readers are reused, so objects are cached between calls.
+	'''
+	with cache_lock:
+		try:
+			return objects_cache[objects_directory]
+		except KeyError:
+			if len(objects_cache) >= CACHE_SIZE:
+				objects_cache.clear()
+			objects = objects_cache[objects_directory] = GitObjects(objects_directory)
+			return objects
+
+
+def get_status(directory, git_directory, path=None):
+	'''Get status of the repository or of the file in it without running git
+
+	:param directory:
+		Work tree directory.
+	:param git_directory:
+		Repository directory (see ``powerline.lib.vcs.git.git_directory``).
+	:param path:
+		File path, relative to the work tree or absolute.
+
+	:return: same as ``Repository.status()``.
+
+	:raise UnsupportedRepository:
+		If repository status cannot be determined without running git.
+	'''
+	work_tree = fsencode(directory)
+	reader = GitStatusReader(work_tree, fsencode(git_directory))
+	if not path:
+		return reader.get_tree_status()
+	path = fsencode(path)
+	if os.path.isabs(path):
+		path = os.path.relpath(path, work_tree)
+	path = os.path.normpath(path)
+	if path.startswith(b'..' + os.sep.encode('ascii')) or path in (b'.', b'..'):
+		return None
+	return reader.get_file_status(path.replace(os.sep.encode('ascii'), b'/'))
+
+
+def get_incremental_status(directory, git_directory, state=None, changed_paths=None):
+	'''Get repository status updating the result of the previous call
+
+	:param directory:
+		Work tree directory.
+	:param git_directory:
+		Repository directory (see ``powerline.lib.vcs.git.git_directory``).
+	:param TreeState state:
+		State returned by the previous call or ``None``.
+	:param changed_paths:
+		Absolute paths changed since the previous call (e.g. reported by the 
+		tree watcher) or ``None`` if it is not known which paths have changed.
+
+	:return:
+		Pair ``(status, state)``, where status is the same as returned by 
+		``Repository.status()`` and state is to be passed to the next call.
+
+	:raise UnsupportedRepository:
+		If repository status cannot be determined without running git.
+	'''
+	work_tree = fsencode(directory)
+	reader = GitStatusReader(work_tree, fsencode(git_directory))
+	if changed_paths is not None:
+		real_work_tree = os.path.realpath(work_tree)
+		sep = os.sep.encode('ascii')
+		paths = set()
+		for path in changed_paths:
+			path = os.path.relpath(fsencode(path), real_work_tree)
+			if path != b'..' and not path.startswith(b'..' + sep):
+				paths.add(path.replace(sep, b'/'))
+		changed_paths = paths
+	state = reader.get_tree_state(state, changed_paths)
+	return state.status, state
@@ -61,16 +61,24 @@ def create_file_watcher(pl, watcher_type='auto', expire_time=10):
 	return StatFileWatcher()
 
 
-def create_tree_watcher(pl, watcher_type='auto', expire_time=10):
+def create_tree_watcher(pl, watcher_type='auto', expire_time=10, max_trees=0, max_directories=0):
 	'''Create an object that can watch for changes in specified directories
 
 	:param PowerlineLogger pl:
 		Logger.
 	:param str watcher_type:
 		Watcher type. Currently the only supported types are ``inotify`` (linux 
-		only), ``uv``, ``dummy`` and ``auto``.
+		only), ``uv``, ``stat``, ``dummy`` and ``auto``.
 	:param int expire_time:
-		Number of minutes since last ``.__call__()`` before inotify watcher will 
-		stop watching given file.
+		Number of minutes since last ``.__call__()`` before watcher will stop 
+		watching given directory tree, releasing all its resources.
+	:param int max_trees:
+		Maximum number of watched trees. When there are more least recently 
+		queried trees are not watched. Zero means no limit.
+	:param int max_directories:
+		Maximum number of directories watched by inotify watcher. When there are 
+		more least recently queried trees are not watched. Tree which alone has 
+		more directories is polled using ``stat`` watcher instead. Zero means no 
+		limit.
 	'''
-	return TreeWatcher(pl, watcher_type, expire_time)
+	return TreeWatcher(pl, watcher_type, expire_time, max_trees, max_directories)
@@ -11,6 +11,11 @@ from powerline.lib.inotify import INotify
 from powerline.lib.monotonic import monotonic
 from powerline.lib.path import realpath
 
+try:
+	from os import scandir
+except ImportError:
+	scandir = None
+
 
 class INotifyFileWatcher(INotify):
 	def __init__(self, expire_time=10):
@@ -150,68 +155,120 @@ class DirTooLarge(ValueError):
 		ValueError.__init__(self, 'The directory {0} is too large to monitor. Try increasing the value in /proc/sys/fs/inotify/max_user_watches'.format(bdir))
 
 
-class INotifyTreeWatcher(INotify):
-	is_dummy = False
+class INotifyTreeWatches(INotify):
+	'''inotify instance shared by all tree watchers
 
-	def __init__(self, basedir, ignore_event=None):
-		super(INotifyTreeWatcher, self).__init__()
-		self.basedir = realpath(basedir)
-		self.watch_tree()
-		self.modified = True
-		self.ignore_event = (lambda path, name: False) if ignore_event is None else ignore_event
+	Each directory is watched only once, even if it belongs to several 
+	(nested) trees: events are dispatched to all tree watchers which contain 
+	the directory.
+	'''
 
-	def watch_tree(self):
+	def __init__(self):
+		super(INotifyTreeWatches, self).__init__()
+		self.lock = RLock()
 		self.watched_dirs = {}
 		self.watched_rmap = {}
-		try:
-			self.add_watches(self.basedir)
-		except OSError as e:
-			if e.errno == errno.ENOSPC:
-				raise DirTooLarge(self.basedir)
+		self.watchers = {}
+		self.trees = set()
+
+	def add_tree(self, watcher):
+		'''Start watching the tree of the given tree watcher
+
+		:raise NoSuchDir: if base directory is not available.
+		:raise DirTooLarge: if inotify watches limit was reached.
+		'''
+		with self.lock:
+			self.trees.add(watcher)
+			try:
+				self.add_watches((watcher,), watcher.basedir, top_level=True)
+			except OSError as e:
+				self.remove_tree(watcher)
+				if e.errno == errno.ENOSPC:
+					raise DirTooLarge(watcher.basedir)
+				raise
+			except NoSuchDir:
+				self.remove_tree(watcher)
+				raise
+
+	def remove_tree(self, watcher):
+		'''Stop watching the tree of the given tree watcher
+
+		Directories are unwatched unless they belong to other trees.
+		'''
+		with self.lock:
+			self.trees.discard(watcher)
+			for wd in watcher.wds:
+				watchers = self.watchers.get(wd)
+				if watchers is None:
+					continue
+				watchers.discard(watcher)
+				if not watchers:
+					self.remove_wd(wd)
+					# Result is ignored: the watch may already be removed by 
+					# the kernel if directory was deleted.
+					self._rm_watch(self._inotify_fd, wd)
+			watcher.wds.clear()
+
+	def remove_wd(self, wd):
+		self.watchers.pop(wd, None)
+		path = self.watched_rmap.pop(wd, None)
+		if self.watched_dirs.get(path) == wd:
+			del self.watched_dirs[path]
 
-	def add_watches(self, base, top_level=True):
-		''' Add watches for this directory and all its descendant directories,
-		recursively. '''
+	def add_watches(self, watchers, base, top_level=False):
+		'''Add watches for this directory and all its descendant directories
+
+		Directories are traversed iteratively, without following symbolic 
+		links.
+		'''
 		base = realpath(base)
-		# There may exist a link which leads to an endless
-		# add_watches loop or to maximum recursion depth exceeded
-		if not top_level and base in self.watched_dirs:
-			return
 		try:
-			is_dir = self.add_watch(base)
+			wd = self.add_watch(watchers, base)
 		except OSError as e:
-			if e.errno == errno.ENOENT:
-				# The entry could have been deleted between listdir() and
-				# add_watch().
-				if top_level:
-					raise NoSuchDir('The dir {0} does not exist'.format(base))
-				return
-			if e.errno == errno.EACCES:
-				# We silently ignore entries for which we don't have permission,
-				# unless they are the top level dir
+			if e.errno in (errno.ENOENT, errno.EACCES):
+				# The entry could have been deleted before add_watch(). Entries 
+				# for which we don't have permission are silently ignored, 
+				# unless they are the top level dir.
 				if top_level:
-					raise NoSuchDir('You do not have permission to monitor {0}'.format(base))
+					raise NoSuchDir('The dir {0} does not exist or is not accessible'.format(base))
 				return
 			raise
-		else:
-			if is_dir:
-				try:
-					files = os.listdir(base)
-				except OSError as e:
-					if e.errno in (errno.ENOTDIR, errno.ENOENT):
-						# The dir was deleted/replaced between the add_watch()
-						# and listdir()
-						if top_level:
-							raise NoSuchDir('The dir {0} does not exist'.format(base))
-						return
-					raise
-				for x in files:
-					self.add_watches(os.path.join(base, x), top_level=False)
-			elif top_level:
+		if wd is None:
+			if top_level:
 				# The top level dir is a file, not good.
 				raise NoSuchDir('The dir {0} does not exist'.format(base))
+			return
+		# There may exist a bind mount which leads to an endless loop
+		visited = set((wd,))
+		directories = [base]
+		while directories:
+			directory = directories.pop()
+			try:
+				subdirectories = list_subdirectories(directory)
+			except OSError as e:
+				if e.errno in (errno.ENOTDIR, errno.ENOENT, errno.EACCES):
+					# The dir was deleted/replaced between the add_watch() and 
+					# listing.
+					if top_level and directory is base:
+						raise NoSuchDir('The dir {0} does not exist'.format(base))
+					continue
+				raise
+			for path in subdirectories:
+				try:
+					wd = self.add_watch(watchers, path)
+				except OSError as e:
+					if e.errno not in (errno.ENOENT, errno.EACCES):
+						raise
+				else:
+					if wd is not None and wd not in visited:
+						visited.add(wd)
+						directories.append(path)
+
+	def add_watch(self, watchers, path):
+		'''Watch one directory for the given tree watchers
 
-	def add_watch(self, path):
+		:return: watch descriptor or ``None`` if path is not a directory.
+		'''
 		bpath = path if isinstance(path, bytes) else path.encode(self.fenc)
 		wd = self._add_watch(
 			self._inotify_fd,
@@ -227,42 +284,154 @@ class INotifyTreeWatcher(INotify):
 		if wd == -1:
 			eno = ctypes.get_errno()
 			if eno == errno.ENOTDIR:
-				return False
+				return None
 			raise OSError(eno, 'Failed to add watch for: {0}: {1}'.format(path, self.os.strerror(eno)))
-		self.watched_dirs[path] = wd
-		self.watched_rmap[wd] = path
-		return True
+		# Kernel returns the same watch descriptor for the same directory, 
+		# possibly reached by a different path.
+		old_path = self.watched_rmap.get(wd)
+		if old_path != path:
+			if old_path is not None and self.watched_dirs.get(old_path) == wd:
+				del self.watched_dirs[old_path]
+			self.watched_dirs[path] = wd
+			self.watched_rmap[wd] = path
+		self.watchers.setdefault(wd, set()).update(watchers)
+		for watcher in watchers:
+			watcher.wds.add(wd)
+		return wd
 
 	def process_event(self, wd, mask, cookie, name):
 		if wd == -1 and (mask & self.Q_OVERFLOW):
 			# We missed some INOTIFY events, so we don't
 			# know the state of any tracked dirs.
-			self.watch_tree()
-			self.modified = True
+			for watcher in self.trees:
+				watcher.overflow()
 			return
 		path = self.watched_rmap.get(wd, None)
-		if path is not None:
-			if not self.ignore_event(path, name):
-				self.modified = True
-			if mask & self.CREATE:
-				# A new sub-directory might have been created, monitor it.
-				try:
-					if not isinstance(path, bytes):
-						name = name.decode(self.fenc)
-					self.add_watch(os.path.join(path, name))
-				except OSError as e:
-					if e.errno == errno.ENOENT:
-						# Deleted before add_watch()
-						pass
-					elif e.errno == errno.ENOSPC:
-						raise DirTooLarge(self.basedir)
-					else:
-						raise
-			if (mask & self.DELETE_SELF or mask & self.MOVE_SELF) and path == self.basedir:
-				raise BaseDirChanged('The directory %s was moved/deleted' % path)
+		if path is None:
+			return
+		watchers = tuple(self.watchers.get(wd, ()))
+		if name and not isinstance(path, bytes):
+			name = name.decode(self.fenc)
+		for watcher in watchers:
+			watcher.process_event(path, mask, name)
+		if mask & (self.CREATE | self.MOVED_TO) and mask & self.ISDIR:
+			# A new sub-directory might have been created (or moved in), 
+			# monitor it and everything that was already created inside.
+			try:
+				self.add_watches(watchers, os.path.join(path, name))
+			except OSError as e:
+				if e.errno != errno.ENOSPC:
+					raise
+				for watcher in watchers:
+					watcher.too_large = True
+		if mask & self.IGNORED:
+			# Directory was deleted, kernel removed the watch.
+			for watcher in watchers:
+				watcher.wds.discard(wd)
+			self.remove_wd(wd)
+
+
+def list_subdirectories(directory):
+	'''List paths of subdirectories, not following symbolic links
+	'''
+	if scandir is None:
+		# Non-directories are filtered out by add_watch().
+		return [os.path.join(directory, name) for name in os.listdir(directory)]
+	ret = []
+	for entry in scandir(directory):
+		try:
+			if entry.is_dir(follow_symlinks=False):
+				ret.append(entry.path)
+		except OSError:
+			pass
+	return ret
+
+
+class INotifyTreeWatcher(object):
+	'''Watcher of one directory tree
+
+	:param str basedir:
+		Tree base directory.
+	:param function ignore_event:
+		Function which receives directory path and entry name and returns true 
+		if the event is not to be reported.
+	:param INotifyTreeWatches watches:
+		Shared inotify instance. Private instance is created if not given.
+	'''
+	is_dummy = False
+
+	max_changed_paths = 10000
+	'''Maximum number of remembered changed paths
+
+	When more paths are changed they are forgotten and the whole tree is 
+	considered changed.
+	'''
+
+	def __init__(self, basedir, ignore_event=None, watches=None):
+		self.basedir = realpath(basedir)
+		self.ignore_event = (lambda path, name: False) if ignore_event is None else ignore_event
+		self.own_watches = watches is None
+		self.watches = INotifyTreeWatches() if watches is None else watches
+		self.wds = set()
+		self.modified = True
+		self.changed_paths = None
+		self.base_changed = False
+		self.too_large = False
+		self.needs_rescan = False
+		self.watches.add_tree(self)
+
+	def overflow(self):
+		self.modified = True
+		self.changed_paths = None
+		self.needs_rescan = True
+
+	def process_event(self, path, mask, name):
+		if not self.ignore_event(path, name):
+			self.modified = True
+			if self.changed_paths is not None:
+				if len(self.changed_paths) >= self.max_changed_paths:
+					self.changed_paths = None
+				else:
+					self.changed_paths.add(os.path.join(path, name) if name else path)
+		if (mask & INotify.DELETE_SELF or mask & INotify.MOVE_SELF) and path == self.basedir:
+			self.base_changed = True
+
+	def read(self):
+		self.watches.read()
+		if self.base_changed:
+			raise BaseDirChanged('The directory %s was moved/deleted' % self.basedir)
+		if self.too_large:
+			raise DirTooLarge(self.basedir)
+		if self.needs_rescan:
+			self.needs_rescan = False
+			self.watches.add_tree(self)
 
 	def __call__(self):
-		self.read()
-		ret = self.modified
-		self.modified = False
-		return ret
+		with self.watches.lock:
+			self.read()
+			ret = self.modified
+			self.modified = False
+			self.changed_paths = set()
+			return ret
+
+	def get_changed_paths(self):
+		'''Get paths changed since the last call
+
+		:return:
+			Set of changed paths (directory entries which were created, 
+			deleted, modified or moved) or ``None`` if it is not known which 
+			paths have changed (e.g. after events queue overflow).
+		'''
+		with self.watches.lock:
+			self.read()
+			ret = self.changed_paths if self.modified else set()
+			self.modified = False
+			self.changed_paths = set()
+			return ret
+
+	def close(self):
+		'''Stop watching the tree
+		'''
+		self.watches.remove_tree(self)
+		if self.own_watches:
+			self.watches.close()
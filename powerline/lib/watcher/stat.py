@@ -2,10 +2,21 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 import os
+import stat
+import errno
 
+from array import array
 from threading import RLock
+from time import time
 
 from powerline.lib.path import realpath
+from powerline.lib.monotonic import monotonic
+from powerline.lib.watcher.inotify import NoSuchDir, BaseDirChanged
+
+try:
+	from os import scandir
+except ImportError:
+	scandir = None
 
 
 class StatFileWatcher(object):
@@ -42,3 +53,195 @@ class StatFileWatcher(object):
 	def close(self):
 		with self.lock:
 			self.watches.clear()
+
+
+def list_entries(directory):
+	'''List directory entries, not following symbolic links
+
+	:return:
+		List of ``(name, path, change_time)`` tuples. Change time is the latest 
+		of modification and status change times, it is ``None`` for 
+		directories. Entries removed while listing are skipped.
+	'''
+	ret = []
+	if scandir is None:
+		for name in os.listdir(directory):
+			path = os.path.join(directory, name)
+			try:
+				st = os.lstat(path)
+			except OSError:
+				continue
+			ret.append((name, path, None if stat.S_ISDIR(st.st_mode) else max(st.st_mtime, st.st_ctime)))
+		return ret
+	for entry in scandir(directory):
+		try:
+			if entry.is_dir(follow_symlinks=False):
+				ret.append((entry.name, entry.path, None))
+			else:
+				st = entry.stat(follow_symlinks=False)
+				ret.append((entry.name, entry.path, max(st.st_mtime, st.st_ctime)))
+		except OSError:
+			continue
+	return ret
+
+
+class StatTreeWatcher(object):
+	'''Tree watcher which polls directories
+
+	Each directory is described by two numbers kept in arrays: the latest 
+	change time of non-directory entries seen and the change time of the 
+	directory itself, which changes when entries are created, removed or 
+	renamed. Directories are scanned in chunks: each query spends at most 
+	``time_budget`` seconds scanning, continuing from the place where the 
+	previous query stopped. Thus changes are noticed with a delay, but they 
+	are reported conservatively: files with timestamps too close to the scan 
+	time are reported once more on the next scan.
+
+	:param str basedir:
+		Tree base directory.
+	:param function ignore_event:
+		Function which receives directory path and entry name and returns true 
+		if the entry is not to be checked.
+	:param float time_budget:
+		Maximal number of seconds spent on scanning in one query. At least one 
+		directory is scanned during each query.
+	'''
+	is_dummy = False
+
+	max_changed_paths = 10000
+	'''Maximum number of remembered changed paths
+
+	When more paths are changed they are forgotten and the whole tree is 
+	considered changed.
+	'''
+
+	def __init__(self, basedir, ignore_event=None, time_budget=0.005):
+		self.basedir = realpath(basedir)
+		if not os.path.isdir(self.basedir):
+			raise NoSuchDir('The dir {0} does not exist'.format(self.basedir))
+		self.ignore_event = (lambda path, name: False) if ignore_event is None else ignore_event
+		self.time_budget = time_budget
+		self.lock = RLock()
+		self.directories = []
+		self.known = set()
+		self.change_times = array(str('d'))
+		self.directory_times = array(str('d'))
+		self.position = 0
+		self.first_pass = True
+		self.baseline_time = time()
+		self.changed_paths = None
+		self.add_directory(self.basedir)
+		self.poll()
+
+	def add_directory(self, path):
+		# Entries changed after directory was found are to be reported: 
+		# subtract a bit because file system timestamps are coarser than 
+		# time().
+		self.directories.append(path)
+		self.known.add(path)
+		self.change_times.append(self.baseline_time - 0.01)
+		# Directory itself is not reported during its first scan: new 
+		# directories are reported when they are found.
+		self.directory_times.append(-1.0)
+
+	def add_changed_path(self, path):
+		if self.changed_paths is not None:
+			if len(self.changed_paths) >= self.max_changed_paths:
+				self.changed_paths = None
+			else:
+				self.changed_paths.add(path)
+
+	def scan_directory(self, i, now):
+		directory = self.directories[i]
+		try:
+			# Directory is checked before listing: if it changes while listing 
+			# it is reported during the next scan.
+			st = os.stat(directory)
+			entries = list_entries(directory)
+		except OSError as e:
+			if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+				# Directory is kept, but it is not possible to check it.
+				return
+			if i == 0:
+				raise BaseDirChanged('The directory %s was moved/deleted' % directory)
+			self.directories[i] = None
+			self.known.discard(directory)
+			self.add_changed_path(directory)
+			return
+		directory_time = max(st.st_mtime, st.st_ctime)
+		if self.directory_times[i] != -1.0 and directory_time > self.directory_times[i]:
+			# Some entries were created, removed or renamed.
+			self.add_changed_path(directory)
+		self.directory_times[i] = self.get_threshold(directory_time, now)
+		threshold = self.change_times[i]
+		latest = 0.0
+		for name, path, change_time in entries:
+			if self.ignore_event(directory, name):
+				continue
+			if change_time is None:
+				if path not in self.known:
+					if not self.first_pass:
+						self.add_changed_path(path)
+					self.add_directory(path)
+			else:
+				if change_time > threshold:
+					self.add_changed_path(path)
+				latest = max(latest, change_time)
+		self.change_times[i] = self.get_threshold(latest, now)
+
+	@staticmethod
+	def get_threshold(latest, now):
+		'''Get change time entries must exceed to be reported during the next scan
+
+		Entries with timestamps close to the scan time are checked again: they 
+		may change once more without changing their timestamps.
+		'''
+		return min(latest, now - (2.0 if latest == int(latest) else 0.01))
+
+	def finish_pass(self):
+		'''Forget removed directories
+		'''
+		keep = [i for i, directory in enumerate(self.directories) if directory is not None]
+		if len(keep) != len(self.directories):
+			self.directories = [self.directories[i] for i in keep]
+			self.change_times = array(str('d'), (self.change_times[i] for i in keep))
+			self.directory_times = array(str('d'), (self.directory_times[i] for i in keep))
+		self.position = 0
+		self.first_pass = False
+		self.baseline_time = time()
+
+	def poll(self):
+		'''Scan the next chunk of directories
+
+		Scans at most all directories once.
+		'''
+		deadline = monotonic() + self.time_budget
+		now = time()
+		scanned = 0
+		while scanned < len(self.directories):
+			if self.position >= len(self.directories):
+				self.finish_pass()
+			if self.directories[self.position] is not None:
+				self.scan_directory(self.position, now)
+			self.position += 1
+			scanned += 1
+			if monotonic() >= deadline:
+				break
+
+	def __call__(self):
+		changed_paths = self.get_changed_paths()
+		return changed_paths is None or bool(changed_paths)
+
+	def get_changed_paths(self):
+		'''Get paths changed since the last call
+
+		:return:
+			Set of paths which possibly changed: files and directories which 
+			were created or modified, directories which entries were removed, 
+			or ``None`` if it is not known which paths have changed.
+		'''
+		with self.lock:
+			self.poll()
+			ret = self.changed_paths
+			self.changed_paths = set()
+			return ret
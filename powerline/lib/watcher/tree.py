@@ -6,8 +6,10 @@ import sys
 from powerline.lib.monotonic import monotonic
 from powerline.lib.inotify import INotifyError
 from powerline.lib.path import realpath
-from powerline.lib.watcher.inotify import INotifyTreeWatcher, DirTooLarge, NoSuchDir, BaseDirChanged
+from powerline.lib.watcher.inotify import (INotifyTreeWatcher, INotifyTreeWatches, DirTooLarge,
+                                           NoSuchDir, BaseDirChanged)
 from powerline.lib.watcher.uv import UvTreeWatcher, UvNotFound
+from powerline.lib.watcher.stat import StatTreeWatcher
 
 
 class DummyTreeWatcher(object):
@@ -21,27 +23,29 @@ class DummyTreeWatcher(object):
 
 
 class TreeWatcher(object):
-	def __init__(self, pl, watcher_type, expire_time):
+	def __init__(self, pl, watcher_type, expire_time, max_trees=0, max_directories=0):
 		self.watches = {}
 		self.last_query_times = {}
 		self.expire_time = expire_time * 60
+		self.max_trees = max_trees
+		self.max_directories = max_directories
 		self.pl = pl
 		self.watcher_type = watcher_type
+		self.inotify_watches = None
 
 	def get_watcher(self, path, ignore_event):
 		if self.watcher_type == 'inotify':
-			return INotifyTreeWatcher(path, ignore_event=ignore_event)
+			return self.get_inotify_watcher(path, ignore_event)
 		if self.watcher_type == 'uv':
 			return UvTreeWatcher(path, ignore_event=ignore_event)
 		if self.watcher_type == 'dummy':
 			return DummyTreeWatcher(path)
-		# FIXME
 		if self.watcher_type == 'stat':
-			return DummyTreeWatcher(path)
+			return StatTreeWatcher(path, ignore_event=ignore_event)
 		if self.watcher_type == 'auto':
 			if sys.platform.startswith('linux'):
 				try:
-					return INotifyTreeWatcher(path, ignore_event=ignore_event)
+					return self.get_inotify_watcher(path, ignore_event)
 				except (INotifyError, DirTooLarge) as e:
 					if not isinstance(e, INotifyError):
 						self.pl.warn('Failed to watch path: {0} with error: {1}'.format(path, e))
@@ -49,26 +53,108 @@ class TreeWatcher(object):
 				return UvTreeWatcher(path, ignore_event=ignore_event)
 			except UvNotFound:
 				pass
-			return DummyTreeWatcher(path)
+			return StatTreeWatcher(path, ignore_event=ignore_event)
 		else:
 			raise ValueError('Unknown watcher type: {0}'.format(self.watcher_type))
 
 	def watch(self, path, ignore_event=None):
 		path = realpath(path)
 		w = self.get_watcher(path, ignore_event)
+		old_watcher = self.watches.get(path)
+		if old_watcher is not None:
+			# Release resources of the replaced watcher.
+			close = getattr(old_watcher, 'close', None)
+			if close is not None:
+				close()
 		self.watches[path] = w
-		return w
+		self.last_query_times.setdefault(path, monotonic())
+		self.enforce_limits(path, ignore_event)
+		return self.watches.get(path)
+
+	def unwatch(self, path):
+		path = realpath(path)
+		w = self.watches.pop(path, None)
+		self.last_query_times.pop(path, None)
+		close = getattr(w, 'close', None)
+		if close is not None:
+			close()
+
+	def close(self):
+		'''Stop watching all trees
+		'''
+		for path in tuple(self.watches):
+			self.unwatch(path)
+		if self.inotify_watches is not None:
+			self.inotify_watches.close()
+			self.inotify_watches = None
+
+	def fall_back_to_stat(self, path, ignore_event):
+		'''Poll the tree which is too large to be watched using inotify
+		'''
+		self.unwatch(path)
+		try:
+			self.watches[path] = StatTreeWatcher(path, ignore_event=ignore_event)
+		except NoSuchDir:
+			return
+		self.last_query_times[path] = monotonic()
+
+	def evict(self, path, reason):
+		self.pl.info('Stopped watching {0}: {1}', path, reason)
+		self.unwatch(path)
+
+	def enforce_limits(self, new_path, ignore_event=None):
+		'''Stop watching least recently queried trees when limits are exceeded
+
+		Tree which was just added is never removed: if it alone exceeds the 
+		directories limit it is polled using :py:class:`StatTreeWatcher`.
+		'''
+		if not (self.max_trees or self.max_directories):
+			return
+		by_query_time = sorted(
+			(path for path in self.watches if path != new_path),
+			key=lambda path: self.last_query_times.get(path, 0),
+			reverse=True,
+		)
+		while self.max_trees and len(self.watches) > self.max_trees:
+			self.evict(by_query_time.pop(), 'more than {0} trees are watched'.format(self.max_trees))
+		while self.max_directories and self.count_watched_directories() > self.max_directories:
+			if not by_query_time:
+				self.pl.warn('Polling {0}: it has more than {1} directories',
+				             new_path, self.max_directories)
+				self.fall_back_to_stat(new_path, ignore_event)
+				break
+			self.evict(by_query_time.pop(), 'more than {0} directories are watched'.format(self.max_directories))
+
+	def get_inotify_watcher(self, path, ignore_event):
+		if self.inotify_watches is None:
+			self.inotify_watches = INotifyTreeWatches()
+		return INotifyTreeWatcher(path, ignore_event=ignore_event, watches=self.inotify_watches)
+
+	def count_watched_directories(self):
+		'''Count directories watched by the shared inotify instance
+		'''
+		if self.inotify_watches is None:
+			return 0
+		return len(self.inotify_watches.watched_rmap)
 
 	def expire_old_queries(self):
-		pop = []
 		now = monotonic()
-		for path, lt in self.last_query_times.items():
+		for path, lt in tuple(self.last_query_times.items()):
 			if now - lt > self.expire_time:
-				pop.append(path)
-		for path in pop:
-			del self.last_query_times[path]
+				self.evict(path, 'not queried for {0:.0f} seconds'.format(now - lt))
 
 	def __call__(self, path, ignore_event=None):
+		changed_paths = self.get_changed_paths(path, ignore_event=ignore_event)
+		return changed_paths is None or bool(changed_paths)
+
+	def get_changed_paths(self, path, ignore_event=None):
+		'''Get paths in the tree changed since the last call
+
+		:return:
+			Set of changed paths or ``None`` if the whole tree is to be 
+			considered changed: on the first call, when watcher is not able to 
+			tell which paths have changed, etc.
+		'''
 		path = realpath(path)
 		self.expire_old_queries()
 		self.last_query_times[path] = monotonic()
@@ -78,13 +164,19 @@ class TreeWatcher(object):
 				self.watch(path, ignore_event=ignore_event)
 			except NoSuchDir:
 				pass
-			return True
+			except DirTooLarge as e:
+				self.pl.warn(str(e))
+				self.fall_back_to_stat(path, ignore_event)
+			return None
 		try:
-			return w()
-		except BaseDirChanged:
-			self.watches.pop(path, None)
-			return True
+			get_changed_paths = getattr(w, 'get_changed_paths', None)
+			if get_changed_paths is None:
+				return None if w() else set()
+			return get_changed_paths()
+		except (BaseDirChanged, NoSuchDir):
+			self.unwatch(path)
+			return None
 		except DirTooLarge as e:
 			self.pl.warn(str(e))
-			self.watches[path] = DummyTreeWatcher(path)
-			return False
+			self.fall_back_to_stat(path, ignore_event)
+			return None
@@ -124,16 +124,21 @@ class UvWatcher(object):
 		with self.lock:
 			return normpath(path, self.fenc) in self.watches
 
+	def close(self):
+		'''Stop all watches
+		'''
+		with self.lock:
+			while self.watches:
+				path, watch = self.watches.popitem()
+				watch.close(partial(self._stopped_watching, path))
+
 	def __del__(self):
 		try:
-			lock = self.lock
+			self.lock
 		except AttributeError:
 			pass
 		else:
-			with lock:
-				while self.watches:
-					path, watch = self.watches.popitem()
-					watch.close(partial(self._stopped_watching, path))
+			self.close()
 
 
 class UvFileWatcher(UvWatcher):
@@ -126,6 +126,9 @@ main_spec = (Spec(
 				select=ext_theme_spec(),
 			),
 		).optional(),
+		tmux=ext_spec().update(
+			update_interval=Spec().cmp('gt', 0.0).optional(),
+		).optional(),
 		wm=ext_spec().update(
 			local_themes=Spec().unknown_spec(
 				Spec().re('^[0-9A-Za-z-]+$'),
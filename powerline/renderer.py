@@ -7,9 +7,11 @@ import re
 import operator
 
 from itertools import chain
+from collections import OrderedDict
 
 from powerline.theme import Theme
 from powerline.lib.unicode import unichr, strwidth_ucs_2, strwidth_ucs_4
+from powerline.lib.monotonic import monotonic
 
 
 NBSP = ' '
@@ -153,6 +155,53 @@ class Renderer(object):
 	See documentation of ``unicode.translate`` for details.
 	'''
 
+	render_cache_size = 0
+	'''Maximum number of rendered lines kept in the render cache
+
+	Zero disables the cache. Only lines where all segments declared their 
+	inputs using :py:func:`powerline.theme.render_cache_inputs` are cached. 
+	May be overridden using ``render_cache_size`` renderer option.
+	'''
+
+	hlstyle_cache_size = 0
+	'''Maximum number of highlight styles kept in the highlight style cache
+
+	Zero disables the cache. Renderers which output depends only on 
+	:py:meth:`hlstyle` arguments and :py:meth:`get_hlstyle_cache_key` may set 
+	this to a positive value to have styles computed by :py:meth:`cached_style` 
+	memoized. Cache belongs to the renderer object, so it is dropped together 
+	with the renderer when colorscheme is reloaded.
+	'''
+
+	reuse_rendered_segments = False
+	'''Whether segments rendered last time may be reused
+
+	If true, renderer keeps the last rendered frame for each theme, side, line 
+	and width and renders again only segments which contents, highlighting or 
+	neighbours changed since that frame. May be set only by renderers which 
+	:py:meth:`hl` output depends on nothing but its arguments and 
+	:py:meth:`get_hlstyle_cache_key`.
+	'''
+
+	frames_cache_size = 16
+	'''Maximum number of frames kept for :py:attr:`reuse_rendered_segments`
+	'''
+
+	chunked_output = True
+	'''Whether :py:meth:`render_iter` may yield segments one by one
+
+	Is to be set to false by subclasses which post-process the whole rendered 
+	line in :py:meth:`render` or :py:meth:`do_render`: for them 
+	:py:meth:`render_iter` yields the whole line as a single chunk.
+	'''
+
+	segment_stats = None
+	'''Function which receives segment name and time spent on computing it
+
+	Is passed to all themes. May be overridden using ``segment_stats`` renderer 
+	option.
+	'''
+
 	def __init__(self,
 	             theme_config,
 	             local_themes,
@@ -163,6 +212,7 @@ class Renderer(object):
 		self.__dict__.update(options)
 		self.theme_config = theme_config
 		theme_kwargs['pl'] = pl
+		theme_kwargs['segment_stats'] = self.segment_stats
 		self.pl = pl
 		if theme_config.get('use_non_breaking_spaces', True):
 			self.character_translations = self.character_translations.copy()
@@ -178,6 +228,11 @@ class Renderer(object):
 			'W': 2,          # Wide
 			'F': 2,          # Fullwidth
 		}
+		self.render_cache = OrderedDict()
+		self.render_cache_hits = 0
+		self.render_cache_misses = 0
+		self.hlstyle_cache = OrderedDict()
+		self.frames = OrderedDict()
 
 	strwidth = lambda self, s: (
 		(strwidth_ucs_2 if sys.maxunicode < 0x10FFFF else strwidth_ucs_4)(
@@ -251,7 +306,24 @@ class Renderer(object):
 		for line in range(theme.get_line_number() - 1, 0, -1):
 			yield self.render(side=None, line=line, **kwargs)
 
-	def render(self, mode=None, width=None, side=None, line=0, output_raw=False, output_width=False, segment_info=None, matcher_info=None, hl_args=None):
+	def render_iter(self, **kwargs):
+		'''Render all segments, yielding rendered chunks
+
+		Accepts the same arguments as :py:meth:`render`, except for 
+		``output_raw`` and ``output_width``. Joining yielded chunks with 
+		:py:meth:`hl_join` gives what :py:meth:`render` returns, but no 
+		intermediate list of rendered segments is created: segments are 
+		rendered while chunks are consumed, so iterator must be exhausted 
+		before the next render.
+
+		:return: iterator.
+		'''
+		if self.chunked_output:
+			return self.render(output_chunks=True, **kwargs)
+		else:
+			return iter((self.render(**kwargs),))
+
+	def render(self, mode=None, width=None, side=None, line=0, output_raw=False, output_width=False, segment_info=None, matcher_info=None, hl_args=None, output_chunks=False):
 		'''Render all segments.
 
 		When a width is provided, low-priority segments are dropped one at
@@ -291,6 +363,10 @@ class Renderer(object):
 			:py:meth`hlstyle` methods. They are ignored in the default
 			implementation, but renderer-specific overrides can make use of
 			them as run-time "configuration" information.
+		:param bool output_chunks:
+			Changes the output: if this parameter is ``True`` then in place of 
+			colored string iterator over its chunks is output (see 
+			:py:meth:`render_iter`).
 		'''
 		theme = self.get_theme(matcher_info)
 		return self.do_render(
@@ -302,9 +378,38 @@ class Renderer(object):
 			output_width=output_width,
 			segment_info=self.get_segment_info(segment_info, mode),
 			theme=theme,
-			hl_args=hl_args
+			hl_args=hl_args,
+			output_chunks=output_chunks,
 		)
 
+	def render_widths(self, widths, mode=None, side=None, line=0, segment_info=None, matcher_info=None, hl_args=None, shared_segments=None):
+		'''Render all segments once for each of the given widths
+
+		Segment contents are computed only once, for each width only fitting 
+		segments into it and highlighting is done. Useful for bars shown on 
+		several screens of different sizes. Render cache is not used.
+
+		:param list widths:
+			List of maximum widths, see ``width`` argument of :py:meth:`render`.
+		:param dict shared_segments:
+			Dictionary with results of segments shared with other calls, see 
+			:py:meth:`powerline.theme.Theme.get_segments`.
+
+		Other arguments are the same as in :py:meth:`render`.
+
+		:return: list of rendered strings, one for each width.
+		'''
+		theme = self.get_theme(matcher_info)
+		segment_info = self.get_segment_info(segment_info, mode)
+		segments = list(theme.get_segments(side, line, segment_info, mode, shared_segments))
+		self._prepare_segments(segments, any(widths))
+		return [
+			self._fit_segments(
+				[segment.copy() for segment in segments],
+				width, side, line, False, False, theme, hl_args)
+			for width in widths
+		]
+
 	def compute_divider_widths(self, theme):
 		return {
 			'left': {
@@ -330,57 +435,116 @@ class Renderer(object):
 	:return: Results of joining these segments.
 	'''
 
-	def do_render(self, mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args):
+	def get_render_cache_key(self, segment_info):
+		'''Get renderer-specific part of the render cache key
+
+		Is to be overridden by subclasses which have rendering results depend 
+		on something other than segment inputs and :py:meth:`render` 
+		arguments.
+
+		:param dict segment_info:
+			Segment information, output of :py:meth:`get_segment_info`.
+
+		:return: Any hashable value.
+		'''
+		return None
+
+	def do_render(self, mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, output_chunks=False):
 		'''Like Renderer.render(), but accept theme in place of matcher_info
 		'''
-		segments = list(theme.get_segments(side, line, segment_info, mode))
+		if not self.render_cache_size:
+			return self._do_render(mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, output_chunks)
+		inputs_key, ttl = theme.get_render_cache_key(side, line, segment_info)
+		if inputs_key is None:
+			return self._do_render(mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, output_chunks)
+		ret = self._do_cached_render(mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, inputs_key, ttl)
+		if output_chunks:
+			# Cached line is a single chunk.
+			if output_raw or output_width:
+				return (iter((ret[0],)),) + ret[1:]
+			else:
+				return iter((ret,))
+		return ret
 
-		current_width = 0
+	def _do_cached_render(self, mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, inputs_key, ttl):
+		key = (
+			id(theme), mode, width, side, line, output_raw, output_width,
+			tuple(sorted(hl_args.items())) if hl_args else None,
+			self.get_render_cache_key(segment_info),
+			inputs_key,
+		)
+		try:
+			expires, ret = self.render_cache.pop(key)
+		except TypeError:
+			# Unhashable key
+			return self._do_render(mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args)
+		except KeyError:
+			pass
+		else:
+			if expires is None or expires > monotonic():
+				self.render_cache_hits += 1
+				self.render_cache[key] = (expires, ret)
+				return ret
+		self.render_cache_misses += 1
+		ret = self._do_render(mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args)
+		self.render_cache[key] = (None if ttl is None else monotonic() + ttl, ret)
+		while len(self.render_cache) > self.render_cache_size:
+			self.render_cache.popitem(last=False)
+		return ret
 
+	def _do_render(self, mode, width, side, line, output_raw, output_width, segment_info, theme, hl_args, output_chunks=False):
+		segments = list(theme.get_segments(side, line, segment_info, mode))
 		self._prepare_segments(segments, output_width or width)
+		return self._fit_segments(segments, width, side, line, output_raw, output_width, theme, hl_args, output_chunks)
+
+	def _fit_segments(self, segments, width, side, line, output_raw, output_width, theme, hl_args, output_chunks=False):
+		'''Fit prepared segments into width and render them
+
+		:param list segments:
+			Segments processed by :py:meth:`_prepare_segments`. List and 
+			segments are modified in place.
+
+		Other arguments are the same as in :py:meth:`render`, return value is 
+		also the same.
+		'''
+		current_width = 0
 
 		hl_args = hl_args or dict()
 
+		layout = self._get_layout(theme, segments)
+
+		frame_key = self._get_frame_key(theme, side, line, width, hl_args)
+
 		if not width:
 			# No width specified, so we don’t need to crop or pad anything
 			if output_width:
-				current_width = self._render_length(theme, segments, self.compute_divider_widths(theme))
+				current_width = self._render_length(theme, segments, self.compute_divider_widths(theme), layout)
+			if output_chunks:
+				chunks = self._iter_chunks(theme, segments, hl_args, layout, frame_key, True)
+				if output_raw:
+					chunks = iter(list(chunks))
+				return construct_returned_value(chunks, segments, current_width, output_raw, output_width)
 			return construct_returned_value(self.hl_join([
 				segment['_rendered_hl']
-				for segment in self._render_segments(theme, segments, hl_args)
-			]) + self.hlstyle(**hl_args), segments, current_width, output_raw, output_width)
+				for segment in self._render_segments(theme, segments, hl_args, layout=layout, frame_key=frame_key)
+			]) + self.cached_style(self.hlstyle, kwargs=hl_args), segments, current_width, output_raw, output_width)
 
 		divider_widths = self.compute_divider_widths(theme)
 
 		# Create an ordered list of segments that can be dropped
 		segments_priority = sorted((segment for segment in segments if segment['priority'] is not None), key=lambda segment: segment['priority'], reverse=True)
 		no_priority_segments = filter(lambda segment: segment['priority'] is None, segments)
-		current_width = self._render_length(theme, segments, divider_widths)
+		current_width = self._render_length(theme, segments, divider_widths, layout)
 		if current_width > width:
 			for segment in chain(segments_priority, no_priority_segments):
 				if segment['truncate'] is not None:
 					segment['contents'] = segment['truncate'](self.pl, current_width - width, segment)
 
-			segments_priority = iter(segments_priority)
-			if current_width > width and len(segments) > 100:
-				# When there are too many segments use faster, but less correct
-				# algorithm for width computation
-				diff = current_width - width
-				for segment in segments_priority:
-					segments.remove(segment)
-					diff -= segment['_len']
-					if diff <= 0:
-						break
-				current_width = self._render_length(theme, segments, divider_widths)
-			if current_width > width:
-				# When there are not too much use more precise, but much slower
-				# width computation. It also finishes computations in case
-				# previous variant did not free enough space.
-				for segment in segments_priority:
-					segments.remove(segment)
-					current_width = self._render_length(theme, segments, divider_widths)
-					if current_width <= width:
-						break
+			segments_len = len(segments)
+			current_width = self._remove_segments(
+				theme, segments, segments_priority, divider_widths, current_width, width)
+			if len(segments) != segments_len:
+				layout = self._get_layout(theme, segments)
 		del segments_priority
 
 		# Distribute the remaining space on spacer segments
@@ -397,18 +561,38 @@ class Renderer(object):
 			# `_len` key is not needed anymore, but current_width should have an
 			# actual value for various bindings.
 			current_width = width
-		elif output_width:
-			current_width = self._render_length(theme, segments, divider_widths)
+
+		if output_chunks:
+			chunks = self._iter_chunks(theme, segments, hl_args, layout, frame_key, False)
+			if output_raw:
+				# Raw string is available only after rendering.
+				chunks = iter(list(chunks))
+			return construct_returned_value(chunks, segments, current_width, output_raw, output_width)
 
 		rendered_highlighted = self.hl_join([
 			segment['_rendered_hl']
-			for segment in self._render_segments(theme, segments, hl_args)
+			for segment in self._render_segments(theme, segments, hl_args, layout=layout, frame_key=frame_key)
 		])
 		if rendered_highlighted:
-			rendered_highlighted += self.hlstyle(**hl_args)
+			rendered_highlighted += self.cached_style(self.hlstyle, kwargs=hl_args)
 
 		return construct_returned_value(rendered_highlighted, segments, current_width, output_raw, output_width)
 
+	def _iter_chunks(self, theme, segments, hl_args, layout, frame_key, always_reset):
+		'''Render segments, yielding highlighted ones
+
+		:param bool always_reset:
+			If true, output final :py:meth:`hlstyle` even if nothing was 
+			rendered.
+		'''
+		rendered_anything = always_reset
+		for segment in self._render_segments(theme, segments, hl_args, layout=layout, frame_key=frame_key):
+			if segment['_rendered_hl']:
+				rendered_anything = True
+				yield segment['_rendered_hl']
+		if rendered_anything:
+			yield self.cached_style(self.hlstyle, kwargs=hl_args)
+
 	def _prepare_segments(self, segments, calculate_contents_len):
 		'''Translate non-printable characters and calculate segment width
 		'''
@@ -421,64 +605,206 @@ class Renderer(object):
 				else:
 					segment['_contents_len'] = self.strwidth(segment['contents'])
 
-	def _render_length(self, theme, segments, divider_widths):
-		'''Update segments lengths and return them
+	def _get_neighbour_indexes(self, segments):
+		'''Find neighbours of all non-literal segments
+
+		:return:
+			Pair of lists ``(prev_indexes, next_indexes)`` with indexes of the 
+			previous and the next non-literal segment for each non-literal 
+			segment. ``None`` means that there is no such segment, items for 
+			literal segments are always ``None``.
 		'''
 		segments_len = len(segments)
-		ret = 0
-		divider_spaces = theme.get_spaces()
-		prev_segment = theme.EMPTY_SEGMENT
-		try:
-			first_segment = next(iter((
-				segment
-				for segment in segments
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			first_segment = None
-		try:
-			last_segment = next(iter((
-				segment
-				for segment in reversed(segments)
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			last_segment = None
+		prev_indexes = [None] * segments_len
+		next_indexes = [None] * segments_len
+		last_index = None
 		for index, segment in enumerate(segments):
-			side = segment['side']
-			segment_len = segment['_contents_len']
 			if not segment['literal_contents'][1]:
-				if side == 'left':
-					if segment is not last_segment:
-						compare_segment = next(iter((
-							segment
-							for segment in segments[index + 1:]
-							if not segment['literal_contents'][1]
-						)))
-					else:
-						compare_segment = theme.EMPTY_SEGMENT
-				else:
-					compare_segment = prev_segment
+				prev_indexes[index] = last_index
+				if last_index is not None:
+					next_indexes[last_index] = index
+				last_index = index
+		return prev_indexes, next_indexes
+
+	def _get_segment_layout(self, theme, segment, prev_segment, next_segment):
+		'''Compute divider and outer padding of the non-literal segment
+
+		:param dict prev_segment:
+			Previous non-literal segment or ``None`` if segment is the first 
+			one.
+		:param dict next_segment:
+			Next non-literal segment or ``None`` if segment is the last one.
+
+		:return:
+			Triple ``(divider_type, compare_segment, outer_padding)``: divider 
+			type is either ``'soft'`` or ``'hard'``, compare segment is the 
+			segment divider is drawn against, outer padding is the number of 
+			spaces added to the outer side of the segment.
+		'''
+		if segment['side'] == 'left':
+			compare_segment = next_segment or theme.EMPTY_SEGMENT
+			is_outer = prev_segment is None
+		else:
+			compare_segment = prev_segment or theme.EMPTY_SEGMENT
+			is_outer = next_segment is None
+		divider_type = 'soft' if compare_segment['highlight']['bg'] == segment['highlight']['bg'] else 'hard'
+		return divider_type, compare_segment, (theme.outer_padding if is_outer else 0)
+
+	def _get_layout(self, theme, segments):
+		'''Compute layout of all segments
+
+		Layout is computed once per line and is shared by 
+		:py:meth:`_render_length` and :py:meth:`_render_segments`.
+
+		:return:
+			List with :py:meth:`_get_segment_layout` results for non-literal 
+			segments and ``None`` for literal ones.
+		'''
+		prev_indexes, next_indexes = self._get_neighbour_indexes(segments)
+		return [
+			None if segment['literal_contents'][1] else self._get_segment_layout(
+				theme, segment,
+				None if prev_indexes[index] is None else segments[prev_indexes[index]],
+				None if next_indexes[index] is None else segments[next_indexes[index]],
+			)
+			for index, segment in enumerate(segments)
+		]
+
+	def _render_length(self, theme, segments, divider_widths, layout=None):
+		'''Update segments lengths and return them
+		'''
+		if layout is None:
+			layout = self._get_layout(theme, segments)
+		ret = 0
+		for segment, segment_layout in zip(segments, layout):
+			if segment_layout is None:
+				segment_len = segment['_contents_len']
+			else:
+				segment_len = self._segment_length(theme, segment, segment_layout, divider_widths)
+			segment['_len'] = segment_len
+			ret += segment_len
+		return ret
 
-				divider_type = 'soft' if compare_segment['highlight']['bg'] == segment['highlight']['bg'] else 'hard'
+	def _segment_length(self, theme, segment, segment_layout, divider_widths):
+		'''Compute length of the non-literal segment
 
-				outer_padding = int(bool(
-					segment is first_segment
-					if side == 'left' else
-					segment is last_segment
-				)) * theme.outer_padding
+		:param tuple segment_layout:
+			Segment layout, output of :py:meth:`_get_segment_layout`.
 
-				draw_divider = segment['draw_' + divider_type + '_divider']
-				segment_len += outer_padding
-				if draw_divider:
-					segment_len += divider_widths[side][divider_type] + divider_spaces
-				prev_segment = segment
+		:return: segment length, including divider and outer padding.
+		'''
+		divider_type, compare_segment, outer_padding = segment_layout
+		segment_len = segment['_contents_len'] + outer_padding
+		if segment['draw_' + divider_type + '_divider']:
+			segment_len += divider_widths[segment['side']][divider_type] + theme.get_spaces()
+		return segment_len
+
+	def _remove_segments(self, theme, segments, segments_priority, divider_widths, current_width, width):
+		'''Remove segments in the order of priority until they fit into width
+
+		Gives exactly the same result as recomputing the whole line length 
+		after each removal, but removing one segment only changes lengths of 
+		its non-literal neighbours: dividers depend on the adjacent segment and 
+		outer padding on whether segment is the first or the last one. So 
+		only these lengths are recomputed, non-literal segments are kept in 
+		a linked list and all removals take linear time in total.
+
+		:param list segments:
+			Segments with ``_len`` keys computed by :py:meth:`_render_length`. 
+			Is modified in place.
+		:param list segments_priority:
+			Segments which may be removed, in the order of removal.
+		:param int current_width:
+			Current line width.
+
+		:return: line width after removing segments.
+		'''
+		lengths = [segment['_len'] for segment in segments]
+		indexes = dict(((id(segment), index) for index, segment in enumerate(segments)))
+		prev_indexes, next_indexes = self._get_neighbour_indexes(segments)
+		removed = [False] * len(segments)
+		for segment in segments_priority:
+			if current_width <= width:
+				break
+			index = indexes[id(segment)]
+			removed[index] = True
+			current_width -= lengths[index]
+			if segment['literal_contents'][1]:
+				continue
+			prev_index = prev_indexes[index]
+			next_index = next_indexes[index]
+			if prev_index is not None:
+				next_indexes[prev_index] = next_index
+			if next_index is not None:
+				prev_indexes[next_index] = prev_index
+			for neighbour_index in (prev_index, next_index):
+				if neighbour_index is None:
+					continue
+				neighbour = segments[neighbour_index]
+				p = prev_indexes[neighbour_index]
+				n = next_indexes[neighbour_index]
+				neighbour_len = self._segment_length(theme, neighbour, self._get_segment_layout(
+					theme, neighbour,
+					None if p is None else segments[p],
+					None if n is None else segments[n],
+				), divider_widths)
+				current_width += neighbour_len - lengths[neighbour_index]
+				lengths[neighbour_index] = neighbour_len
+		remaining = []
+		for index, segment in enumerate(segments):
+			if not removed[index]:
+				segment['_len'] = lengths[index]
+				remaining.append(segment)
+		segments[:] = remaining
+		return current_width
 
-			segment['_len'] = segment_len
-			ret += segment_len
-		return ret
+	def _get_frame_key(self, theme, side, line, width, hl_args):
+		'''Get key of the frame used for reusing rendered segments
+
+		:return: hashable value or ``None`` if segments are not to be reused.
+		'''
+		if not self.reuse_rendered_segments:
+			return None
+		key = (
+			id(theme), side, line, width,
+			tuple(sorted(hl_args.items())) if hl_args else None,
+			self.get_hlstyle_cache_key(),
+		)
+		try:
+			hash(key)
+		except TypeError:
+			return None
+		return key
+
+	@staticmethod
+	def _get_segment_render_key(segment, segment_layout, draw_divider):
+		'''Get everything rendered non-literal segment depends on
 
-	def _render_segments(self, theme, segments, hl_args, render_highlighted=True):
+		Does not include anything which is the same for the whole frame (e.g. 
+		``hl_args``).
+		'''
+		divider_type, compare_segment, outer_padding = segment_layout
+		highlight = segment['highlight']
+		if not draw_divider:
+			divider_key = None
+		elif divider_type == 'soft':
+			if segment['divider_highlight_group'] is None:
+				divider_key = divider_type
+			else:
+				divider_key = (
+					divider_type,
+					segment['divider_highlight']['fg'],
+					segment['divider_highlight']['bg'],
+				)
+		else:
+			divider_key = (divider_type, compare_segment['highlight']['bg'])
+		return (
+			segment['contents'], segment['side'], outer_padding,
+			highlight['fg'], highlight['bg'], highlight['attrs'],
+			divider_key,
+		)
+
+	def _render_segments(self, theme, segments, hl_args, render_highlighted=True, layout=None, frame_key=None):
 		'''Internal segment rendering method.
 
 		This method loops through the segment array and compares the
@@ -488,52 +814,52 @@ class Renderer(object):
 		The method always renders the raw segment contents (i.e. without
 		highlighting strings added), and only renders the highlighted
 		statusline if render_highlighted is True.
+
+		:param list layout:
+			Segments layout, output of :py:meth:`_get_layout`. Is computed if 
+			not given.
+		:param frame_key:
+			Key of the frame, output of :py:meth:`_get_frame_key`. If not 
+			``None`` segments rendered in the previous frame with the same key 
+			are reused.
 		'''
-		segments_len = len(segments)
 		divider_spaces = theme.get_spaces()
-		prev_segment = theme.EMPTY_SEGMENT
-		try:
-			first_segment = next(iter((
-				segment
-				for segment in segments
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			first_segment = None
-		try:
-			last_segment = next(iter((
-				segment
-				for segment in reversed(segments)
-				if not segment['literal_contents'][1]
-			)))
-		except StopIteration:
-			last_segment = None
+		if layout is None:
+			layout = self._get_layout(theme, segments)
 
-		for index, segment in enumerate(segments):
+		if frame_key is not None and render_highlighted:
+			old_frame = self.frames.get(frame_key) or {}
+			new_frame = {}
+		else:
+			new_frame = None
+
+		for segment, segment_layout in zip(segments, layout):
 			side = segment['side']
-			if not segment['literal_contents'][1]:
-				if side == 'left':
-					if segment is not last_segment:
-						compare_segment = next(iter((
-							segment
-							for segment in segments[index + 1:]
-							if not segment['literal_contents'][1]
-						)))
+			if segment_layout is not None:
+				divider_type, compare_segment, outer_padding = segment_layout
+				draw_divider = segment['draw_' + divider_type + '_divider']
+
+				segment_key = None
+				if new_frame is not None:
+					segment_key = self._get_segment_render_key(segment, segment_layout, draw_divider)
+					try:
+						rendered = old_frame[segment_key]
+					except TypeError:
+						# Unhashable contents or highlighting
+						segment_key = None
+					except KeyError:
+						pass
 					else:
-						compare_segment = theme.EMPTY_SEGMENT
-				else:
-					compare_segment = prev_segment
-				outer_padding = int(bool(
-					segment is first_segment
-					if side == 'left' else
-					segment is last_segment
-				)) * theme.outer_padding * ' '
-				divider_type = 'soft' if compare_segment['highlight']['bg'] == segment['highlight']['bg'] else 'hard'
+						segment['_rendered_raw'], segment['_rendered_hl'] = rendered
+						new_frame[segment_key] = rendered
+						yield segment
+						continue
+
+				outer_padding = outer_padding * ' '
 
 				divider_highlighted = ''
 				contents_raw = segment['contents']
 				contents_highlighted = ''
-				draw_divider = segment['draw_' + divider_type + '_divider']
 
 				segment_hl_args = {}
 				segment_hl_args.update(segment['highlight'])
@@ -577,12 +903,23 @@ class Renderer(object):
 					contents_highlighted = self.hl(self.escape(contents_raw), **segment_hl_args)
 					segment['_rendered_raw'] = contents_raw
 					segment['_rendered_hl'] = contents_highlighted
-				prev_segment = segment
+				if segment_key is not None:
+					new_frame[segment_key] = (segment['_rendered_raw'], segment['_rendered_hl'])
 			else:
 				segment['_rendered_raw'] = ' ' * segment['literal_contents'][0]
 				segment['_rendered_hl'] = segment['literal_contents'][1]
 			yield segment
 
+		if new_frame is not None:
+			# Only segments used in this frame are kept, so frame does not grow.
+			self.frames.pop(frame_key, None)
+			self.frames[frame_key] = new_frame
+			while len(self.frames) > self.frames_cache_size:
+				try:
+					self.frames.popitem(last=False)
+				except KeyError:
+					break
+
 	def escape(self, string):
 		'''Method that escapes segment contents.
 		'''
@@ -597,10 +934,54 @@ class Renderer(object):
 		'''
 		raise NotImplementedError
 
+	def get_hlstyle_cache_key(self):
+		'''Get renderer-specific part of the highlight style cache key
+
+		Is to be overridden by subclasses which styles depend on some 
+		renderer state which may change between renders.
+
+		:return: Any hashable value.
+		'''
+		return None
+
+	def cached_style(self, func, fg=None, bg=None, attrs=None, kwargs=None):
+		'''Compute highlight style using the highlight style cache
+
+		:param function func:
+			Function which receives ``fg``, ``bg``, ``attrs`` and ``kwargs`` 
+			(as keyword arguments) and returns style. Usually 
+			:py:meth:`hlstyle`. Result must not be modified by the caller.
+		:param dict kwargs:
+			Additional arguments, usually ``hl_args``.
+
+		:return: ``func`` result, possibly the one computed earlier for the same 
+			arguments.
+		'''
+		kwargs = kwargs or {}
+		if not self.hlstyle_cache_size:
+			return func(fg, bg, attrs, **kwargs)
+		try:
+			key = (
+				func.__name__, fg, bg, attrs,
+				tuple(sorted(kwargs.items())) if kwargs else None,
+				self.get_hlstyle_cache_key(),
+			)
+			return self.hlstyle_cache[key]
+		except TypeError:
+			# Unhashable key
+			return func(fg, bg, attrs, **kwargs)
+		except KeyError:
+			pass
+		ret = func(fg, bg, attrs, **kwargs)
+		self.hlstyle_cache[key] = ret
+		while len(self.hlstyle_cache) > self.hlstyle_cache_size:
+			self.hlstyle_cache.popitem(last=False)
+		return ret
+
 	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
 		'''Output highlighted chunk.
 
 		This implementation just outputs :py:meth:`hlstyle` joined with
 		``contents``.
 		'''
-		return self.hlstyle(fg, bg, attrs, **kwargs) + (contents or '')
+		return self.cached_style(self.hlstyle, fg, bg, attrs, kwargs) + (contents or '')
@@ -12,24 +12,33 @@ class I3barRenderer(Renderer):
 	Currently works only for i3bgbar (i3 bar with custom patches).
 	'''
 
+	hlstyle_cache_size = 256
+	reuse_rendered_segments = True
+
 	@staticmethod
 	def hlstyle(*args, **kwargs):
 		# We don’t need to explicitly reset attributes, so skip those calls
 		return ''
 
+	@staticmethod
+	def colors(fg=None, bg=None, attrs=None, **kwargs):
+		'''Output tuple with ``(key, value)`` pairs with block colors'''
+		colors = ()
+		if fg is not None:
+			if fg is not False and fg[1] is not False:
+				colors += (('color', '#{0:06x}'.format(fg[1])),)
+		if bg is not None:
+			if bg is not False and bg[1] is not False:
+				colors += (('background', '#{0:06x}'.format(bg[1])),)
+		return colors
+
 	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
 		segment = {
 			'full_text': contents,
 			'separator': False,
 			'separator_block_width': 0,  # no separators
 		}
-
-		if fg is not None:
-			if fg is not False and fg[1] is not False:
-				segment['color'] = '#{0:06x}'.format(fg[1])
-		if bg is not None:
-			if bg is not False and bg[1] is not False:
-				segment['background'] = '#{0:06x}'.format(bg[1])
+		segment.update(self.cached_style(self.colors, fg, bg, attrs, kwargs))
 		return json.dumps(segment) + ','
 
 
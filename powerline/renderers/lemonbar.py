@@ -1,6 +1,9 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
+from itertools import chain
+from collections import OrderedDict
+
 from powerline.renderer import Renderer
 from powerline.theme import Theme
 from powerline.colorscheme import ATTR_UNDERLINE
@@ -16,12 +19,17 @@ class LemonbarRenderer(Renderer):
 	character_translations = Renderer.character_translations.copy()
 	character_translations[ord('%')] = '%%{}'
 
+	hlstyle_cache_size = 256
+	reuse_rendered_segments = True
+
 	@staticmethod
 	def hlstyle(*args, **kwargs):
 		# We don’t need to explicitly reset attributes, so skip those calls
 		return ''
 
-	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
+	@staticmethod
+	def format_start(fg=None, bg=None, attrs=None, **kwargs):
+		'''Output formatting blocks which start highlighted chunk'''
 		text = ''
 
 		if fg is not None:
@@ -34,7 +42,10 @@ class LemonbarRenderer(Renderer):
 		if attrs & ATTR_UNDERLINE:
 			text += '%{+u}'
 
-		return text + contents + '%{F-B--u}'
+		return text
+
+	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
+		return self.cached_style(self.format_start, fg, bg, attrs, kwargs) + contents + '%{F-B--u}'
 
 	def render(self, *args, **kwargs):
 		return '%{{l}}{0}%{{r}}{1}'.format(
@@ -42,6 +53,57 @@ class LemonbarRenderer(Renderer):
 			super(LemonbarRenderer, self).render(side='right', segment_info={'output': kwargs.get('matcher_info')}, *args, **kwargs),
 		)
 
+	def render_iter(self, **kwargs):
+		segment_info = {'output': kwargs.get('matcher_info')}
+		return chain(
+			('%{l}',),
+			super(LemonbarRenderer, self).render(side='left', segment_info=segment_info, output_chunks=True, **kwargs),
+			('%{r}',),
+			super(LemonbarRenderer, self).render(side='right', segment_info=segment_info, output_chunks=True, **kwargs),
+		)
+
+	def render_outputs(self, outputs, mode=None, **kwargs):
+		'''Render bars for several outputs at once
+
+		Segments which declare their inputs (see 
+		:py:func:`powerline.theme.render_cache_inputs`) are run only once for 
+		all outputs where these inputs are the same, other segments (e.g. ones 
+		which depend on the output) are run once for each output. Outputs which 
+		use the same theme and where all segments declare their inputs with the 
+		same values are also fitted into their widths at once.
+
+		:param list outputs:
+			List of ``(output_name, width)`` pairs.
+
+		:return: list of rendered strings, one for each output.
+		'''
+		groups = OrderedDict()
+		for index, (output, width) in enumerate(outputs):
+			theme = self.get_theme(output)
+			segment_info = self.get_segment_info({'output': output}, mode)
+			key = (id(theme),) + tuple((
+				theme.get_render_cache_key(side, 0, segment_info)[0]
+				for side in ('left', 'right')
+			))
+			if None in key:
+				# Segment contents may depend on the output.
+				key = index
+			groups.setdefault(key, []).append((index, output, width))
+		ret = [None] * len(outputs)
+		shared_segments = {}
+		for group in groups.values():
+			output = group[0][1]
+			widths = [width for index, output_name, width in group]
+			sides = [
+				super(LemonbarRenderer, self).render_widths(
+					widths, mode=mode, side=side, segment_info={'output': output},
+					matcher_info=output, shared_segments=shared_segments, **kwargs)
+				for side in ('left', 'right')
+			]
+			for (index, output_name, width), left, right in zip(group, *sides):
+				ret[index] = '%{{l}}{0}%{{r}}{1}'.format(left, right)
+		return ret
+
 	def get_theme(self, matcher_info):
 		if not matcher_info or matcher_info not in self.local_themes:
 			return self.theme
@@ -10,13 +10,17 @@ from powerline.colorscheme import ATTR_BOLD, ATTR_ITALIC, ATTR_UNDERLINE
 class PangoMarkupRenderer(Renderer):
 	'''Powerline Pango markup segment renderer.'''
 
+	hlstyle_cache_size = 256
+	reuse_rendered_segments = True
+
 	@staticmethod
 	def hlstyle(*args, **kwargs):
 		# We don’t need to explicitly reset attributes, so skip those calls
 		return ''
 
-	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
-		'''Highlight a segment.'''
+	@staticmethod
+	def span_start(fg=None, bg=None, attrs=None, **kwargs):
+		'''Output opening ``span`` tag for the given highlighting'''
 		awesome_attr = []
 		if fg is not None:
 			if fg is not False and fg[1] is not False:
@@ -31,7 +35,11 @@ class PangoMarkupRenderer(Renderer):
 				awesome_attr += ['font_style="italic"']
 			if attrs & ATTR_UNDERLINE:
 				awesome_attr += ['underline="single"']
-		return '<span ' + ' '.join(awesome_attr) + '>' + contents + '</span>'
+		return '<span ' + ' '.join(awesome_attr) + '>'
+
+	def hl(self, contents, fg=None, bg=None, attrs=None, **kwargs):
+		'''Highlight a segment.'''
+		return self.cached_style(self.span_start, fg, bg, attrs, kwargs) + contents + '</span>'
 
 	escape = staticmethod(_escape)
 
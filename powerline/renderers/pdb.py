@@ -39,6 +39,8 @@ class PDBRenderer(ReadlineRenderer):
 		return Renderer.render(self, **kwargs)
 
 	if sys.version_info < (3,) and platform.python_implementation() == 'PyPy':
+		chunked_output = False
+
 		def do_render(self, **kwargs):
 			# Make sure that only ASCII characters survive
 			ret = super(PDBRenderer, self).do_render(**kwargs)
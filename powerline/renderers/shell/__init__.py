@@ -84,6 +84,8 @@ class ShellRenderer(PromptRenderer):
 	term_escape_style = 'auto'
 	tmux_escape = False
 	screen_escape = False
+	hlstyle_cache_size = 256
+	reuse_rendered_segments = True
 
 	character_translations = Renderer.character_translations.copy()
 
@@ -105,6 +107,12 @@ class ShellRenderer(PromptRenderer):
 			self.used_term_escape_style = self.term_escape_style
 		return super(ShellRenderer, self).do_render(segment_info=segment_info, **kwargs)
 
+	def get_render_cache_key(self, segment_info):
+		return self.used_term_escape_style
+
+	def get_hlstyle_cache_key(self):
+		return self.used_term_escape_style
+
 	def hlstyle(self, fg=None, bg=None, attrs=None, escape=True, **kwargs):
 		'''Highlight a segment.
 
@@ -164,6 +172,12 @@ class ShellRenderer(PromptRenderer):
 			r = '\033P' + r.replace('\033', '\033\033') + '\033\\'
 		return self.escape_hl_start + r + self.escape_hl_end if escape else r
 
+	def shutdown(self):
+		self.theme.shutdown()
+		for match in (self.local_themes or {}).values():
+			if 'theme' in match:
+				match['theme'].shutdown()
+
 	def get_theme(self, matcher_info):
 		if not matcher_info:
 			return self.theme
@@ -9,6 +9,8 @@ class BashPromptRenderer(ShellRenderer):
 	escape_hl_start = '\\['
 	escape_hl_end = '\\]'
 
+	chunked_output = False
+
 	character_translations = ShellRenderer.character_translations.copy()
 	character_translations[ord('$')] = '\\$'
 	character_translations[ord('`')] = '\\`'
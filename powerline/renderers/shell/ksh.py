@@ -11,6 +11,7 @@ class KshPromptRenderer(ShellRenderer):
 	'''Powerline bash prompt segment renderer.'''
 	escape_hl_start = '\001'
 	escape_hl_end = '\001'
+	chunked_output = False
 
 	def render(self, *args, **kwargs):
 		return '\001\r' + super(KshPromptRenderer, self).render(*args, **kwargs)
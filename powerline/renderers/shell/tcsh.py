@@ -6,6 +6,8 @@ from powerline.renderers.shell.zsh import ZshPromptRenderer
 
 class TcshPromptRenderer(ZshPromptRenderer):
 	'''Powerline tcsh prompt segment renderer.'''
+	chunked_output = False
+
 	character_translations = ZshPromptRenderer.character_translations.copy()
 	character_translations[ord('%')] = '%%'
 	character_translations[ord('\\')] = '\\\\'
@@ -26,6 +26,8 @@ mode_translations = {
 class VimRenderer(Renderer):
 	'''Powerline vim segment renderer.'''
 
+	chunked_output = False
+
 	character_translations = Renderer.character_translations.copy()
 	character_translations[ord('%')] = '%%'
 
@@ -125,6 +125,7 @@ def process_segment_lister(pl, segment_info, parsed_segments, side, mode, colors
 				subsegment,
 				mode,
 				colorscheme,
+				copy_segment=not subsegment_update,
 			)
 		new_pslen = len(parsed_segments)
 		while parsed_segments[new_pslen - 1]['literal_contents'][1]:
@@ -164,8 +165,16 @@ def set_segment_highlighting(pl, colorscheme, segment, mode):
 		return True
 
 
-def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colorscheme):
-	segment = segment.copy()
+def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colorscheme, copy_segment=True):
+	'''Compute segment contents and append resulting segments to the list
+
+	:param dict segment:
+		Segment dictionary, as returned by segment getter. Is never modified 
+		if ``copy_segment`` is true: appended segments are fresh copies.
+	:param bool copy_segment:
+		If false, segment is a copy owned by the caller which may be appended 
+		to the list as is (instead of being copied once more).
+	'''
 	pl.prefix = segment['name']
 	if segment['type'] in ('function', 'segment_list'):
 		try:
@@ -181,9 +190,9 @@ def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colo
 			return
 
 		if isinstance(contents, list):
-			# Needs copying here, but it was performed at the very start of the 
-			# function
-			segment_base = segment
+			# Keys moved to the outer subsegments are reset in all copies, 
+			# segment itself is left intact.
+			base_update = {}
 			if contents:
 				draw_divider_position = -1 if side == 'left' else 0
 				for key, i, newval in (
@@ -193,10 +202,11 @@ def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colo
 					('draw_hard_divider', draw_divider_position, True),
 				):
 					try:
-						contents[i][key] = segment_base.pop(key)
-						segment_base[key] = newval
+						contents[i][key] = segment[key]
 					except KeyError:
 						pass
+					else:
+						base_update[key] = newval
 
 			draw_inner_divider = None
 			if side == 'right':
@@ -206,7 +216,8 @@ def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colo
 				append = lambda item: parsed_segments.insert(pslen, item)
 
 			for subsegment in (contents if side == 'right' else reversed(contents)):
-				segment_copy = segment_base.copy()
+				segment_copy = segment.copy()
+				segment_copy.update(base_update)
 				segment_copy.update(subsegment)
 				if draw_inner_divider is not None:
 					segment_copy['draw_soft_divider'] = draw_inner_divider
@@ -214,10 +225,14 @@ def process_segment(pl, side, segment_info, parsed_segments, segment, mode, colo
 				if set_segment_highlighting(pl, colorscheme, segment_copy, mode):
 					append(segment_copy)
 		else:
+			if copy_segment:
+				segment = segment.copy()
 			segment['contents'] = contents
 			if set_segment_highlighting(pl, colorscheme, segment, mode):
 				parsed_segments.append(segment)
 	elif segment['width'] == 'auto' or (segment['type'] == 'string' and segment['contents'] is not None):
+		if copy_segment:
+			segment = segment.copy()
 		if set_segment_highlighting(pl, colorscheme, segment, mode):
 			parsed_segments.append(segment)
 
@@ -244,6 +259,7 @@ get_fallback_segment = {
 	'truncate': None,
 	'startup': None,
 	'shutdown': None,
+	'render_cache_inputs': None,
 	'_rendered_raw': '',
 	'_rendered_hl': '',
 	'_len': None,
@@ -392,6 +408,7 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 				'truncate': None,
 				'startup': None,
 				'shutdown': None,
+				'render_cache_inputs': None,
 				'_rendered_raw': '',
 				'_rendered_hl': '',
 				'_len': None,
@@ -419,6 +436,14 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 			expand_func = None
 			truncate_func = None
 
+		if segment_type == 'string':
+			render_cache_inputs = ((), (), None)
+		else:
+			render_cache_inputs = getattr(_contents_func, 'powerline_render_cache_inputs', None)
+		if display_condition is not always_true:
+			# Selector functions may use anything
+			render_cache_inputs = None
+
 		return {
 			'name': name or function_name,
 			'type': segment_type,
@@ -441,6 +466,7 @@ def gen_segment_getter(pl, ext, common_config, theme_configs, default_module, ge
 			'truncate': truncate_func,
 			'startup': startup_func,
 			'shutdown': shutdown_func,
+			'render_cache_inputs': render_cache_inputs,
 			'_rendered_raw': '',
 			'_rendered_hl': '',
 			'_len': None,
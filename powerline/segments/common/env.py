@@ -4,7 +4,7 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 import os
 
 from powerline.lib.unicode import out_u
-from powerline.theme import requires_segment_info
+from powerline.theme import requires_segment_info, render_cache_inputs
 from powerline.segments import Segment, with_docstring
 
 
@@ -19,6 +19,7 @@ def environment(pl, segment_info, variable=None):
 
 
 @requires_segment_info
+@render_cache_inputs(environ=('VIRTUAL_ENV', 'CONDA_DEFAULT_ENV'))
 def virtualenv(pl, segment_info, ignore_venv=False, ignore_conda=False, ignored_names=("venv", ".venv")):
 	'''Return the name of the current Python or conda virtualenv.
 	:param list ignored_names:
@@ -40,6 +41,7 @@ def virtualenv(pl, segment_info, ignore_venv=False, ignore_conda=False, ignored_
 
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('getcwd', 'home'))
 class CwdSegment(Segment):
 	def argspecobjs(self):
 		for obj in super(CwdSegment, self).argspecobjs():
@@ -164,6 +166,7 @@ _geteuid = getattr(os, 'geteuid', lambda: 1)
 
 
 @requires_segment_info
+@render_cache_inputs(environ=('_POWERLINE_RUNNING_SHELL_TESTS',))
 def user(pl, segment_info, hide_user=None, hide_domain=False):
 	'''Return the current user.
 
@@ -10,10 +10,11 @@ from powerline.lib.threaded import ThreadedSegment, KwThreadedSegment
 from powerline.lib.monotonic import monotonic
 from powerline.lib.humanize_bytes import humanize_bytes
 from powerline.segments import with_docstring
-from powerline.theme import requires_segment_info
+from powerline.theme import requires_segment_info, render_cache_inputs
 
 
 @requires_segment_info
+@render_cache_inputs(environ=('_POWERLINE_RUNNING_SHELL_TESTS', 'SSH_CLIENT'))
 def hostname(pl, segment_info, only_if_ssh=False, exclude_domain=False):
 	'''Return the current hostname.
 
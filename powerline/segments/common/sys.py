@@ -8,11 +8,13 @@ from multiprocessing import cpu_count as _cpu_count
 from powerline.lib.threaded import ThreadedSegment
 from powerline.lib import add_divider_highlight_group
 from powerline.segments import with_docstring
+from powerline.theme import render_cache_inputs
 
 
 cpu_count = None
 
 
+@render_cache_inputs(ttl=1)
 def system_load(pl, format='{avg:.1f}', threshold_good=1, threshold_bad=2,
                 track_cpu_count=False, short=False):
 	'''Return system load average.
@@ -147,6 +149,7 @@ else:
 		raise NotImplementedError
 
 
+@render_cache_inputs(ttl=1)
 @add_divider_highlight_group('background:divider')
 def uptime(pl, days_format='{days:d}d', hours_format=' {hours:d}h', minutes_format=' {minutes:02d}m',
 		seconds_format=' {seconds:02d}s', shorten_len=3):
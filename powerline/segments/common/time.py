@@ -3,7 +3,10 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 from datetime import datetime
 
+from powerline.theme import render_cache_inputs
 
+
+@render_cache_inputs(ttl=1)
 def date(pl, format='%Y-%m-%d', istime=False, timezone=None):
 	'''Return the current date.
 
@@ -45,6 +48,7 @@ UNICODE_TEXT_TRANSLATION = {
 }
 
 
+@render_cache_inputs(ttl=1)
 def fuzzy_time(pl, format='{minute_str} {hour_str}', unicode_text=False, timezone=None, hour_str=['twelve', 'one', 'two', 'three', 'four',
     'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven'], minute_str = {
 	'0':  'o\'clock', '5':  'five past', '10': 'ten past','15': 'quarter past',
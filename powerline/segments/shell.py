@@ -1,13 +1,14 @@
 # vim:fileencoding=utf-8:noet
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-from powerline.theme import requires_segment_info
+from powerline.theme import requires_segment_info, render_cache_inputs
 from powerline.segments import with_docstring
 from powerline.segments.common.env import CwdSegment
 from powerline.lib.unicode import out_u
 
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('args.jobnum',))
 def jobnum(pl, segment_info, show_zero=False):
 	'''Return the number of jobs.
 
@@ -29,6 +30,7 @@ except ImportError:
 	exit_codes = dict()
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('args.last_exit_code',))
 def last_status(pl, segment_info, signal_names=True):
 	'''Return last exit code.
 
@@ -49,6 +51,7 @@ def last_status(pl, segment_info, signal_names=True):
 
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('args.last_exit_code', 'args.last_pipe_status'))
 def last_pipe_status(pl, segment_info, signal_names=True):
 	'''Return last pipe status.
 
@@ -79,6 +82,7 @@ def last_pipe_status(pl, segment_info, signal_names=True):
 		return None
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('mode', 'default_mode'))
 def mode(pl, segment_info, override={'vicmd': 'COMMND', 'viins': 'INSERT'}, default=None):
 	'''Return the current mode.
 
@@ -110,6 +114,7 @@ def mode(pl, segment_info, override={'vicmd': 'COMMND', 'viins': 'INSERT'}, defa
 
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('parser_state',))
 def continuation(pl, segment_info, omit_cmdsubst=True, right_align=False, renames={}):
 	'''Display parser state.
 
@@ -158,6 +163,7 @@ def continuation(pl, segment_info, omit_cmdsubst=True, right_align=False, rename
 
 
 @requires_segment_info
+@render_cache_inputs(segment_info=('getcwd', 'home', 'shortened_path'))
 class ShellCwdSegment(CwdSegment):
 	def get_shortened_path(self, pl, segment_info, use_shortened_path=True, **kwargs):
 		if use_shortened_path:
@@ -2,8 +2,10 @@
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
 from powerline.bindings.tmux import get_tmux_output
+from powerline.theme import render_cache_inputs
 
 
+@render_cache_inputs(ttl=1)
 def attached_clients(pl, minimum=1):
 	'''Return the number of tmux clients attached to the currently active session
 
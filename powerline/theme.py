@@ -3,8 +3,10 @@ from __future__ import (unicode_literals, division, absolute_import, print_funct
 
 import itertools
 
-from powerline.segment import gen_segment_getter, process_segment, get_fallback_segment
+from powerline.segment import (gen_segment_getter, process_segment, get_fallback_segment,
+                               set_segment_highlighting)
 from powerline.lib.unicode import u, safe_unicode
+from powerline.lib.monotonic import monotonic
 
 
 def requires_segment_info(func):
@@ -17,6 +19,84 @@ def requires_filesystem_watcher(func):
 	return func
 
 
+def render_cache_inputs(segment_info=(), environ=(), ttl=None):
+	'''Declare everything segment output depends on
+
+	Results of rendering a line are cached only if all segments in it have 
+	this declaration.
+
+	:param tuple segment_info:
+		Keys of the ``segment_info`` dictionary used by segment. Callable 
+		values (e.g. ``getcwd``) are called to get the actual input. Key may 
+		be followed by dot-separated attribute names (e.g. ``args.jobnum``) 
+		if only some attributes of the value are used.
+	:param tuple environ:
+		Names of the environment variables used by segment.
+	:param float ttl:
+		Number of seconds segment output stays valid if inputs did not change. 
+		``None`` means that output depends only on the listed inputs.
+	'''
+	def decorator(func):
+		func.powerline_render_cache_inputs = (tuple(segment_info), tuple(environ), ttl)
+		return func
+	return decorator
+
+
+def merge_render_cache_inputs(inputs):
+	'''Merge render cache inputs of multiple segments
+
+	:param iterable inputs:
+		Iterable with ``(segment_info_keys, environ_keys, ttl)`` triples, see 
+		:py:func:`render_cache_inputs`.
+
+	:return:
+		Triple in the same format or ``None`` if any of the inputs is ``None``.
+	'''
+	segment_info_keys = set()
+	environ_keys = set()
+	ttl = None
+	for segment_inputs in inputs:
+		if segment_inputs is None:
+			return None
+		segment_info_keys.update(segment_inputs[0])
+		environ_keys.update(segment_inputs[1])
+		if segment_inputs[2] is not None and (ttl is None or segment_inputs[2] < ttl):
+			ttl = segment_inputs[2]
+	return (tuple(sorted(segment_info_keys)), tuple(sorted(environ_keys)), ttl)
+
+
+def get_render_cache_value(segment_info, key):
+	'''Get segment_info value converted to a hashable render cache key component
+	'''
+	attrs = key.split('.')
+	value = segment_info.get(attrs.pop(0))
+	for attr in attrs:
+		value = getattr(value, attr, None)
+	if callable(value):
+		value = value()
+	try:
+		hash(value)
+	except TypeError:
+		return repr(value)
+	else:
+		return value
+
+
+def get_render_cache_inputs_key(inputs, segment_info):
+	'''Get hashable key identifying current values of the given inputs
+
+	:param tuple inputs:
+		``(segment_info_keys, environ_keys, ttl)`` triple, see 
+		:py:func:`render_cache_inputs`.
+	'''
+	segment_info_keys, environ_keys, ttl = inputs
+	environ = segment_info['environ']
+	return (
+		tuple((get_render_cache_value(segment_info, key) for key in segment_info_keys))
+		+ tuple((environ.get(key) for key in environ_keys))
+	)
+
+
 def new_empty_segment_line():
 	return {
 		'left': [],
@@ -44,6 +124,35 @@ expand_functions = {
 }
 
 
+justify_functions = {
+	'l': lambda contents, width: contents.ljust(width),
+	'r': lambda contents, width: contents.rjust(width),
+	'c': lambda contents, width: contents.center(width),
+}
+
+
+class CompiledSegment(object):
+	'''Theme segment prepared for rendering when theme is loaded
+
+	:param dict segment:
+		Segment dictionary, as returned by segment getter. For static segments 
+		this is a copy with final contents.
+	:param bool static:
+		True if segment contents do not depend on anything (i.e. segment is 
+		a string segment). Contents of such segments are computed (with 
+		``before``, ``after``, ``width`` and ``align`` applied) once, on each 
+		render only highlighting is computed.
+	'''
+
+	__slots__ = ('segment', 'name', 'display_condition', 'static')
+
+	def __init__(self, segment, static):
+		self.segment = segment
+		self.name = segment['name']
+		self.display_condition = segment['display_condition']
+		self.static = static
+
+
 class Theme(object):
 	def __init__(self,
 	             ext,
@@ -55,8 +164,10 @@ class Theme(object):
 	             colorscheme,
 	             main_theme_config=None,
 	             run_once=False,
-	             shutdown_event=None):
+	             shutdown_event=None,
+	             segment_stats=None):
 		self.colorscheme = colorscheme
+		self.segment_stats = segment_stats
 		self.dividers = theme_config['dividers']
 		self.dividers = dict((
 			(key, dict((k, u(v))
@@ -103,6 +214,38 @@ class Theme(object):
 									pl.error('Exception during {0} startup: {1}', segment['name'], str(e))
 									continue
 						self.segments[-1][side].append(segment)
+		self.compiled_segments = [
+			dict((
+				(side, [self.compile_segment(segment) for segment in line[side]])
+				for side in ('left', 'right')
+			))
+			for line in self.segments
+		]
+		self.render_cache_inputs = [
+			dict((
+				(side, merge_render_cache_inputs((
+					segment['render_cache_inputs'] for segment in line[side]
+				)))
+				for side in ('left', 'right')
+			))
+			for line in self.segments
+		]
+
+	def get_render_cache_key(self, side, line, segment_info):
+		'''Get render cache key for the given line
+
+		:return:
+			Pair ``(key, ttl)``. ``key`` is ``None`` if rendering results of 
+			the given line must not be cached. ``ttl`` is the number of seconds 
+			result is valid or ``None`` if it is valid forever.
+		'''
+		if side:
+			inputs = self.render_cache_inputs[line][side]
+		else:
+			inputs = merge_render_cache_inputs(self.render_cache_inputs[line].values())
+		if inputs is None:
+			return None, None
+		return get_render_cache_inputs_key(inputs, segment_info), inputs[2]
 
 	def shutdown(self):
 		for line in self.segments:
@@ -123,7 +266,63 @@ class Theme(object):
 	def get_line_number(self):
 		return len(self.segments)
 
-	def get_segments(self, side=None, line=0, segment_info=None, mode=None):
+	def compile_segment(self, segment):
+		'''Resolve static parts of the segment
+
+		:param dict segment:
+			Segment dictionary, as returned by segment getter. Expand function 
+			for segments with ``"width": "auto"`` is set in place.
+
+		:return: :py:class:`CompiledSegment` instance.
+		'''
+		if segment['width'] == 'auto' and segment['expand'] is None:
+			self.pl.prefix = segment['name']
+			segment['expand'] = expand_functions.get(segment['align'])
+			if segment['expand'] is None:
+				self.pl.error('Align argument must be “r”, “l” or “c”, not “{0}”', segment['align'])
+		if (
+			segment['type'] == 'string'
+			and (segment['contents'] is not None or segment['width'] == 'auto')
+		):
+			static_segment = segment.copy()
+			if self.finish_segment(static_segment):
+				return CompiledSegment(static_segment, True)
+		return CompiledSegment(segment, False)
+
+	def finish_segment(self, segment):
+		'''Apply ``before``, ``after``, ``width`` and ``align`` to contents
+
+		Modifies segment in place.
+
+		:return: True if successful, False if segment is to be replaced with 
+			the fallback segment.
+		'''
+		self.pl.prefix = segment['name']
+		try:
+			width = segment['width']
+			if width == 'auto' and segment['expand'] is None:
+				segment['expand'] = expand_functions.get(segment['align'])
+				if segment['expand'] is None:
+					self.pl.error('Align argument must be “r”, “l” or “c”, not “{0}”', segment['align'])
+
+			try:
+				segment['contents'] = segment['before'] + u(
+					segment['contents'] if segment['contents'] is not None else ''
+				) + segment['after']
+			except Exception as e:
+				self.pl.exception('Failed to compute segment contents: {0}', str(e))
+				segment['contents'] = safe_unicode(segment.get('contents'))
+			# Align segment contents
+			if width and width != 'auto':
+				justify = justify_functions.get(segment['align'])
+				if justify:
+					segment['contents'] = justify(segment['contents'], width)
+		except Exception as e:
+			self.pl.exception('Failed to compute segment: {0}', str(e))
+			return False
+		return True
+
+	def get_segments(self, side=None, line=0, segment_info=None, mode=None, shared_segments=None):
 		'''Return all segments.
 
 		Function segments are called, and all segments get their before/after
@@ -132,51 +331,57 @@ class Theme(object):
 		:param int line:
 			Line number for which segments should be obtained. Is counted from 
 			zero (botmost line).
+		:param dict shared_segments:
+			Dictionary which keeps results of segments which declared their 
+			inputs (see :py:func:`render_cache_inputs`). Calls which receive 
+			the same dictionary run such segments only once for each set of 
+			input values, reusing copies of the results afterwards. Results 
+			are not expired: dictionary is to be used only for segments 
+			rendered at the same time, e.g. for bars on different outputs.
 		'''
 		for side in [side] if side else ['left', 'right']:
 			parsed_segments = []
-			for segment in self.segments[line][side]:
-				if segment['display_condition'](self.pl, segment_info, mode):
+			for compiled in self.compiled_segments[line][side]:
+				if not compiled.display_condition(self.pl, segment_info, mode):
+					continue
+				if self.segment_stats:
+					start_time = monotonic()
+				if compiled.static:
+					self.pl.prefix = compiled.name
+					segment = compiled.segment.copy()
+					if set_segment_highlighting(self.pl, self.colorscheme, segment, mode):
+						parsed_segments.append(segment)
+				else:
+					shared_key = None
+					if shared_segments is not None and compiled.segment['render_cache_inputs'] is not None:
+						shared_key = (id(compiled), mode, get_render_cache_inputs_key(
+							compiled.segment['render_cache_inputs'], segment_info))
+						shared = shared_segments.get(shared_key)
+						if shared is not None:
+							parsed_segments.extend((segment.copy() for segment in shared))
+							continue
+					# process_segment() only appends segments, each a fresh copy 
+					# which may be modified in place.
+					first = len(parsed_segments)
 					process_segment(
 						self.pl,
 						side,
 						segment_info,
 						parsed_segments,
-						segment,
+						compiled.segment,
 						mode,
 						self.colorscheme,
 					)
+					for i in range(first, len(parsed_segments)):
+						if not self.finish_segment(parsed_segments[i]):
+							fallback = get_fallback_segment()
+							fallback.update(side=side)
+							parsed_segments[i] = fallback
+					if shared_key is not None:
+						shared_segments[shared_key] = [
+							segment.copy() for segment in parsed_segments[first:]
+						]
+				if self.segment_stats:
+					self.segment_stats(compiled.name, monotonic() - start_time)
 			for segment in parsed_segments:
-				self.pl.prefix = segment['name']
-				try:
-					width = segment['width']
-					align = segment['align']
-					if width == 'auto' and segment['expand'] is None:
-						segment['expand'] = expand_functions.get(align)
-						if segment['expand'] is None:
-							self.pl.error('Align argument must be “r”, “l” or “c”, not “{0}”', align)
-
-					try:
-						segment['contents'] = segment['before'] + u(
-							segment['contents'] if segment['contents'] is not None else ''
-						) + segment['after']
-					except Exception as e:
-						self.pl.exception('Failed to compute segment contents: {0}', str(e))
-						segment['contents'] = safe_unicode(segment.get('contents'))
-					# Align segment contents
-					if segment['width'] and segment['width'] != 'auto':
-						if segment['align'] == 'l':
-							segment['contents'] = segment['contents'].ljust(segment['width'])
-						elif segment['align'] == 'r':
-							segment['contents'] = segment['contents'].rjust(segment['width'])
-						elif segment['align'] == 'c':
-							segment['contents'] = segment['contents'].center(segment['width'])
-					# We need to yield a copy of the segment, or else mode-dependent
-					# segment contents can’t be cached correctly e.g. when caching
-					# non-current window contents for vim statuslines
-					yield segment.copy()
-				except Exception as e:
-					self.pl.exception('Failed to compute segment: {0}', str(e))
-					fallback = get_fallback_segment()
-					fallback.update(side=side)
-					yield fallback
+				yield segment
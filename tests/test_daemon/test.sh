@@ -3,6 +3,8 @@
 
 enter_suite daemon final
 
+make_test_root
+
 export ADDRESS="powerline-ipc-test-$$"
 echo "Powerline address: $ADDRESS"
 if "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" ; then
@@ -38,4 +40,98 @@ else
 	fail "-k" F "powerline-daemon -k failed with exit code $?"
 fi
 
+if "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --workers=2 ; then
+	sleep 1
+	if ! ( \
+		cd "$ROOT/tests/test_daemon" \
+		&& "$PYTHON" "$ROOT/client/powerline.py" --socket "$ADDRESS" \
+			-p"$ROOT/powerline/config_files" shell left \
+		| grep "test_daemon"
+	) ; then
+		fail "workers" F "Output lacks string “tests” when using workers"
+	fi
+	if ! ( \
+		"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --stats \
+		| grep '"requests": 1,'
+	) ; then
+		fail "stats" F "Statistics do not report processed request"
+	fi
+	"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" -k
+else
+	fail "workers-exitcode" E "Daemon with workers exited with status $?"
+fi
+
+if "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --max-instances=1 ; then
+	sleep 1
+	for spaces in 0 1 0 ; do
+		POWERLINE_CONFIG_OVERRIDES="common.spaces=$spaces" \
+			"$PYTHON" "$ROOT/client/powerline.py" --socket "$ADDRESS" \
+				-p"$ROOT/powerline/config_files" shell left >/dev/null
+	done
+	if ! ( \
+		"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --stats \
+		| grep '"evicted_powerline_instances": 2,'
+	) ; then
+		fail "evict" F "Powerline instances were not evicted"
+	fi
+	"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" -k
+else
+	fail "evict-exitcode" E "Daemon with --max-instances exited with status $?"
+fi
+
+if "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --workers=1 --worker-type=process --render-cache=10 ; then
+	sleep 1
+	for i in 1 2 ; do
+		"$PYTHON" "$ROOT/client/powerline.py" --socket "$ADDRESS" \
+			-p"$ROOT/powerline/config_files" shell left >/dev/null
+	done
+	if ! ( \
+		"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --stats \
+		| grep '"render_cache_hits": 1,'
+	) ; then
+		fail "render-cache" F "Statistics do not report render cache hits"
+	fi
+	"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" -k
+else
+	fail "render-cache-exitcode" E "Daemon with --render-cache exited with status $?"
+fi
+
+if "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --event-loop=select --preload shell tmux ; then
+	sleep 1
+	if ! ( \
+		"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --stats \
+		| grep '"powerline_instances": 2,'
+	) ; then
+		fail "preload" F "Powerline instances were not preloaded"
+	fi
+	"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" -k
+else
+	fail "preload-exitcode" E "Daemon with --preload exited with status $?"
+fi
+
+if ! "$PYTHON" -c 'import sys; sys.exit(sys.version_info < (3, 7))' ; then
+	skip "publish" "asyncio event loop requires Python-3.7 or later"
+elif ! ${CC:-cc} -o "$TEST_ROOT/powerline" "$ROOT/client/powerline.c" ; then
+	skip "publish" "Failed to compile C client"
+elif "$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --event-loop=asyncio --publish-dir="$TEST_ROOT/publish" ; then
+	sleep 1
+	# The first request is answered by the daemon, the following ones are 
+	# answered by the C client itself from the published file.
+	for i in 1 2 3 ; do
+		POWERLINE_PUBLISH_DIR="$TEST_ROOT/publish" \
+			"$TEST_ROOT/powerline" --socket "$ADDRESS" \
+				-p"$ROOT/powerline/config_files" tmux right >/dev/null
+		sleep 2
+	done
+	if ! ( \
+		"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" --stats \
+		| grep '"requests": 1,'
+	) ; then
+		fail "publish" F "C client did not use published answers"
+	fi
+	"$PYTHON" "$ROOT/scripts/powerline-daemon" -s"$ADDRESS" -k
+else
+	fail "publish-exitcode" E "Daemon with --publish-dir exited with status $?"
+fi
+
 exit_suite
@@ -11,7 +11,7 @@ if sys.version_info < (3,):
 else:
 	from io import StringIO as StrIO
 
-from powerline.commands.main import get_argparser, finish_args
+from powerline.commands.main import get_argparser, finish_args, split_requests
 
 from tests.modules import TestCase
 from tests.modules.lib import replace_attr
@@ -143,6 +143,16 @@ class TestParser(TestCase):
 					out.getvalue(),
 				))
 
+	def test_split_requests(self):
+		self.assertEqual(split_requests([]), [[]])
+		self.assertEqual(split_requests(['shell', 'left']), [['shell', 'left']])
+		self.assertEqual(split_requests([
+			'shell', 'aboveleft', '-r.bash', '--next', 'shell', 'left', '--renderer-arg=local_theme=continuation',
+		]), [
+			['shell', 'aboveleft', '-r.bash'],
+			['shell', 'left', '--renderer-arg=local_theme=continuation'],
+		])
+
 
 if __name__ == '__main__':
 	from tests.modules import main
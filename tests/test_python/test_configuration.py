@@ -14,6 +14,10 @@ from tests.modules.lib.config_mock import (get_powerline, get_powerline_raw,
                                            swap_attributes, UT)
 from tests.modules.lib import Args, replace_item
 
+from powerline.theme import requires_segment_info, render_cache_inputs
+from powerline.colorscheme import Colorscheme, pick_gradient_value, ATTR_BOLD
+from powerline.lib.unicode import FailedUnicode
+
 
 def highlighted_string(s, group, **kwargs):
 	ret = {
@@ -350,6 +354,55 @@ class TestColorschemesHierarchy(TestRender):
 		self.assertEqual(p.logger._pop_msgs(), [])
 
 
+class TestColorscheme(TestCase):
+	def get_colorscheme(self):
+		return Colorscheme(
+			{
+				'groups': {
+					'g1': {'fg': 'col1', 'bg': 'col2', 'attrs': ['bold']},
+					'g2': 'g1',
+					'g3': {'fg': 'grad1', 'bg': 'col2', 'attrs': []},
+				},
+				'mode_translations': {
+					'm1': {'colors': {'col1': 'col2'}},
+					'm2': {'groups': {'g1': {'fg': 'col2', 'bg': 'col1', 'attrs': []}}},
+				},
+			},
+			{
+				'colors': {'col1': 1, 'col2': [2, '00ff00']},
+				'gradients': {'grad1': [[1, 2, 3, 4, 5], ['000000', '111111', '222222']]},
+			},
+		)
+
+	def test_highlighting(self):
+		colorscheme = self.get_colorscheme()
+		for i in range(2):
+			self.assertEqual(colorscheme.get_highlighting(['x', 'g2'], None), {
+				'fg': (1, 0xc00000), 'bg': (2, 0x00ff00), 'attrs': ATTR_BOLD,
+			})
+			self.assertEqual(colorscheme.get_highlighting(['g2'], 'm1'), {
+				'fg': (2, 0x00ff00), 'bg': (2, 0x00ff00), 'attrs': ATTR_BOLD,
+			})
+			self.assertEqual(colorscheme.get_highlighting(['g2'], 'm2'), {
+				'fg': (2, 0x00ff00), 'bg': (1, 0xc00000), 'attrs': 0,
+			})
+		self.assertRaises(KeyError, colorscheme.get_highlighting, ['x'], None)
+		self.assertRaises(KeyError, colorscheme.get_highlighting, ['g3'], None)
+
+	def test_gradient(self):
+		colorscheme = self.get_colorscheme()
+		grad_lists = colorscheme.gradients['grad1']
+		for i in range(2):
+			for gradient_level in range(0, 1001):
+				gradient_level /= 10
+				self.assertEqual(colorscheme.get_highlighting(['g3'], None, gradient_level), {
+					'fg': tuple((pick_gradient_value(grad_list, gradient_level) for grad_list in grad_lists)),
+					'bg': (2, 0x00ff00),
+					'attrs': 0,
+				})
+		self.assertEqual(len(colorscheme.gradient_cache), 7)
+
+
 class TestThemeHierarchy(TestRender):
 	@add_args
 	def test_hierarchy(self, p, config):
@@ -653,6 +706,219 @@ class TestSegmentAttributes(TestRender):
 		with replace_item(sys.modules, 'bar', Args(m1=m1)):
 			self.assertRenderEqual(p, '{56} p{6-}>>{--}', width=4)
 
+	@add_args
+	def test_string_attributes(self, p, config):
+		config['themes/test/default']['segments'] = {
+			'left': [
+				highlighted_string('a', 'str1', before='<', width=4, align='r'),
+				highlighted_string('b', 'str2', after='>', width='auto', align='c'),
+			]
+		}
+		self.assertRenderEqual(p, '{121}   <a{24}>>{344}b>{4-}>>{--}')
+		self.assertRenderEqual(p, '{121}   <a{24}>>{344}   b>  {4-}>>{--}', width=16)
+		self.assertRenderEqual(p, '{121}   <a{24}>>{344}b>{4-}>>{--}')
+
+	@add_args
+	def test_list_attributes(self, p, config):
+		def m1(**kwargs):
+			return [
+				{'contents': 'a', 'highlight_groups': ['str1']},
+				{'contents': 'b', 'highlight_groups': ['str2']},
+			]
+
+		config['themes/test/default']['segments'] = {
+			'left': [
+				{
+					'function': 'bar.m1',
+					'before': '<',
+					'after': '>',
+				}
+			]
+		}
+		with replace_item(sys.modules, 'bar', Args(m1=m1)):
+			self.assertRenderEqual(p, '{121} <a{24}>>{344}b>{4-}>>{--}')
+			self.assertRenderEqual(p, '{121} <a{24}>>{344}b>{4-}>>{--}')
+			segment = p.renderer.theme.segments[0]['left'][0]
+			self.assertEqual((segment['before'], segment['after']), ('<', '>'))
+
+	@add_args
+	def test_priority_many_segments(self, p, config):
+		# Removing each `b' segment turns hard divider before it into soft 
+		# one, so line becomes shorter than by the length of the removed 
+		# segment.
+		config['themes/test/default']['segments'] = {
+			'left': [
+				highlighted_string('a', 'str1') if i % 2 else highlighted_string('b', 'str2', priority=i)
+				for i in range(101)
+			],
+		}
+		self.assertRenderEqual(
+			p,
+			'{344} b' + '{42}>>{121}a{24}>>{344}b' * 50 + '{4-}>>{--}')
+		self.assertRenderEqual(
+			p,
+			'{344} b' + '{42}>>{121}a{24}>>{344}b' * 48 + '{42}>>{121}a' + '{12}>{121}a' + '{2-}>>{--}',
+			width=300)
+		self.assertRenderEqual(
+			p,
+			'{344} b' + '{42}>>{121}a{24}>>{344}b' * 46 + '{42}>>{121}a' + '{12}>{121}a' * 3 + '{2-}>>{--}',
+			width=290)
+
+
+class TestRenderCache(TestRender):
+	@add_args
+	def test_render_cache(self, p, config):
+		calls = []
+
+		@requires_segment_info
+		@render_cache_inputs(segment_info=('key',))
+		def m1(pl, segment_info):
+			calls.append(segment_info['key'])
+			return segment_info['key']
+
+		config['themes/test/default']['segments'] = {
+			'left': [
+				{
+					'function': 'bar.m1'
+				}
+			]
+		}
+		p.renderer_options['render_cache_size'] = 1
+		with replace_item(sys.modules, 'bar', Args(m1=m1)):
+			self.assertRenderEqual(p, '{56} a{6-}>>{--}', segment_info={'key': 'a'})
+			self.assertRenderEqual(p, '{56} a{6-}>>{--}', segment_info={'key': 'a'})
+			self.assertEqual(calls, ['a'])
+			self.assertRenderEqual(p, '{56} b{6-}>>{--}', segment_info={'key': 'b'})
+			self.assertRenderEqual(p, '{56} a{6-}>>{--}', segment_info={'key': 'a'})
+			self.assertEqual(calls, ['a', 'b', 'a'])
+			self.assertRenderEqual(p, '{56} a{6-}>>{--}', segment_info={'key': 'a'}, width=5)
+			self.assertEqual(calls, ['a', 'b', 'a', 'a'])
+
+	@add_args
+	def test_render_cache_undeclared(self, p, config):
+		calls = []
+
+		@requires_segment_info
+		def m1(pl, segment_info):
+			calls.append(segment_info['key'])
+			return segment_info['key']
+
+		config['themes/test/default']['segments'] = {
+			'left': [
+				{
+					'function': 'bar.m1'
+				},
+				highlighted_string('s', 'str1'),
+			]
+		}
+		p.renderer_options['render_cache_size'] = 16
+		with replace_item(sys.modules, 'bar', Args(m1=m1)):
+			self.assertRenderEqual(p, '{56} a{62}>>{121}s{2-}>>{--}', segment_info={'key': 'a'})
+			self.assertRenderEqual(p, '{56} a{62}>>{121}s{2-}>>{--}', segment_info={'key': 'a'})
+			self.assertEqual(calls, ['a', 'a'])
+
+
+class TestReuseRenderedSegments(TestRender):
+	@add_args
+	def test_reuse_rendered_segments(self, p, config):
+		@requires_segment_info
+		def m1(pl, segment_info):
+			return [{'contents': segment_info['key'], 'highlight_groups': [segment_info['group']]}]
+
+		config['themes/test/default']['segments'] = {
+			'left': [
+				highlighted_string('s', 'str1'),
+				{'function': 'bar.m1'},
+				highlighted_string('g', 'str1', width='auto'),
+				highlighted_string('h', 'str2', draw_hard_divider=False),
+			],
+			'right': [
+				highlighted_string('f', 'str2'),
+				{'function': 'bar.m1'},
+			],
+		}
+		renders = [
+			(dict(key='a', group='str1'), None),
+			(dict(key='a', group='str1'), None),
+			(dict(key='b', group='str1'), None),
+			(dict(key='b', group='str2'), None),
+			(dict(key='b', group='str2'), 20),
+			(dict(key='b', group='str2'), 21),
+			(dict(key='ccc', group='str1'), 21),
+			(dict(key='ccc', group='str1'), 5),
+			(dict(key='b', group='str2'), None),
+		]
+		p.renderer_options['reuse_rendered_segments'] = True
+		with replace_item(sys.modules, 'bar', Args(m1=m1)):
+			reused = [
+				(p.render(segment_info=segment_info, width=width), p.render(segment_info=segment_info, width=width, side='right'))
+				for segment_info, width in renders
+			]
+			self.assertTrue(p.renderer.frames)
+			p.renderer.reuse_rendered_segments = False
+			rendered = [
+				(p.render(segment_info=segment_info, width=width), p.render(segment_info=segment_info, width=width, side='right'))
+				for segment_info, width in renders
+			]
+		self.assertEqual(reused, rendered)
+		self.assertEqual(rendered[3][0].replace('\xa0', ' '), '{121} s{24}>>{344}b{42}>>{121}g{24}>>{344}h{34}>{34}|{344}f{34}|{344}b {--}')
+
+
+class TestRenderIter(TestRender):
+	@add_args
+	def test_render_iter(self, p, config):
+		config['themes/test/default']['segments'] = {
+			'left': [
+				highlighted_string('s', 'str1'),
+				highlighted_string('g', 'str2', width='auto'),
+			],
+			'right': [
+				highlighted_string('f', 'str2'),
+			],
+		}
+		for kwargs in (
+			{},
+			{'side': 'left'},
+			{'side': 'right'},
+			{'width': 20},
+			{'width': 20, 'side': 'right'},
+		):
+			chunks = list(p.render_iter(**kwargs))
+			self.assertEqual(''.join(chunks), p.render(**kwargs))
+		self.assertEqual(list(p.render_iter(side='right')), ['{4-}<<{344}f\xa0', '{--}'])
+
+	@add_args
+	def test_render_iter_failure(self, p, config):
+		config['themes/test/default']['segments'] = {
+			'left': [
+				highlighted_string('s', 'str1'),
+				highlighted_string('g', 'str2'),
+			],
+			'right': [],
+		}
+		p.render()
+		hl = p.renderer.hl
+
+		def failing_hl(contents, *args, **kwargs):
+			if contents and failing_contents in contents:
+				raise ValueError('Failed to highlight ' + failing_contents)
+			return hl(contents, *args, **kwargs)
+
+		p.renderer.hl = failing_hl
+		failing_contents = 's'
+		chunks = list(p.render_iter(side='left'))
+		self.assertEqual(chunks, ['Failed to highlight s'])
+		self.assertTrue(isinstance(chunks[0], FailedUnicode))
+		failing_contents = 'g'
+		chunks = list(p.render_iter(side='left'))
+		self.assertEqual(chunks[1:], ['Failed to highlight g'])
+		self.assertTrue(isinstance(chunks[-1], FailedUnicode))
+		self.assertFalse(isinstance(chunks[0], FailedUnicode))
+		self.assertEqual(p.logger._pop_msgs(), [
+			'exception:test:powerline:Failed to render: Failed to highlight s',
+			'exception:test:powerline:Failed to render: Failed to highlight g',
+		])
+
 
 class TestSegmentData(TestRender):
 	@add_args
@@ -794,6 +1060,23 @@ class TestShellEscapes(TestCase):
 				self.assertEqual(powerline.render(segment_info={}, side='left'), '\x1bP\x1b\x1b[0;38;2;192;0;192;48;2;0;128;128m\x1b\\\xa0s\x1bP\x1b\x1b[0;38;2;0;128;128;49;22m\x1b\\>>\x1bP\x1b\x1b[0m\x1b\\')
 
 
+	@with_new_config
+	def test_hlstyle_cache(self, config):
+		from powerline.shell import ShellPowerline
+		import powerline as powerline_module
+		with swap_attributes(config, powerline_module):
+			with get_powerline_raw(config, ShellPowerline, args=Args(config_path=[''])) as powerline:
+				for i in range(2):
+					self.assertEqual(powerline.render(segment_info={'environ': {}}, side='left'), '\x1b[0;38;5;5;48;5;6m\xa0s\x1b[0;38;5;6;49;22m>>\x1b[0m')
+					self.assertEqual(powerline.render(segment_info={'environ': {'TERM': 'fbterm'}}, side='left'), '\x1b[0m\x1b[1;5}\x1b[2;6}\xa0s\x1b[0m\x1b[1;6}\x1b[49m\x1b[22m>>\x1b[0m')
+				self.assertEqual(len(powerline.renderer.hlstyle_cache), 6)
+				powerline.renderer.hlstyle_cache_size = 2
+				powerline.renderer.hlstyle_cache.clear()
+				powerline.renderer.frames.clear()
+				self.assertEqual(powerline.render(segment_info={'environ': {}}, side='left'), '\x1b[0;38;5;5;48;5;6m\xa0s\x1b[0;38;5;6;49;22m>>\x1b[0m')
+				self.assertEqual(len(powerline.renderer.hlstyle_cache), 2)
+
+
 class TestVim(TestCase):
 	def test_environ_update(self):
 		# Regression test: test that segment obtains environment from vim, not 
@@ -856,6 +1139,7 @@ class TestLemonbar(TestRender):
 					powerline,
 					'%{l}%{F#ffc00000}%{B#ff008000}%{+u} A%{F-B--u}%{F#ff008000}%{B#ffc00000}>>%{F-B--u}%{F#ff008000}%{B#ffc00000}B%{F-B--u}%{F#ffc00000}>>%{F-B--u}%{r}%{F#ffc00000}<<%{F-B--u}%{F#ff804000}%{B#ffc00000}%{+u}C%{F-B--u}%{F#ff0000c0}%{B#ffc00000}<<%{F-B--u}%{F#ff008000}%{B#ff0000c0}D %{F-B--u}'
 				)
+				self.assertEqual(''.join(powerline.render_iter()), powerline.render())
 
 	@with_new_config
 	def test_lemonbar_escape(self, config):
@@ -871,6 +1155,61 @@ class TestLemonbar(TestRender):
 					'%{l}%{F#ffc00000}%{B#ff008000}%{+u} %%{}{asd}%{F-B--u}%{F#ff008000}%{B#ffc00000}>>%{F-B--u}%{F#ff008000}%{B#ffc00000}10%%{} %%{}%{F-B--u}%{F#ffc00000}>>%{F-B--u}%{r}%{F#ffc00000}<<%{F-B--u}%{F#ff804000}%{B#ffc00000}%{+u}C%{F-B--u}%{F#ff0000c0}%{B#ffc00000}<<%{F-B--u}%{F#ff008000}%{B#ff0000c0}D %{F-B--u}'
 				)
 
+	@with_new_config
+	def test_lemonbar_render_outputs(self, config):
+		import powerline as powerline_module
+		calls = []
+
+		@render_cache_inputs()
+		def m1(pl):
+			calls.append('m1')
+			return [{'contents': 'abc', 'highlight_groups': ['hl1']}]
+
+		@requires_segment_info
+		def m2(pl, segment_info):
+			calls.append('m2')
+			return [{'contents': segment_info['output'], 'highlight_groups': ['hl1']}]
+
+		config['themes/wm/default']['segments']['left'] = (
+			{'function': 'bar.m1'},
+			highlighted_string('E', 'hl2', width='auto'),
+		)
+		outputs = [('DP-1', 20), ('DP-2', 30), ('DP-3', 20)]
+
+		class Powerline(powerline_module.Powerline):
+			get_local_themes = staticmethod(lambda local_themes: {})
+
+		with replace_item(sys.modules, 'bar', Args(m1=m1, m2=m2)):
+			with swap_attributes(config, powerline_module):
+				with get_powerline_raw(config, Powerline, replace_gcp=True, ext='wm', renderer_module='lemonbar') as powerline:
+					powerline.update_renderer()
+					rendered = powerline.renderer.render_outputs(outputs)
+					self.assertEqual(calls, ['m1'])
+					self.assertEqual(rendered, [
+						powerline.render(width=width, matcher_info=output)
+						for output, width in outputs
+					])
+					self.assertIn('abc', rendered[0])
+					self.assertNotEqual(rendered[0], rendered[1])
+
+				config['themes/wm/default']['segments']['left'] = (
+					{'function': 'bar.m1'},
+					{'function': 'bar.m2'},
+				)
+				del calls[:]
+				with get_powerline_raw(config, Powerline, replace_gcp=True, ext='wm', renderer_module='lemonbar') as powerline:
+					powerline.update_renderer()
+					rendered = powerline.renderer.render_outputs(outputs)
+					self.assertEqual(calls, ['m1', 'm2', 'm2', 'm2'])
+					self.assertTrue(all((
+						output in line and 'abc' in line
+						for (output, width), line in zip(outputs, rendered)
+					)))
+					self.assertEqual(rendered, [
+						powerline.render(width=width, matcher_info=output)
+						for output, width in outputs
+					])
+
 
 if __name__ == '__main__':
 	from tests.modules import main
@@ -0,0 +1,214 @@
+# vim:fileencoding=utf-8:noet
+
+'''Tests for powerline-daemon request parsing and Python client'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+import os
+import sys
+import json
+import socket
+import shutil
+
+from subprocess import Popen, PIPE
+from threading import Thread
+from collections import OrderedDict
+
+from tests.modules import TestCase
+from tests.modules.lib import replace_attr
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RUNTIME_DIR = os.path.abspath('daemon_runtime_dir')
+USE_FILESYSTEM = not sys.platform.lower().startswith('linux')
+
+
+def load_daemon():
+	path = os.path.join(ROOT, 'scripts', 'powerline-daemon')
+	try:
+		from importlib.machinery import SourceFileLoader
+		from importlib.util import spec_from_loader, module_from_spec
+	except ImportError:
+		import imp
+		return imp.load_source('powerline_daemon', path)
+	loader = SourceFileLoader(str('powerline_daemon'), path)
+	module = module_from_spec(spec_from_loader(loader.name, loader))
+	loader.exec_module(module)
+	return module
+
+
+daemon = load_daemon()
+
+
+class FakeDaemon(object):
+	'''Server which answers with the environment parsed from the request
+	'''
+
+	def __init__(self, address):
+		self.baselines = OrderedDict()
+		self.requests = []
+		self.sock = socket.socket(family=socket.AF_UNIX)
+		self.sock.bind(address if USE_FILESYSTEM else '\0' + address)
+		self.sock.listen(4)
+		self.thread = Thread(target=self.run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def run(self):
+		while True:
+			conn = self.sock.accept()[0]
+			try:
+				req = daemon.do_read(conn)
+				if req == daemon.EOF:
+					return
+				entries = [x.decode('utf-8') for x in req.split(b'\0') if x]
+				numargs = int(entries[0], 16)
+				entries = entries[numargs + 2:]
+				self.requests.append([
+					entry.split('=')[1] for entry in entries if entry.startswith('=')
+				])
+				try:
+					environ = daemon.parse_environ(entries, self.baselines)
+				except daemon.UnknownBaselineError:
+					daemon.do_write(conn, daemon.UNKNOWN_BASELINE)
+				else:
+					daemon.do_write(conn, json.dumps(environ).encode('utf-8'))
+			finally:
+				conn.close()
+
+	def stop(self, address):
+		sock = socket.socket(family=socket.AF_UNIX)
+		sock.connect(address if USE_FILESYSTEM else '\0' + address)
+		sock.sendall(daemon.EOF)
+		sock.close()
+		self.thread.join()
+		self.sock.close()
+
+
+class TestParseEnviron(TestCase):
+	def test_full_environment(self):
+		self.assertEqual(daemon.parse_environ(['A=1', 'B=2=3', 'C='], OrderedDict()), {
+			'A': '1',
+			'B': '2=3',
+			'C': '',
+		})
+		self.assertEqual(daemon.parse_environ(['A=1', '=baseline=x'], None), {'A': '1'})
+
+	def test_baseline_and_delta(self):
+		baselines = OrderedDict()
+		environ = daemon.parse_environ(['=baseline=x', 'A=1', 'B=2', 'C=3'], baselines)
+		self.assertEqual(environ, {'A': '1', 'B': '2', 'C': '3'})
+		self.assertEqual(baselines, {'x': environ})
+		environ['A'] = '0'
+		self.assertEqual(baselines['x']['A'], '1')
+		self.assertEqual(
+			daemon.parse_environ(['=delta=x', 'B=4', 'D=5', '=unset=C'], baselines),
+			{'A': '1', 'B': '4', 'D': '5'}
+		)
+		# Delta does not change the baseline
+		self.assertEqual(
+			daemon.parse_environ(['=delta=x'], baselines),
+			{'A': '1', 'B': '2', 'C': '3'}
+		)
+		self.assertRaises(daemon.UnknownBaselineError, daemon.parse_environ, ['=delta=y', 'A=1'], baselines)
+
+	def test_baseline_eviction(self):
+		baselines = OrderedDict()
+		with replace_attr(daemon, 'MAX_ENVIRON_BASELINES', 2):
+			daemon.parse_environ(['=baseline=x', 'A=1'], baselines)
+			daemon.parse_environ(['=baseline=y', 'A=2'], baselines)
+			# Using baseline makes it the most recently used one
+			daemon.parse_environ(['=delta=x'], baselines)
+			daemon.parse_environ(['=baseline=z', 'A=3'], baselines)
+		self.assertEqual(list(baselines), ['x', 'z'])
+		self.assertRaises(daemon.UnknownBaselineError, daemon.parse_environ, ['=delta=y'], baselines)
+
+	def test_unknown_baseline_answer(self):
+		parser = daemon.get_main_argparser(daemon.NonInteractiveArgParser)
+		state = daemon.State()
+		self.assertEqual(
+			daemon.prepare_request(b'2\0shell\0left\0/\0=delta=x\0A=1\0\0', parser, state),
+			daemon.UNKNOWN_BASELINE
+		)
+		key, args_list, environ, cwd = daemon.prepare_request(
+			b'2\0shell\0left\0/\0=baseline=x\0A=1\0\0', parser, state)
+		self.assertEqual((args_list[0].ext, environ, cwd), (['shell'], {'A': '1'}, '/'))
+		key, args_list, environ, cwd = daemon.prepare_request(
+			b'2\0shell\0left\0/\0=delta=x\0=unset=A\0B=2\0\0', parser, state)
+		self.assertEqual(environ, {'B': '2'})
+
+
+class FakePowerline(object):
+	def shutdown(self):
+		pass
+
+
+class TestState(TestCase):
+	def test_evicted_locks(self):
+		state = daemon.State(max_powerlines=1)
+		for key in ('a', 'b', 'c'):
+			with state.lock_instance(key):
+				with state.state_lock:
+					state.powerlines[key] = FakePowerline()
+					state.last_used[key] = 0
+		old_lock = state.get_lock('a')
+		with state.get_lock('c'):
+			evicted = state.pop_evicted()
+		self.assertEqual(len(evicted), 2)
+		for powerline, lock in evicted:
+			lock.release()
+		self.assertEqual(list(state.powerlines), ['c'])
+		self.assertEqual(sorted(state.locks), ['c'])
+		# Lock obtained before eviction is replaced with the new one
+		self.assertFalse(old_lock.locked())
+		with state.lock_instance('a'):
+			self.assertIsNot(state.locks['a'], old_lock)
+			self.assertTrue(state.locks['a'].locked())
+		state.shutdown()
+
+
+class TestPythonClient(TestCase):
+	def test_environ_delta(self):
+		address = 'powerline-test-environ-{0}'.format(os.getpid())
+		if USE_FILESYSTEM:
+			address = os.path.join(RUNTIME_DIR, address)
+		os.mkdir(RUNTIME_DIR)
+		server = FakeDaemon(address)
+		try:
+			def run(**environ):
+				environ.update(
+					POWERLINE_ENV_SESSION='test',
+					XDG_RUNTIME_DIR=RUNTIME_DIR,
+					PYTHONPATH=ROOT,
+					PATH=os.environ.get('PATH', ''),
+				)
+				p = Popen(
+					[sys.executable, os.path.join(ROOT, 'client', 'powerline.py'), '--socket', address, 'shell'],
+					stdout=PIPE, env=environ, cwd=ROOT)
+				out = p.communicate()[0]
+				self.assertEqual(p.returncode, 0)
+				ret = json.loads(out.decode('utf-8'))
+				self.assertEqual(ret.pop('POWERLINE_ENV_SESSION'), 'test')
+				for key in ('XDG_RUNTIME_DIR', 'PYTHONPATH', 'PATH'):
+					ret.pop(key)
+				# Python may set some variables for its subprocesses
+				return dict(((key, value) for key, value in ret.items() if key in ('A', 'B', 'C', 'D')))
+
+			self.assertEqual(run(A='1', B='2', C='3'), {'A': '1', 'B': '2', 'C': '3'})
+			self.assertEqual(server.requests[-1][0], 'baseline')
+			self.assertTrue(os.path.exists(os.path.join(RUNTIME_DIR, 'powerline-env-test')))
+			self.assertEqual(run(A='1', B='4', D='5'), {'A': '1', 'B': '4', 'D': '5'})
+			self.assertEqual(server.requests[-1], ['delta', 'unset'])
+			# Daemon was restarted and forgot the baseline
+			server.baselines.clear()
+			del server.requests[:]
+			self.assertEqual(run(A='1', B='2', C='3'), {'A': '1', 'B': '2', 'C': '3'})
+			self.assertEqual([request[0] for request in server.requests], ['delta', 'baseline'])
+		finally:
+			server.stop(address)
+			shutil.rmtree(RUNTIME_DIR)
+
+
+if __name__ == '__main__':
+	from tests.modules import main
+	main()
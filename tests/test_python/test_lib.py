@@ -8,7 +8,7 @@ import re
 import shutil
 import unicodedata
 
-from time import sleep
+from time import sleep, time
 from subprocess import call, PIPE
 
 from powerline.lib import add_divider_highlight_group
@@ -18,11 +18,14 @@ from powerline.lib.vcs import guess, get_fallback_create_watcher
 from powerline.lib.threaded import ThreadedSegment, KwThreadedSegment
 from powerline.lib.monotonic import monotonic
 from powerline.lib.vcs.git import git_directory
+from powerline.lib.vcs.git_status import get_status as get_git_status, get_incremental_status
 from powerline.lib.shell import run_cmd
+from powerline.lib.stats import percentile, RequestStats
+from powerline.lib.publish import Publisher, fnv1a_64, get_entry_name, parse_entry
 
 import powerline.lib.unicode as plu
 
-from tests.modules.lib import Pl, replace_attr
+from tests.modules.lib import Pl, Args, replace_attr
 from tests.modules import TestCase, SkipTest
 
 
@@ -42,6 +45,8 @@ else:
 
 
 GIT_REPO = 'git_repo'
+GIT_NATIVE_REPO = 'git_native_repo'
+PUBLISH_DIR = 'publish_dir'
 HG_REPO = 'hg_repo'
 BZR_REPO = 'bzr_repo'
 
@@ -420,6 +425,121 @@ class TestLib(TestCase):
 		self.assertEqual(humanize_bytes(1000000000, si_prefix=True), '1.00 GB')
 		self.assertEqual(humanize_bytes(1000000000, si_prefix=False), '953.7 MiB')
 
+	def test_percentile(self):
+		self.assertEqual(percentile([], 50), None)
+		self.assertEqual(percentile([1], 99), 1)
+		samples = list(range(1, 101))
+		self.assertEqual(percentile(samples, 50), 50)
+		self.assertEqual(percentile(samples, 95), 95)
+		self.assertEqual(percentile(samples, 99), 99)
+		self.assertEqual(percentile(samples, 100), 100)
+		self.assertEqual(percentile(samples, 0), 1)
+		self.assertEqual(percentile([1, 2, 3], 50), 2)
+
+	def test_request_stats(self):
+		stats = RequestStats()
+		stats.add_request()
+		for i in range(1, 5):
+			stats.add_render(('shell',), i / 1000)
+		stats.add_segment('cwd', 0.002)
+		dump = stats.dump()
+		self.assertEqual(dump['requests'], 1)
+		self.assertEqual(dump['renders'], [{
+			'key': ['shell'],
+			'count': 4,
+			'mean_ms': 2.5,
+			'p50_ms': 2.0,
+			'p95_ms': 4.0,
+			'p99_ms': 4.0,
+		}])
+		self.assertEqual(dump['segments']['cwd']['count'], 1)
+
+		worker_stats = RequestStats(keep_records=True)
+		worker_stats.add_request()
+		worker_stats.add_segment('cwd', 0.004)
+		self.assertEqual(worker_stats.dump()['requests'], 0)
+		stats.add_records(worker_stats.pop_records())
+		self.assertEqual(worker_stats.pop_records(), [])
+		dump = stats.dump()
+		self.assertEqual(dump['requests'], 2)
+		self.assertEqual(dump['segments']['cwd']['count'], 2)
+		self.assertEqual(dump['segments']['cwd']['p99_ms'], 4.0)
+
+	def test_aioserver_read_request(self):
+		if sys.version_info < (3, 7):
+			raise SkipTest('asyncio server requires Python-3.7 or later')
+		import asyncio
+		from powerline.lib.aioserver import read_request
+
+		def read(data, eof=True):
+			async def run():
+				reader = asyncio.StreamReader()
+				reader.feed_data(data)
+				if eof:
+					reader.feed_eof()
+				return await asyncio.wait_for(read_request(reader), 1)
+			return asyncio.run(run())
+
+		self.assertEqual(read(b'2\0tmux\0right\0/\0A=B\0C=D\0\0', eof=False), b'2\0tmux\0right\0/\0A=B\0C=D\0\0')
+		self.assertEqual(read(b'2\0tmux\0right\0/\0\0', eof=False), b'2\0tmux\0right\0/\0\0')
+		self.assertEqual(read(b'2\0tmux\0\0/\0\0', eof=False), b'2\0tmux\0\0/\0\0')
+		self.assertEqual(read(b'2\0tmux\0right\0/\0A=B'), b'2\0tmux\0right\0/\0A=B\0\0')
+		self.assertEqual(read(b''), b'')
+
+	def test_publisher(self):
+		self.assertEqual(fnv1a_64(b''), 0xcbf29ce484222325)
+		self.assertEqual(fnv1a_64(b'a'), 0xaf63dc4c8601ec8c)
+		self.assertEqual(get_entry_name(b'foobar'), '85944171f73967e8')
+		self.assertEqual(parse_entry(b'PL1 1000'), None)
+		self.assertEqual(parse_entry(b'PL1 1000 10\nshort'), None)
+
+		renders = []
+
+		def render(args, environ, cwd):
+			renders.append((args.ext[0], cwd))
+			return b'answer ' + str(len(renders)).encode('ascii')
+
+		tmux_request = b'2\0tmux\0right\0/\0A=B'
+		publisher = Publisher(PUBLISH_DIR, render, max_age=10, keep=10)
+		try:
+			publisher.start()
+			publisher.shutdown_event.set()
+			publisher.thread.join()
+			publisher.add_request(tmux_request + b'\0\0\0', [Args(ext=['tmux'])], {'A': 'B'}, '/')
+			# Requests which differ only in trailing NULs are the same request
+			publisher.add_request(tmux_request + b'\0\0', [Args(ext=['tmux'])], {'A': 'B'}, '/')
+			publisher.add_request(b'shell', [Args(ext=['shell'])], {}, '/')
+			publisher.add_request(b'several', [Args(ext=['tmux']), Args(ext=['tmux'])], {}, '/')
+			self.assertEqual(len(publisher.entries), 1)
+			publisher.refresh()
+			self.assertEqual(renders, [('tmux', '/')])
+			self.assertEqual(os.listdir(PUBLISH_DIR), [get_entry_name(tmux_request)])
+			with open(os.path.join(PUBLISH_DIR, get_entry_name(tmux_request)), 'rb') as f:
+				expires, request, answer = parse_entry(f.read())
+			self.assertEqual(request, tmux_request)
+			self.assertEqual(answer, b'answer 1')
+			self.assertGreater(expires, time())
+
+			# Answers are rendered again only if they were read
+			path = os.path.join(PUBLISH_DIR, get_entry_name(tmux_request))
+			mtime = os.stat(path).st_mtime
+			os.utime(path, (mtime - 1, mtime))
+			publisher.refresh()
+			self.assertEqual(len(renders), 1)
+			os.utime(path, (mtime + 1, mtime))
+			publisher.refresh()
+			self.assertEqual(len(renders), 2)
+
+			publisher.keep = 0
+			sleep(0.01)
+			publisher.refresh()
+			self.assertEqual(len(renders), 2)
+			self.assertEqual(publisher.entries, {})
+			self.assertEqual(os.listdir(PUBLISH_DIR), [])
+		finally:
+			publisher.shutdown()
+			shutil.rmtree(PUBLISH_DIR)
+
 
 width_data = {
 	'N': 1,          # Neutral
@@ -507,6 +627,22 @@ class TestUnicode(TestCase):
 			raise SkipTest('Can only test strwidth_ucs_2 in UCS-2 Pythons')
 		self.assertEqual(1, plu.strwidth_ucs_2(width_data, '\ud83c\udc30'))
 
+	def test_strwidth_table(self):
+		strwidth = plu.strwidth_ucs_2 if sys.maxunicode < 0x10FFFF else plu.strwidth_ucs_4
+		ambiwidth_2 = dict(width_data, A=2)
+		for i in range(2):
+			# Combining acute accent, ambiguous and wide characters
+			self.assertEqual(6, strwidth(width_data, 'a\u0301¡ＡＢ'))
+			self.assertEqual(7, strwidth(ambiwidth_2, 'a\u0301¡ＡＢ'))
+			self.assertEqual(5, strwidth(width_data, 'a\tb\x00c'))
+			self.assertEqual(7, strwidth(dict(width_data, N=2), 'a\tb\x00c'))
+		for codepoint in range(0x3000):
+			symbol = plu.unichr(codepoint)
+			self.assertEqual(
+				strwidth(ambiwidth_2, symbol),
+				0 if unicodedata.combining(symbol) else ambiwidth_2[unicodedata.east_asian_width(symbol)]
+			)
+
 
 class TestVCS(TestCase):
 	def do_branch_rename_test(self, repo, q):
@@ -586,6 +722,156 @@ class TestVCS(TestCase):
 			while stash_list():
 			    stash_drop()
 
+	def test_git_status_reader(self):
+		repo_dir = os.path.abspath(GIT_NATIVE_REPO)
+
+		def status(path=None):
+			return get_git_status(repo_dir, os.path.join(repo_dir, '.git'), path)
+
+		def git(*args):
+			call(('git',) + args, cwd=repo_dir, stdout=PIPE)
+
+		def write(path, contents):
+			with open(os.path.join(repo_dir, path), 'w') as f:
+				f.write(contents)
+
+		call(['git', 'init', '--quiet', repo_dir])
+		try:
+			git('config', '--local', 'user.name', 'Foo')
+			git('config', '--local', 'user.email', 'bar@example.org')
+			self.assertEqual(status(), None)
+			os.makedirs(os.path.join(repo_dir, 'd', 'e'))
+			write('a', 'abc')
+			write('d/e/f', 'def')
+			write('x.log', 'log')
+			write('.gitignore', '*.log\n')
+			self.assertEqual(status(), '  U')
+			self.assertEqual(status('a'), '??')
+			self.assertEqual(status('x.log'), '!!')
+			self.assertEqual(status('nonexistent'), None)
+			git('add', '-N', 'a')
+			self.assertEqual(status(), 'D U')
+			self.assertEqual(status('a'), ' A')
+			git('add', 'a', 'd', '.gitignore')
+			self.assertEqual(status(), ' I ')
+			self.assertEqual(status('d/e/f'), 'A ')
+			git('commit', '--quiet', '--message', 'Initial commit')
+			self.assertEqual(status(), None)
+			self.assertEqual(status('a'), None)
+			write('a', 'abcd')
+			self.assertEqual(status(), 'D  ')
+			self.assertEqual(status('a'), ' M')
+			git('add', 'a')
+			self.assertEqual(status(), ' I ')
+			self.assertEqual(status('a'), 'M ')
+			os.remove(os.path.join(repo_dir, 'a'))
+			self.assertEqual(status('a'), 'MD')
+			git('checkout', '--quiet', 'HEAD', 'a')
+			# Packed objects and deltas
+			write('d/e/f', 'def\n' * 100)
+			git('commit', '--quiet', '--all', '--message', 'Second commit')
+			write('d/e/f', 'def\n' * 101)
+			git('commit', '--quiet', '--all', '--message', 'Third commit')
+			git('gc', '--quiet', '--aggressive')
+			self.assertEqual(status(), None)
+			self.assertEqual(status('d/e/f'), None)
+			git('update-index', '--index-version', '4')
+			self.assertEqual(status('d/e/f'), None)
+			git('rm', '--quiet', '--cached', 'a')
+			self.assertEqual(status(), ' IU')
+			self.assertEqual(status('a'), 'D ')
+			write('.gitignore', '*.log\n!x.log\n')
+			self.assertEqual(status('x.log'), '??')
+			# Untracked files in ignored tracked directories are ignored
+			os.remove(os.path.join(repo_dir, 'x.log'))
+			os.mkdir(os.path.join(repo_dir, 'build'))
+			write('build/tracked', 'tracked')
+			write('.gitignore', 'build/\n')
+			git('add', '--force', 'a', '.gitignore', 'build/tracked')
+			git('commit', '--quiet', '--message', 'Fourth commit')
+			write('build/new', 'new')
+			self.assertEqual(status(), None)
+			self.assertEqual(status('build/new'), '!!')
+			# Untracked files are not searched for if they are not shown
+			write('u', 'u')
+			self.assertEqual(status(), '  U')
+			git('config', '--local', 'status.showUntrackedFiles', 'no')
+			self.assertEqual(status(), None)
+			self.assertEqual(status('u'), None)
+			git('config', '--local', 'status.showUntrackedFiles', 'all')
+			self.assertEqual(status(), '  U')
+		finally:
+			shutil.rmtree(repo_dir)
+
+	def test_git_incremental_status(self):
+		repo_dir = os.path.abspath(GIT_NATIVE_REPO)
+		state = [None]
+
+		def status(*changed_paths):
+			ret, state[0] = get_incremental_status(
+				repo_dir, os.path.join(repo_dir, '.git'), state[0],
+				[os.path.join(repo_dir, path) for path in changed_paths])
+			self.assertEqual(ret, get_git_status(repo_dir, os.path.join(repo_dir, '.git')))
+			return ret
+
+		def git(*args):
+			call(('git',) + args, cwd=repo_dir, stdout=PIPE)
+
+		def write(path, contents):
+			with open(os.path.join(repo_dir, path), 'w') as f:
+				f.write(contents)
+
+		call(['git', 'init', '--quiet', repo_dir])
+		try:
+			git('config', '--local', 'user.name', 'Foo')
+			git('config', '--local', 'user.email', 'bar@example.org')
+			os.makedirs(os.path.join(repo_dir, 'd', 'e'))
+			write('a', 'abc')
+			write('d/e/f', 'def')
+			write('.gitignore', '*.log\n')
+			git('add', '.')
+			git('commit', '--quiet', '--message', 'Initial commit')
+			self.assertEqual(status(), None)
+			write('a', 'abcd')
+			self.assertEqual(status('a'), 'D  ')
+			# Paths which were not reported are not checked again
+			write('d/e/f', 'defg')
+			self.assertEqual(get_incremental_status(
+				repo_dir, os.path.join(repo_dir, '.git'), state[0], [])[0], 'D  ')
+			self.assertEqual(status('d/e/f'), 'D  ')
+			write('a', 'abc')
+			write('d/e/f', 'def')
+			self.assertEqual(status('a', 'd/e'), None)
+			os.makedirs(os.path.join(repo_dir, 'u', 'v'))
+			self.assertEqual(status('u'), None)
+			write('u/v/w', 'w')
+			self.assertEqual(status('u/v/w'), '  U')
+			write('u/v/x.log', 'log')
+			self.assertEqual(status('u/v/x.log'), '  U')
+			os.remove(os.path.join(repo_dir, 'u', 'v', 'w'))
+			self.assertEqual(status('u/v/w'), None)
+			write('.gitignore', '*.log\n!x.log\n')
+			self.assertEqual(status('.gitignore'), 'D U')
+			shutil.rmtree(os.path.join(repo_dir, 'u'))
+			self.assertEqual(status('u'), 'D  ')
+			os.remove(os.path.join(repo_dir, 'd', 'e', 'f'))
+			self.assertEqual(status('d'), 'D  ')
+			git('rm', '--quiet', '--cached', 'd/e/f')
+			self.assertEqual(status(os.path.join('.git', 'index')), 'DI ')
+			git('commit', '--quiet', '--all', '--message', 'Second commit')
+			self.assertEqual(status(os.path.join('.git', 'index')), None)
+			os.mkdir(os.path.join(repo_dir, 'build'))
+			write('build/tracked', 'tracked')
+			write('.gitignore', 'build/\n')
+			git('add', '--force', '.gitignore', 'build/tracked')
+			git('commit', '--quiet', '--message', 'Third commit')
+			self.assertEqual(status(os.path.join('.git', 'index')), None)
+			write('build/new', 'new')
+			self.assertEqual(status('build/new'), None)
+			self.assertEqual(status('build'), None)
+		finally:
+			shutil.rmtree(repo_dir)
+
 	def test_git_sym(self):
 		create_watcher = get_fallback_create_watcher()
 		dotgit = os.path.join(GIT_REPO, '.git')
@@ -0,0 +1,75 @@
+# vim:fileencoding=utf-8:noet
+
+'''Tests for pushing tmux status line from daemon'''
+
+from __future__ import (unicode_literals, division, absolute_import, print_function)
+
+from powerline.bindings.tmux.push import quote_tmux_argument, get_templates, push, PLACEHOLDER
+
+from tests.modules import TestCase
+
+
+class FakeClient(object):
+	def __init__(self, options):
+		self.options = options
+		self.commands = []
+
+	def command(self, *args):
+		self.commands.append(args)
+		if args[0] == 'show-options':
+			return self.options[args[2]].split('\n')
+		elif args[0] == 'set-option':
+			self.options[args[2]] = args[3]
+		return []
+
+
+class FakePowerline(object):
+	def __init__(self):
+		self.outputs = {'left': 'L', 'right': 'R'}
+
+	def render(self, side):
+		return self.outputs[side]
+
+
+class TestPush(TestCase):
+	def test_quote_tmux_argument(self):
+		self.assertEqual(quote_tmux_argument('abc'), '"abc"')
+		self.assertEqual(quote_tmux_argument('a"b\\c $d'), '"a\\"b\\\\c \\$d"')
+
+	def test_get_templates(self):
+		client = FakeClient({
+			'status-left': '#[fg=red] #S #(env "$POWERLINE_COMMAND" tmux left --width=#{client_width})',
+			'status-right': '#(date)',
+		})
+		self.assertEqual(get_templates(client), {
+			'status-left': (
+				'left',
+				'#[fg=red] #S ' + PLACEHOLDER,
+				'#[fg=red] #S #(env "$POWERLINE_COMMAND" tmux left --width=#{client_width})',
+			),
+		})
+
+	def test_push(self):
+		client = FakeClient({
+			'status-left': '#S #(powerline tmux left)',
+			'status-right': '#(powerline tmux right -R pane_id=#{pane_id}) end',
+		})
+		powerline = FakePowerline()
+		templates = get_templates(client)
+		last_values = {}
+		push(powerline, client, templates, last_values)
+		self.assertEqual(client.options, {
+			'status-left': '#S L',
+			'status-right': 'R end',
+		})
+		del client.commands[:]
+		push(powerline, client, templates, last_values)
+		self.assertEqual(client.commands, [])
+		powerline.outputs['right'] = 'R2'
+		push(powerline, client, templates, last_values)
+		self.assertEqual(client.commands, [('set-option', '-g', 'status-right', 'R2 end')])
+
+
+if __name__ == '__main__':
+	from tests.modules import main
+	main()
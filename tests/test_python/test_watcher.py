@@ -10,6 +10,7 @@ from errno import ENOENT
 
 from powerline.lib.watcher import create_file_watcher, create_tree_watcher, INotifyError
 from powerline.lib.watcher.uv import UvNotFound
+from powerline.lib.watcher.stat import StatTreeWatcher
 from powerline import get_fallback_logger
 from powerline.lib.monotonic import monotonic
 
@@ -61,6 +62,12 @@ def set_watcher_tests(l):
 				raise SkipTest('Pyuv is not available')
 			self.do_test_tree_watcher(tw, use_bytes)
 
+		def test_stat_tree_watcher(self, use_bytes=use_bytes):
+			tw = create_tree_watcher(get_fallback_logger(), watcher_type='stat')
+			# Stat watcher reports entries changed shortly before the scan 
+			# once more.
+			self.do_test_tree_watcher(tw, use_bytes, settle_time=0.1)
+
 		def test_inotify_file_watcher_is_watching(self, use_bytes=use_bytes):
 			try:
 				w = create_file_watcher(pl=get_fallback_logger(), watcher_type='inotify')
@@ -86,6 +93,7 @@ def set_watcher_tests(l):
 				locals()['test_{0}_file_watcher_is_watching'.format(wt)])
 		l['test_{0}_file_watcher_is_watching_{1}'.format('stat', btn)] = (
 			locals()['test_{0}_file_watcher_is_watching'.format('stat')])
+		l['test_{0}_tree_watcher_{1}'.format('stat', btn)] = locals()['test_{0}_tree_watcher'.format('stat')]
 
 
 class TestFilesystemWatchers(TestCase):
@@ -146,7 +154,7 @@ class TestFilesystemWatchers(TestCase):
 		finally:
 			clear_dir(INOTIFY_DIR)
 
-	def do_test_tree_watcher(self, tw, use_bytes=False):
+	def do_test_tree_watcher(self, tw, use_bytes=False, settle_time=0):
 		try:
 			inotify_dir = INOTIFY_DIR
 			subdir = os.path.join(inotify_dir, 'subdir')
@@ -162,6 +170,7 @@ class TestFilesystemWatchers(TestCase):
 				suffix = suffix.encode('utf-8')
 				f = f.encode('utf-8')
 			os.mkdir(subdir)
+			sleep(settle_time)
 			try:
 				if tw.watch(inotify_dir).is_dummy:
 					raise SkipTest('No tree watcher available')
@@ -194,9 +203,129 @@ class TestFilesystemWatchers(TestCase):
 			changed()
 			os.rename(f, f + suffix)
 			changed()
+			tw.get_changed_paths(inotify_dir)
+			open(f, 'w').close()
+			st = monotonic()
+			changed_paths = set()
+			while (
+				changed_paths is not None
+				and os.path.realpath(f) not in changed_paths
+				and monotonic() - st < 1
+			):
+				sleep(0.1)
+				new_changed_paths = tw.get_changed_paths(inotify_dir)
+				changed_paths = None if new_changed_paths is None else changed_paths | new_changed_paths
+			# None means that watcher is not able to tell which paths changed
+			self.assertTrue(changed_paths is None or os.path.realpath(f) in changed_paths)
 		finally:
 			clear_dir(inotify_dir)
 
+	def test_inotify_shared_tree_watches(self):
+		tw = create_tree_watcher(get_fallback_logger(), watcher_type='inotify')
+		subdir = os.path.join(INOTIFY_DIR, 'subdir')
+		f = os.path.join(subdir, 'f')
+		try:
+			os.makedirs(os.path.join(subdir, 'd'))
+			try:
+				outer = tw.watch(INOTIFY_DIR)
+			except INotifyError:
+				raise SkipTest('INotify is not available')
+			inner = tw.watch(subdir)
+			self.assertIs(outer.watches, inner.watches)
+			# Directories belonging to both trees are watched once
+			self.assertEqual(tw.count_watched_directories(), 3)
+			self.assertEqual(len(outer.wds), 3)
+			self.assertEqual(len(inner.wds), 2)
+			self.assertTrue(tw(INOTIFY_DIR))
+			self.assertTrue(tw(subdir))
+			open(f, 'w').close()
+			self.assertEqual(tw.get_changed_paths(INOTIFY_DIR), set((os.path.realpath(f),)))
+			self.assertEqual(tw.get_changed_paths(subdir), set((os.path.realpath(f),)))
+			tw.unwatch(subdir)
+			self.assertEqual(tw.count_watched_directories(), 3)
+			os.remove(f)
+			self.assertEqual(tw.get_changed_paths(INOTIFY_DIR), set((os.path.realpath(f),)))
+			tw.unwatch(INOTIFY_DIR)
+			self.assertEqual(tw.count_watched_directories(), 0)
+		finally:
+			clear_dir(INOTIFY_DIR)
+
+	def test_inotify_tree_watcher_eviction(self):
+		d1 = os.path.realpath(os.path.join(INOTIFY_DIR, 'd1'))
+		d2 = os.path.realpath(os.path.join(INOTIFY_DIR, 'd2'))
+		try:
+			os.makedirs(os.path.join(d1, 'sub'))
+			os.makedirs(d2)
+			tw = create_tree_watcher(get_fallback_logger(), watcher_type='inotify', max_trees=1)
+			try:
+				tw.watch(d1)
+			except INotifyError:
+				raise SkipTest('INotify is not available')
+			self.assertEqual(tw.count_watched_directories(), 2)
+			# Replaced watcher releases its watches
+			tw.watch(d1)
+			tw.unwatch(d1)
+			self.assertEqual(tw.count_watched_directories(), 0)
+			tw.watch(d1)
+			self.assertEqual(tw.count_watched_directories(), 2)
+			tw(d2)
+			self.assertEqual(list(tw.watches), [d2])
+			self.assertEqual(tw.count_watched_directories(), 1)
+			tw.close()
+
+			tw = create_tree_watcher(get_fallback_logger(), watcher_type='inotify', max_directories=2)
+			tw(d2)
+			tw(d1)
+			self.assertEqual(list(tw.watches), [d1])
+			tw(d2)
+			self.assertEqual(list(tw.watches), [d2])
+			self.assertEqual(tw.count_watched_directories(), 1)
+			tw.close()
+
+			tw = create_tree_watcher(get_fallback_logger(), watcher_type='inotify', max_directories=1)
+			tw(d1)
+			self.assertTrue(isinstance(tw.watches[d1], StatTreeWatcher))
+			self.assertEqual(tw.count_watched_directories(), 0)
+			tw.close()
+
+			tw = create_tree_watcher(get_fallback_logger(), watcher_type='inotify', expire_time=0.001)
+			tw(d1)
+			sleep(0.1)
+			tw(d2)
+			self.assertEqual(list(tw.watches), [d2])
+			self.assertEqual(tw.count_watched_directories(), 1)
+			tw.close()
+		finally:
+			clear_dir(INOTIFY_DIR)
+
+	def test_stat_tree_watcher_time_budget(self):
+		d = os.path.join(INOTIFY_DIR, 'a', 'b', 'c')
+		f = os.path.realpath(os.path.join(d, 'f'))
+		try:
+			os.makedirs(d)
+			w = StatTreeWatcher(INOTIFY_DIR, time_budget=0)
+			# Only one directory is scanned per query
+			self.assertEqual(len(w.directories), 2)
+			self.assertEqual(w.get_changed_paths(), None)
+			self.assertEqual(len(w.directories), 3)
+			self.assertEqual(w.get_changed_paths(), set())
+			open(f, 'w').close()
+			changed_paths = set()
+			for i in range(8):
+				changed_paths |= w.get_changed_paths()
+			self.assertIn(f, changed_paths)
+			self.assertEqual(len(w.directories), 4)
+			# Renaming does not change the number of entries
+			g = os.path.realpath(os.path.join(d, 'g'))
+			os.rename(f, g)
+			changed_paths = set()
+			for i in range(8):
+				changed_paths |= w.get_changed_paths()
+			self.assertIn(os.path.realpath(d), changed_paths)
+			self.assertIn(g, changed_paths)
+		finally:
+			clear_dir(INOTIFY_DIR)
+
 	def do_test_file_watcher_is_watching(self, w, use_bytes=False):
 		try:
 			f1, f2, f3 = map(lambda x: os.path.join(INOTIFY_DIR, 'file%d' % x), (1, 2, 3))